@@ -0,0 +1,86 @@
+import os
+import sys
+import json
+import subprocess
+from config import VIDEO_PATH, AUDIO_SAMPLE_RATE
+
+
+def pcm_path_for(video_path=VIDEO_PATH):
+    """Chemin du cache PCM, à côté de la vidéo (ex: video.mkv → video.16k.f32)."""
+    return os.path.splitext(video_path)[0] + f".{AUDIO_SAMPLE_RATE // 1000}k.f32"
+
+
+def _is_fresh(pcm_path, video_path):
+    try:
+        pcm = os.stat(pcm_path)
+        return pcm.st_size > 0 and pcm.st_mtime >= os.stat(video_path).st_mtime
+    except OSError:
+        return False
+
+
+def decode_audio(video_path=VIDEO_PATH, force=False):
+    """
+    Décode une seule fois la piste audio en PCM float32 mono 16 kHz brut
+    (format attendu par Whisper). Réutilise le fichier s'il est plus récent
+    que la vidéo.
+
+    Returns:
+        str: chemin du fichier PCM
+    """
+    out_path = pcm_path_for(video_path)
+    if not force and _is_fresh(out_path, video_path):
+        return out_path
+    tmp = out_path + ".tmp"
+    proc = subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-nostdin",
+        "-i", video_path,
+        "-vn", "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE),
+        "-f", "f32le", "-acodec", "pcm_f32le",
+        tmp,
+    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Décodage audio impossible: {proc.stderr}")
+    os.replace(tmp, out_path)
+    return out_path
+
+
+def load_pcm(video_path=VIDEO_PATH):
+    """
+    Retourne l'audio de la vidéo en np.memmap float32 (décodé au besoin).
+    Mode copie-sur-écriture: lecture sans copie, et torch.from_numpy l'accepte.
+    """
+    import numpy as np
+    path = decode_audio(video_path)
+    return np.memmap(path, dtype=np.float32, mode="c")
+
+
+def pcm_slice(audio, start, end, sr=AUDIO_SAMPLE_RATE):
+    """Vue (sans copie) sur l'audio entre `start` et `end` secondes."""
+    return audio[max(0, int(start * sr)):max(0, int(end * sr))]
+
+
+def rms_energy(audio, frame, block=4096):
+    """
+    Énergie RMS par trame de `frame` échantillons (vectorisé), calculée par
+    paquets de `block` trames: sur un memmap, seul un paquet est lu à la fois
+    et aucun tableau temporaire de la taille de l'audio n'est alloué.
+    """
+    import numpy as np
+    n_frames = len(audio) // frame
+    energy = np.empty(n_frames, dtype=np.float32)
+    for lo in range(0, n_frames, block):
+        hi = min(n_frames, lo + block)
+        frames = np.asarray(audio[lo * frame: hi * frame], dtype=np.float32).reshape(hi - lo, frame)
+        # somme des carrés par trame sans tableau intermédiaire x*x
+        energy[lo:hi] = np.einsum("ij,ij->i", frames, frames) / frame
+    return np.sqrt(energy)
+
+
+if __name__ == "__main__":
+    try:
+        path = decode_audio(force="--force" in sys.argv)
+        result = {"success": True, "path": path, "duration": os.path.getsize(path) / 4 / AUDIO_SAMPLE_RATE}
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+    print(json.dumps(result, ensure_ascii=False))
+    sys.exit(0 if result["success"] else 1)
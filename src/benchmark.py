@@ -0,0 +1,273 @@
+"""
+Banc d'essai hors ligne: transcription synthétique, vidéo synthétique
+(sources lavfi de ffmpeg) et LLM factice à latence réglable. Aucun accès
+YouTube ni clé Mistral. Chaque étape est chronométrée et ramenée à la
+minute de vidéo pour comparer les runs entre eux.
+
+    python src/benchmark.py --minutes 10 60 --latency 0.3
+    python src/benchmark.py --minutes 10 --render --out bench.jsonl
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import tempfile
+import threading
+import subprocess
+from types import SimpleNamespace
+
+import config
+from cache import DiskCache
+from llm import estimate_tokens
+from workspace import Workspace
+
+# Chemins de config.py redirigés vers le dossier de travail du banc
+PATH_NAMES = (
+    "VIDEO_PATH", "TRANSCRIPT_PATH", "BLOCKS_PATH", "SCORED_PATH", "CLIPS_JSON", "SNAPPED_PATH",
+    "REFINED_PATH", "AUDIO_PATH", "SECTIONS_PATH", "SHOTS_PATH", "DRAFTS_DIR", "DRAFTS_JSON", "CHUNKS_PATH",
+)
+
+WORDS = (
+    "le film montre comment une idée simple devient une histoire qui change tout pour le public "
+    "on découvre alors que le réalisateur avait prévu cette scène depuis le début du tournage "
+    "mais personne ne savait vraiment pourquoi ce moment reste aussi fort aujourd'hui"
+).split()
+
+
+def synthetic_transcript(minutes, seed=0):
+    """
+    Transcription au format Whisper ({text, segments, language}) de `minutes`
+    minutes: segments de 2 à 6 s, phrases ponctuées, quelques silences.
+    """
+    rng = random.Random(seed)
+    segments, t = [], 0.0
+    total = minutes * 60.0
+    while t < total:
+        duration = rng.uniform(2.0, 6.0)
+        words = [rng.choice(WORDS) for _ in range(int(duration * 2.5))]
+        words[0] = words[0].capitalize()
+        text = " " + " ".join(words) + rng.choice([".", ".", "?", "!", ","])
+        segments.append({
+            "id": len(segments),
+            "start": round(t, 2),
+            "end": round(min(total, t + duration), 2),
+            "text": text,
+            "avg_logprob": round(rng.uniform(-0.8, -0.1), 3),
+            "no_speech_prob": round(rng.uniform(0.0, 0.3), 3),
+        })
+        t += duration
+        # la plupart des enchaînements sont serrés, certains laissent un vrai silence
+        t += rng.uniform(0.6, 2.0) if rng.random() < 0.15 else rng.uniform(0.0, 0.2)
+    return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": "fr"}
+
+
+def synthetic_video(path, seconds, size=(1280, 720), fps=30):
+    """Vidéo de test (mire testsrc2 + bip sinusoïdal) générée par ffmpeg."""
+    w, h = size
+    proc = subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={w}x{h}:rate={fps}",
+        "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+        "-t", f"{seconds:.3f}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac",
+        path,
+    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Génération vidéo impossible: {proc.stderr}")
+    return path
+
+
+def stub_score(text):
+    """Note déterministe (1-10) d'un passage: même texte, même note."""
+    return 1 + int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16) % 10
+
+
+class StubLLM:
+    """
+    Client factice compatible avec `client.chat.complete(model=..., messages=[...])`.
+    Reconnaît les trois prompts du pipeline (note unique, note groupée,
+    raffinage) et répond de façon déterministe après `latency` secondes.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.chat = self
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def complete(self, model=None, messages=None):
+        prompt = messages[-1]["content"]
+        with self.lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        content = self.answer(prompt)
+        usage = SimpleNamespace(total_tokens=estimate_tokens(prompt) + estimate_tokens(content))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    @staticmethod
+    def answer(prompt):
+        if '"start": <float>' in prompt:
+            # raffinage: début du premier segment, fin du dernier
+            window = json.loads(prompt.split('"""')[1])
+            return json.dumps({"start": window[0]["start"], "end": window[-1]["end"]})
+        if "Passages :" in prompt:
+            lines = prompt.split("Passages :", 1)[1].strip().splitlines()
+            items = [json.loads(line) for line in lines if line.strip()]
+            return json.dumps([{"index": it["index"], "score": stub_score(it["text"])} for it in items])
+        match = re.search(r'Passage:\s*"(.*?)"\s*\n', prompt, re.S)
+        return str(stub_score(match.group(1) if match else prompt))
+
+
+def redirect_outputs(workdir, modules):
+    """Fait pointer les chemins de sortie des modules du pipeline vers `workdir`."""
+    base = os.path.join(config.SRC_DIR, config.OUTPUT_DIR)
+    values = {"OUTPUT_DIR": workdir}
+    for name in PATH_NAMES:
+        values[name] = os.path.join(workdir, os.path.relpath(getattr(config, name), base))
+    for module in modules:
+        for name, value in values.items():
+            if hasattr(module, name):
+                setattr(module, name, value)
+
+
+def isolate_caches(workdir, modules, llm_cache=False):
+    """Caches propres au banc: rien n'est relu d'un run réel (LLM désactivé sauf `llm_cache`)."""
+    for module in modules:
+        if hasattr(module, "get_llm_cache") and not llm_cache:
+            module.get_llm_cache = lambda: None
+    import faces
+    import probe
+    face_cache = DiskCache(os.path.join(workdir, "cache", "faces"))
+    probe_cache = DiskCache(os.path.join(workdir, "cache", "probe"))
+    faces.get_face_cache = lambda: face_cache
+    probe.get_probe_cache = lambda: probe_cache
+
+
+def _check(result, stage):
+    if isinstance(result, dict) and result.get("success") is False:
+        raise RuntimeError(f"{stage}: {result.get('error')}")
+    return result
+
+
+def timed(stage, fn, *args, **kwargs):
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = _check(fn(*args, **kwargs), stage)
+    return result, {"stage": stage, "seconds": round(time.perf_counter() - wall, 4),
+                    "cpu_seconds": round(time.process_time() - cpu, 4)}
+
+
+def bench_text_stages(minutes, latency=0.0, seed=0, refine_delay=0.0, llm_cache=False):
+    """Chronomètre fenêtres → scoring → snapping → raffinage sur une transcription synthétique."""
+    import sliding_window
+    import scoring
+    import snappe_segments
+    import refine
+    import shots
+    modules = (sliding_window, scoring, snappe_segments, refine, shots)
+
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    redirect_outputs(workdir, modules)
+    isolate_caches(workdir, modules, llm_cache)
+    refine.REFINE_DELAY = refine_delay
+
+    transcript = synthetic_transcript(minutes, seed)
+    with open(refine.TRANSCRIPT_PATH, "w", encoding="utf-8") as f:
+        json.dump(transcript, f, ensure_ascii=False)
+    client = StubLLM(latency)
+
+    rows = []
+
+    def record(row, items):
+        row.update(bench="text", video_minutes=minutes, items=items, llm_calls=client.calls - calls_before,
+                   sec_per_video_min=round(row["seconds"] / minutes, 4),
+                   video_min_per_sec=round(minutes / row["seconds"], 2) if row["seconds"] else None)
+        rows.append(row)
+
+    calls_before = client.calls
+    res, row = timed("sliding_window_segments", sliding_window.sliding_window_segments, transcript["segments"])
+    record(row, res["count"])
+
+    calls_before = client.calls
+    res, row = timed("score_segments", scoring.score_segments, client)
+    record(row, res["count"])
+
+    with open(scoring.SCORED_PATH, "r", encoding="utf-8") as f:
+        scored = json.load(f)
+    calls_before = client.calls
+    res, row = timed("snap_segments", snappe_segments.snap_segments, scored)
+    record(row, res["count"])
+
+    calls_before = client.calls
+    res, row = timed("refine_all_segments", refine.refine_all_segments, client)
+    record(row, res["count"])
+    return rows
+
+
+def bench_render(video_seconds=120.0, clips=3, clip_seconds=20.0):
+    """Chronomètre chaque variante de rendu sur une vidéo lavfi synthétique."""
+    import extract
+    import extract1
+    import extractOrigin
+    import extract_all
+    modules = (extract, extract1, extractOrigin, extract_all)
+
+    workdir = tempfile.mkdtemp(prefix="bench_render_")
+    ws = Workspace(workdir)
+    isolate_caches(workdir, modules)
+    synthetic_video(ws.video_path, video_seconds)
+
+    step = max(clip_seconds, (video_seconds - clip_seconds) / max(1, clips))
+    segments = [{"start": i * step, "end": i * step + clip_seconds, "score": 9, "text": ""}
+                for i in range(clips) if i * step + clip_seconds <= video_seconds]
+    clip_minutes = sum(s["end"] - s["start"] for s in segments) / 60.0
+
+    variants = [
+        ("extract (smart)", extract.extract_clips, {"zoom_factor": 1.2, "segments": segments, "workspace": ws}),
+        ("extract1 (center)", extract1.extract_clips, {"segments": segments, "workspace": ws}),
+        ("extractOrigin (blur)", extractOrigin.extract_clips, {"segments": segments, "workspace": ws}),
+        ("extract_all (3 styles)", extract_all.extract_clips, {"segments": segments, "workspace": ws}),
+        ("extract_all --draft", extract_all.extract_clips, {"segments": segments, "draft": True, "workspace": ws}),
+    ]
+    rows = []
+    for stage, fn, kwargs in variants:
+        _, row = timed(stage, fn, **kwargs)
+        row.update(bench="render", clips=len(segments), clip_minutes=round(clip_minutes, 3),
+                   sec_per_clip_min=round(row["seconds"] / clip_minutes, 3) if clip_minutes else None)
+        rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Banc d'essai hors ligne du pipeline (données synthétiques, LLM factice)")
+    parser.add_argument("--minutes", nargs="+", type=float, default=[10.0], help="Durées de vidéo simulées (min)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Latence du LLM factice (s par appel)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--refine-delay", type=float, default=0.0, help="Pause anti rate-limit du raffinage (config: %s s)" % config.REFINE_DELAY)
+    parser.add_argument("--llm-cache", action="store_true", help="Garde le cache LLM (mesure un run déjà en cache)")
+    parser.add_argument("--render", action="store_true", help="Chronomètre aussi les variantes de rendu (ffmpeg requis)")
+    parser.add_argument("--video-seconds", type=float, default=120.0)
+    parser.add_argument("--clips", type=int, default=3)
+    parser.add_argument("--clip-seconds", type=float, default=20.0)
+    parser.add_argument("--out", default=None, help="Fichier JSON lines où ajouter les résultats")
+    args = parser.parse_args()
+
+    rows = []
+    for minutes in args.minutes:
+        rows += bench_text_stages(minutes, args.latency, args.seed, args.refine_delay, args.llm_cache)
+    if args.render:
+        rows += bench_render(args.video_seconds, args.clips, args.clip_seconds)
+
+    run = {"run": time.strftime("%Y-%m-%dT%H:%M:%S"), "latency": args.latency, "seed": args.seed}
+    out = open(args.out, "a", encoding="utf-8") if args.out else None
+    for row in rows:
+        line = json.dumps(dict(run, **row), ensure_ascii=False)
+        print(line)
+        if out:
+            out.write(line + "\n")
+    if out:
+        out.close()
@@ -0,0 +1,82 @@
+import re
+from config import REFINE_GAP_FULL, REFINE_DISTANCE_WEIGHT
+
+# fin de phrase: . ! ? … éventuellement suivis de guillemets/parenthèses fermants
+SENTENCE_END = re.compile(r"[.!?…][\"»”’')\]]*$")
+CLAUSE_END = re.compile(r"[,;:][\"»”’')\]]*$")
+CONTEXT = 5.0  # s de transcription lus de chaque côté de la fenêtre (unité précédente/suivante)
+
+
+def _units(segments):
+    """
+    Unités entre lesquelles on peut couper: les mots horodatés par Whisper
+    si la transcription les contient (TRANSCRIBE_WORD_TIMESTAMPS), sinon les
+    segments (transcription ancienne ou externe).
+    """
+    # un segment sans parole peut avoir une liste de mots vide: seule sa clé compte
+    if segments and all("words" in s for s in segments):
+        return [(float(w["start"]), float(w["end"]), w.get("word", "").strip())
+                for s in segments for w in s["words"]]
+    return [(float(s["start"]), float(s["end"]), s.get("text", "").strip()) for s in segments]
+
+
+def _punct(text):
+    if SENTENCE_END.search(text):
+        return 1.0
+    if CLAUSE_END.search(text):
+        return 0.3
+    return 0.0
+
+
+def junctions(units, video_end):
+    """
+    Points de coupe entre unités consécutives: [(start_t, end_t, force)].
+    `start_t` = début de l'unité suivante (candidat de début de propos),
+    `end_t` = fin de l'unité précédente (candidat de fin), `force` (0-1)
+    combine ponctuation de fin de phrase et silence entre les deux.
+    """
+    points = []
+    if units and units[0][0] <= 1e-6:
+        points.append((units[0][0], units[0][0], 1.0))  # début de la vidéo
+    for prev, nxt in zip(units, units[1:]):
+        gap = max(0.0, nxt[0] - prev[1])
+        force = 0.6 * _punct(prev[2]) + 0.4 * min(1.0, gap / REFINE_GAP_FULL)
+        points.append((nxt[0], prev[1], force))
+    if units and units[-1][1] >= video_end - 1e-6:
+        points.append((units[-1][1], units[-1][1], 1.0))  # fin de la vidéo
+    return points
+
+
+def local_boundaries(candidate, index, margin, distance_weight=REFINE_DISTANCE_WEIGHT):
+    """
+    Début et fin du propos choisis dans la transcription seule: meilleure
+    coupe (ponctuation + silence, pénalisée par l'éloignement des bornes du
+    candidat) dans [start - margin, end + margin] de chaque côté.
+
+    Returns:
+        dict: {start, end, confidence} (confidence = force de la plus faible
+        des deux coupes, 0-1), ou None si aucune coupe dans la fenêtre
+    """
+    video_end = index.duration
+    c_start, c_end = float(candidate["start"]), float(candidate["end"])
+    w_start, w_end = max(0.0, c_start - margin), min(video_end, c_end + margin)
+    units = _units(index.segments_between(w_start - CONTEXT, w_end + CONTEXT))
+    points = [p for p in junctions(units, video_end) if w_start <= p[0] <= w_end or w_start <= p[1] <= w_end]
+    if not points:
+        return None
+    scale = max(margin, 1e-6)
+
+    starts = [(force - distance_weight * abs(t - c_start) / scale, t, force)
+              for t, _, force in points if w_start <= t <= w_end]
+    if not starts:
+        return None
+    _, start, start_force = max(starts)
+
+    # le propos garde au moins la moitié de la durée du candidat
+    min_end = start + 0.5 * max(0.0, c_end - c_start)
+    ends = [(force - distance_weight * abs(t - c_end) / scale, t, force)
+            for _, t, force in points if w_start <= t <= w_end and t > min_end]
+    if not ends:
+        return None
+    _, end, end_force = max(ends)
+    return {"start": start, "end": end, "confidence": round(min(start_force, end_force), 3)}
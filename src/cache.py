@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def make_key(*parts):
+    """Clé de contenu: sha256 de la sérialisation JSON des parties."""
+    return hashlib.sha256(_dumps(parts).encode("utf-8")).hexdigest()
+
+
+def file_fingerprint(path, block=1024 * 1024):
+    """
+    Empreinte rapide du contenu d'un fichier: taille + sha256 du début,
+    du milieu et de la fin (1 Mo chacun). Évite de hacher des Go de vidéo
+    tout en changeant dès que le fichier téléchargé change.
+    """
+    size = os.path.getsize(path)
+    h = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        for pos in sorted({0, max(0, size // 2 - block // 2), max(0, size - block)}):
+            f.seek(pos)
+            h.update(f.read(block))
+    return h.hexdigest()
+
+
+class DiskCache:
+    """
+    Cache clé → valeur JSON sur disque, un fichier par entrée.
+    Éviction par âge (`max_age` en s depuis l'écriture de l'entrée, même si
+    elle est souvent relue) et par taille totale (`max_bytes`, les entrées
+    les moins récemment lues partent en premier). Avec `verify`,
+    chaque entrée porte un sha256 de sa valeur, contrôlé à la lecture.
+    """
+
+    def __init__(self, directory, max_bytes=None, max_age=None, evict_every=100, verify=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.evict_every = evict_every
+        self.verify = verify
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.evict()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if self.max_age is not None and time.time() - entry["created"] > self.max_age:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            if self.verify and entry.get("sha256") != hashlib.sha256(_dumps(entry["value"]).encode("utf-8")).hexdigest():
+                print(f"⚠️ Entrée de cache corrompue supprimée: {path}")
+                os.remove(path)
+                raise FileNotFoundError(path)
+            os.utime(path)  # marque l'entrée comme récemment utilisée
+        except (ValueError, KeyError):
+            # fichier tronqué ou illisible: on le retire
+            self._remove(path)
+            with self.lock:
+                self.misses += 1
+            return default
+        except OSError:
+            with self.lock:
+                self.misses += 1
+            return default
+        with self.lock:
+            self.hits += 1
+        return entry["value"]
+
+    def set(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        entry = {"created": time.time(), "value": value}
+        if self.verify:
+            entry["sha256"] = hashlib.sha256(_dumps(value).encode("utf-8")).hexdigest()
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        with self.lock:
+            self.sets += 1
+            due = self.evict_every and self.sets % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Supprime les entrées expirées puis les plus anciennes jusqu'à repasser sous `max_bytes`."""
+        if self.max_bytes is None and self.max_age is None:
+            return
+        now = time.time()
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                # âge = "created" de l'entrée, comme dans get; mtime (relectures) ne sert qu'à l'ordre LRU.
+                # created <= mtime: une entrée non relue depuis max_age est expirée sans être lue,
+                # et un .tmp en cours d'écriture n'est jamais lu.
+                if self.max_age is not None and (now - st.st_mtime > self.max_age or (
+                        name.endswith(".json") and now - self._created(path) > self.max_age)):
+                    self._remove(path)
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        if self.max_bytes is None:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _created(path):
+        """Date de création enregistrée dans l'entrée (0 si illisible: l'entrée est alors expirée)."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return float(json.load(f)["created"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0.0
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "sets": self.sets,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
@@ -0,0 +1,83 @@
+import os
+import json
+import time
+import threading
+from cache import file_fingerprint, make_key
+
+
+class Checkpoints:
+    """
+    Manifeste de reprise d'un workspace (checkpoints.json): pour chaque étape
+    (ou chaque clip rendu), la clé de ses entrées (empreintes des fichiers
+    amont + réglages) et l'empreinte de chacune de ses sorties.
+
+    Une étape est à jour si sa clé n'a pas changé et que ses sorties sont
+    intactes sur disque: elle est alors relue au lieu d'être recalculée.
+    Les clés aval incluent les empreintes des sorties amont, donc une étape
+    recalculée qui produit le même résultat ne relance pas la suite.
+    """
+
+    def __init__(self, path, enabled=True):
+        self.path = path
+        self.enabled = enabled  # False = tout recalculer (mais le manifeste est quand même tenu à jour)
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    @staticmethod
+    def key(stage, *parts):
+        return make_key("checkpoint", stage, *parts)
+
+    def get(self, stage):
+        with self.lock:
+            return self.entries.get(stage)
+
+    def fresh(self, stage, key):
+        """True si `stage` a déjà tourné avec cette clé et que ses sorties n'ont pas bougé."""
+        entry = self.get(stage)
+        if not self.enabled or not entry or entry["key"] != key:
+            return False
+        for path, fingerprint in entry["outputs"].items():
+            try:
+                if file_fingerprint(path) != fingerprint:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def done(self, stage, key, outputs, **data):
+        """Enregistre une étape réussie: clé d'entrée, empreinte des sorties, données libres."""
+        entry = dict(data, key=key, outputs={p: file_fingerprint(p) for p in outputs}, ts=round(time.time(), 3))
+        with self.lock:
+            self.entries[stage] = entry
+            self._save()
+        return entry
+
+    def partial(self, stage, outputs, **data):
+        """
+        Enregistre une étape terminée avec des échecs (appels LLM ratés...):
+        l'aval voit l'empreinte de ses sorties, mais elle n'est jamais à jour,
+        donc la prochaine reprise la relance (le cache LLM évite de repayer le reste).
+        """
+        return self.done(stage, None, outputs, partial=True, **data)
+
+    def output_key(self, stage):
+        """Empreinte des sorties de `stage`, à inclure dans la clé des étapes aval."""
+        entry = self.get(stage)
+        return make_key(entry["outputs"]) if entry else None
+
+    def drop(self, stage):
+        with self.lock:
+            if self.entries.pop(stage, None) is not None:
+                self._save()
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)  # jamais de manifeste à moitié écrit si le run est interrompu
@@ -0,0 +1,109 @@
+"""
+Scoring par morceaux: la transcription est découpée en morceaux contigus
+sans chevauchement (un par pas, SCORE_CHUNK_SIZE), notés une seule fois par
+le LLM. La note de n'importe quelle fenêtre [a, b] est ensuite la moyenne
+des notes des morceaux qu'elle couvre, pondérée par le temps, calculée par
+sommes cumulées: changer WINDOW_SIZE/STEP_SIZE ne coûte aucun appel.
+
+    python src/chunks.py --window 30 50 80 --step 5 10
+"""
+import sys
+import json
+import numpy as np
+from config import CHUNKS_PATH, SCORED_PATH, WINDOW_SIZE, STEP_SIZE, SCORE_CHUNK_SIZE, TRANSCRIPT_PATH
+
+
+def build_chunks(segments, size=SCORE_CHUNK_SIZE):
+    """Morceaux contigus de `size` secondes [{start, end, text}] (fenêtres glissantes avec pas = taille)."""
+    from sliding_window import build_windows
+    return build_windows(segments, size, size)
+
+
+class ChunkCurve:
+    """
+    Courbe de notes constante par morceau. Les intégrales cumulées des notes
+    et du temps couvert donnent la note moyenne de n'importe quelle plage en
+    O(log n), et de toutes les fenêtres d'un coup (NumPy).
+    Les morceaux sans note (échec LLM, note < 0) et ceux écartés par le
+    pré-tri local (note 0 de remplissage, "prefiltered") ne comptent pas.
+    """
+
+    def __init__(self, chunks):
+        chunks = sorted(chunks, key=lambda c: c["start"])
+        self.starts = np.array([c["start"] for c in chunks], dtype=np.float64)
+        self.lengths = np.maximum(np.array([c["end"] for c in chunks], dtype=np.float64) - self.starts, 0.0)
+        scores = np.array([-1 if c.get("prefiltered") else c.get("score", -1) for c in chunks], dtype=np.float64)
+        self.valid = (scores >= 0).astype(np.float64)
+        self.scores = np.where(scores >= 0, scores, 0.0)
+        self.cum_score = np.concatenate(([0.0], np.cumsum(self.scores * self.lengths)))
+        self.cum_time = np.concatenate(([0.0], np.cumsum(self.valid * self.lengths)))
+
+    def _integral(self, x, cum, density):
+        """Intégrale de 0 à x (vectorisée) d'une grandeur constante par morceau."""
+        x = np.asarray(x, dtype=np.float64)
+        i = np.searchsorted(self.starts, x, side="right") - 1
+        inside = i >= 0
+        j = np.where(inside, i, 0)
+        partial = density[j] * np.clip(x - self.starts[j], 0.0, self.lengths[j])
+        return np.where(inside, cum[j] + partial, 0.0)
+
+    def mean(self, a, b):
+        """Note moyenne sur [a, b] (tableaux acceptés); NaN si aucun morceau noté n'est couvert."""
+        score = self._integral(b, self.cum_score, self.scores) - self._integral(a, self.cum_score, self.scores)
+        time = self._integral(b, self.cum_time, self.valid) - self._integral(a, self.cum_time, self.valid)
+        return np.divide(score, time, out=np.full(np.shape(score), np.nan), where=time > 1e-9)
+
+
+def score_from_chunks(windows, chunks):
+    """Note chaque fenêtre {start, end, text} à partir des morceaux notés (format scored.json)."""
+    if not windows:
+        return windows
+    curve = ChunkCurve(chunks)
+    means = curve.mean([w["start"] for w in windows], [w["end"] for w in windows])
+    for w, value in zip(windows, means):
+        w["score"] = -1 if np.isnan(value) else round(float(value), 2)
+    return windows
+
+
+def sweep(chunks, segments, window_sizes, step_sizes, top=5):
+    """Meilleures fenêtres pour chaque couple (taille, pas), sans aucun appel LLM."""
+    from sliding_window import build_windows
+    rows = []
+    for size in window_sizes:
+        for step in step_sizes:
+            windows = score_from_chunks(build_windows(segments, size, step), chunks)
+            best = sorted(windows, key=lambda w: w["score"], reverse=True)[:top]
+            rows.append({
+                "window_size": size,
+                "step_size": step,
+                "windows": len(windows),
+                "top": [{"start": w["start"], "end": w["end"], "score": w["score"]} for w in best],
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Notes de fenêtres dérivées des morceaux déjà notés (chunks.json)")
+    parser.add_argument("--window", nargs="+", type=float, default=[WINDOW_SIZE], help="Tailles de fenêtre (s)")
+    parser.add_argument("--step", nargs="+", type=float, default=[STEP_SIZE], help="Pas (s)")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--write", action="store_true", help="Réécrit scored.json (une seule taille et un seul pas)")
+    args = parser.parse_args()
+    try:
+        with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        with open(TRANSCRIPT_PATH, "r", encoding="utf-8") as f:
+            segments = json.load(f)["segments"]
+        if args.write:
+            from sliding_window import build_windows
+            scored = score_from_chunks(build_windows(segments, args.window[0], args.step[0]), chunks)
+            with open(SCORED_PATH, "w", encoding="utf-8") as f:
+                json.dump(scored, f, ensure_ascii=False, indent=2)
+            result = {"success": True, "count": len(scored), "path": SCORED_PATH}
+        else:
+            result = {"success": True, "sweep": sweep(chunks, segments, args.window, args.step, args.top)}
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+    print(json.dumps(result, ensure_ascii=False))
+    sys.exit(0 if result["success"] else 1)
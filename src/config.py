@@ -8,8 +8,51 @@ SCORED_PATH = os.path.join(SRC_DIR, OUTPUT_DIR, "scored.json")
 CLIPS_JSON = os.path.join(SRC_DIR, OUTPUT_DIR, "clips.json")
 SNAPPED_PATH = os.path.join(SRC_DIR, OUTPUT_DIR, "snapped.json")
 REFINED_PATH = os.path.join(SRC_DIR, OUTPUT_DIR, "refined.json")
+AUDIO_PATH = os.path.join(SRC_DIR, OUTPUT_DIR, "audio.m4a")        # mode audio d'abord
+SECTIONS_PATH = os.path.join(SRC_DIR, OUTPUT_DIR, "sections.json")  # plages vidéo téléchargées
+SHOTS_PATH = os.path.join(SRC_DIR, OUTPUT_DIR, "shots.json")        # coupes de plan de video.mkv
+DRAFTS_DIR = os.path.join(SRC_DIR, OUTPUT_DIR, "drafts")            # aperçus basse résolution
+DRAFTS_JSON = os.path.join(SRC_DIR, OUTPUT_DIR, "drafts.json")      # décisions de cadrage des aperçus
+CHUNKS_PATH = os.path.join(SRC_DIR, OUTPUT_DIR, "chunks.json")      # morceaux notés (SCORE_MODE = "chunks")
+REPORT_PATH = os.path.join(SRC_DIR, OUTPUT_DIR, "run_report.jsonl") # mesures par étape du dernier run
+PROFILE_DIR = os.path.join(SRC_DIR, OUTPUT_DIR, "profiles")         # cProfile des étapes profilées
+# hors de OUTPUT_DIR: le workflow n8n déplace tout le contenu de output/ après chaque vidéo
+CACHE_DIR = os.path.join(SRC_DIR, "cache")
 
 
+WHISPER_MODEL = "tiny"
+TRANSCRIPT_CACHE_ENABLED = True
+TRANSCRIPT_CACHE_DIR = os.path.join(CACHE_DIR, "transcripts")
+TRANSCRIPT_CACHE_MAX_BYTES = 500 * 1024 * 1024  # LRU: les transcriptions les moins relues partent en premier
+PROBE_CACHE_DIR = os.path.join(CACHE_DIR, "probe")  # métadonnées ffprobe (dims, fps, images clés, audio)
+PROBE_CACHE_MAX_BYTES = 50 * 1024 * 1024
+AUDIO_SAMPLE_RATE = 16000       # Hz, PCM mono float32 décodé une fois à côté de la vidéo
+TRANSCRIBE_WORKERS = 1          # >1 = découpe aux silences + transcription en parallèle (processus)
+TRANSCRIBE_CHUNK_SEC = 300.0    # s, durée cible d'un morceau en mode parallèle
+TRANSCRIBE_SPLIT_SEARCH = 20.0  # s, fenêtre de recherche d'un silence autour de chaque coupe
+TRANSCRIBE_FP16 = None          # Whisper en fp16: None = auto (si CUDA disponible), True/False pour forcer
+TRANSCRIBE_WORD_TIMESTAMPS = True  # horodatage des mots (coupes au mot près pour le raffinage local des bornes)
+
+SECTION_MARGIN = 3.0            # s, marge autour de chaque plage vidéo (coupes sur keyframe)
+SECTION_FORCE_KEYFRAMES = False # True = coupe exacte (ré-encodage par yt-dlp/ffmpeg)
+
+RENDER_WORKERS = 0              # clips rendus en parallèle (0 = auto: cœurs / RENDER_THREADS_PER_JOB)
+RENDER_THREADS_PER_JOB = 4      # threads ffmpeg visés par clip en mode auto
+DRAFT_SIZE = (360, 640)         # px, aperçus de relecture (même cadrage que le rendu final)
+DRAFT_FPS = 15
+DRAFT_CRF = 32
+
+FACE_SAMPLE_FPS = 1.0           # images analysées par seconde de clip pour la détection de visage
+FACE_SAMPLE_WIDTH = 480         # px, largeur des images décodées pour la détection
+FACE_MERGE_GAP = 30.0           # s, clips plus proches que ça lus dans le même passage ffmpeg
+FACE_CACHE_DIR = os.path.join(CACHE_DIR, "faces")
+
+SHOT_SAMPLE_FPS = 5.0           # images/s analysées pour détecter les coupes de plan
+SHOT_SAMPLE_SIZE = (96, 54)     # px, images minuscules: seule la différence entre images compte
+SHOT_THRESHOLD = 0.4            # distance d'histogramme (0-1) au-delà de laquelle on coupe
+SHOT_MIN_LEN = 1.0              # s, durée minimale d'un plan
+SHOT_SNAP_TOL = 1.0             # s, une coupe de plan à moins de ça d'une borne la remplace
+
 YOUTUBE_URL = "https://www.youtube.com/watch?v=X7aF3nZOS98&list=RDX2DTROC4JCI&index=32"
 
 MAX_BLOCK_DURATION = 50.0
@@ -17,14 +60,61 @@ N_TOP_SEGMENTS = 3
 WINDOW_SIZE = 20.0
 WINDOW_SIZE = 50.0           # s
 STEP_SIZE = 10.0             # s
+SCORE_MODE = "windows"       # "windows": chaque fenêtre au LLM; "chunks": morceaux notés une fois, fenêtres dérivées;
+                             # "hierarchical": grandes fenêtres d'abord, puis fenêtres fines dans les meilleures zones
+SCORE_CHUNK_SIZE = STEP_SIZE # s, taille des morceaux du mode "chunks"
+SCORE_HIER_LEVELS = [        # niveaux grossiers du mode "hierarchical", du plus large au plus fin
+    {"window": 240.0, "step": 120.0, "keep": 8},   # keep = zones gardées (budget) pour le niveau suivant
+]
+SCORE_HIER_MAX_WINDOWS = None  # budget du niveau final (WINDOW_SIZE/STEP_SIZE): fenêtres notées max, sans pré-tri (None = toutes)
 SCORE_PARALLEL_WORKERS = 5   # threads LLM
+SCORE_BATCH_SIZE = 1          # fenêtres par requête LLM (1 = une requête par fenêtre)
+SCORE_BATCH_MAX_TOKENS = 6000 # budget tokens d'entrée par requête groupée
+SCORE_MAX_RPS = 5.0          # requêtes/s max vers l'API LLM (0 = illimité)
+SCORE_MAX_TPM = 500000       # tokens/min max vers l'API LLM (0 = illimité)
+PREFILTER_ENABLED = False    # pré-tri local des fenêtres avant le LLM (désactivé: toutes les fenêtres sont notées)
+PREFILTER_KEEP = 0.5         # fraction des fenêtres (meilleur score local) envoyée au LLM
+PREFILTER_CUTOFF = None      # score local mini (z-score pondéré); remplace PREFILTER_KEEP si défini
+PREFILTER_MIN_WORDS = 8      # fenêtres presque vides: jamais envoyées
+PREFILTER_WEIGHTS = {        # poids des caractéristiques (centrées-réduites sur la vidéo)
+    "speech_rate": 1.0,
+    "novelty": 1.0,
+    "marks": 0.5,
+    "avg_logprob": 0.5,
+    "no_speech_prob": -1.0,
+}
+LLM_MAX_RETRIES = 5          # tentatives supplémentaires sur 429/5xx
+LLM_BACKOFF_BASE = 1.0       # s, backoff exponentiel si pas de Retry-After
+LLM_BACKOFF_MAX = 60.0       # s
 MERGE_THRESHOLD = 8          # score mini à garder/fusionner
 TOP_K = 3
 MARGIN = 10.0                # s, marge auto avant/après un passage pertinent
+REFINE_DELAY = 2.0           # s, pause anti rate-limit après chaque appel de raffinage
+REFINE_LOCAL = True          # raffinage local (ponctuation, silences, horodatage des mots) avant le LLM
+REFINE_MIN_CONFIDENCE = 0.6  # confiance (0-1) sous laquelle le raffinage local passe la main au LLM
+REFINE_GAP_FULL = 0.6        # s, silence à partir duquel une coupe est jugée franche
+REFINE_DISTANCE_WEIGHT = 0.3 # pénalité d'éloignement (par marge) des bornes du candidat
 SILENCE_MIN_GAP = 0.2        # s, silence “long” entre deux phrases
 SILENCE_SNAP_TOL = 1.0 
 
 
 # API LLM
 MISTRAL_KEY = "sVyGpa0WRQU3vsPF5LQ9557MdQlDLuQe"
-MODEL_NAME = "mistral-tiny-latest"
\ No newline at end of file
+MODEL_NAME = "mistral-tiny-latest"
+LLM_CACHE_ENABLED = True
+LLM_CACHE_DIR = os.path.join(CACHE_DIR, "llm")
+LLM_CACHE_MAX_BYTES = 200 * 1024 * 1024
+LLM_CACHE_MAX_AGE = 30 * 24 * 3600  # s
+SCORE_PROMPT_VERSION = 1     # à incrémenter dès que le prompt de scoring change
+REFINE_PROMPT_VERSION = 1    # idem pour le prompt de raffinage
+MISTRAL_SERVER_URL = os.environ.get("MISTRAL_SERVER_URL")  # ex: http://127.0.0.1:8080 pour un serveur Mistral local (stub)
+
+# Instrumentation
+METRICS_TEXTFILE = os.environ.get("METRICS_TEXTFILE")  # ex: /var/lib/node_exporter/textfile/clipper.prom
+PROFILE_STAGES = tuple(s for s in os.environ.get("PROFILE_STAGES", "").split(",") if s)  # ex: "score,render" ou "all"
+
+# Worker multi-vidéos (src/worker.py): un workspace par vidéo dans JOBS_DIR
+JOBS_DIR = os.path.join(SRC_DIR, "jobs")
+WORKER_JOBS = 3          # vidéos traitées en même temps (un processus chacune)
+WORKER_CPU_SLOTS = 1     # étapes CPU simultanées, tous jobs confondus (transcription, coupes, rendu)
+WORKER_IO_SLOTS = 3      # étapes réseau/LLM simultanées (téléchargement, scoring, raffinage)
\ No newline at end of file
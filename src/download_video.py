@@ -1,25 +1,123 @@
-import sys, json, yt_dlp
-from config import YOUTUBE_URL, VIDEO_PATH, OUTPUT_DIR
+import os, sys, json
+from config import (
+    YOUTUBE_URL, VIDEO_PATH, SECTIONS_PATH, REFINED_PATH,
+    SECTION_MARGIN, SECTION_FORCE_KEYFRAMES,
+)
+from workspace import default_workspace
 
-def download_video(url):
-    ydl_opts = {
-        "format": "bv*[ext=mp4][height<=1080]+ba[ext=m4a]/b[ext=mp4]",
-        "merge_output_format": "mp4",
-        "outtmpl": VIDEO_PATH,
+VIDEO_FORMAT = "bv*[ext=mp4][height<=1080]+ba[ext=m4a]/b[ext=mp4]"
+
+def _base_opts(outtmpl):
+    return {
+        "outtmpl": outtmpl,
         "noplaylist": True,
         "ignoreerrors": True,
         "continuedl": True,
+        # mtime = date de téléchargement (et non date d'upload): les caches comparent les mtimes
+        "updatetime": False,
         "quiet": True,
     }
+
+def download_video(url, workspace=None):
+    ws = workspace or default_workspace()
+    ydl_opts = _base_opts(ws.video_path)
+    ydl_opts.update({
+        "format": VIDEO_FORMAT,
+        "merge_output_format": "mp4",
+    })
+    try:
+        import yt_dlp
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            ydl.download([url])
+        return {"success": True, "path": ws.video_path}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def download_audio(url, workspace=None):
+    """
+    Phase 1 du mode audio d'abord: ne récupère que la piste audio, pour
+    lancer transcription et scoring sans attendre la vidéo complète.
+    """
+    ws = workspace or default_workspace()
+    # "/b": une URL directe (fichier servi en HTTP) n'expose qu'un seul format
+    ydl_opts = _base_opts(ws.audio_path)
+    ydl_opts["format"] = "ba[ext=m4a]/ba/b"
     try:
+        import yt_dlp
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             ydl.download([url])
-        return {"success": True, "path": VIDEO_PATH}
+        if not os.path.exists(ws.audio_path):
+            return {"success": False, "error": f"Audio non téléchargé: {url}"}
+        return {"success": True, "path": ws.audio_path}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def download_sections(url, segments, margin=SECTION_MARGIN, workspace=None):
+    """
+    Phase 2 du mode audio d'abord: télécharge uniquement les plages vidéo
+    nécessaires aux segments raffinés (+ `margin` secondes de chaque côté,
+    pour que la coupe sur keyframe tombe avant le vrai début).
+
+    Returns:
+        dict: {success, sections: [{path, offset, start, end}]} aligné sur `segments`
+    """
+    ws = workspace or default_workspace()
+    try:
+        import yt_dlp
+        from yt_dlp.utils import download_range_func
+        sections = []
+        for i, seg in enumerate(segments):
+            lo = max(0.0, float(seg["start"]) - margin)
+            hi = float(seg["end"]) + margin
+            path = ws.path(f"section_{i}.mp4")
+            ydl_opts = _base_opts(path)
+            ydl_opts.update({
+                "format": VIDEO_FORMAT + "/b",
+                "merge_output_format": "mp4",
+                "download_ranges": download_range_func(None, [(lo, hi)]),
+                "force_keyframes_at_cuts": SECTION_FORCE_KEYFRAMES,
+            })
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                ydl.download([url])
+            if not os.path.exists(path):
+                return {"success": False, "error": f"Plage {lo:.1f}s → {hi:.1f}s non téléchargée"}
+            # offset = temps source correspondant au t=0 du fichier de la plage
+            sections.append({"path": path, "offset": lo, "start": lo, "end": hi})
+            print(f"🎞️ Plage {i}: {lo:.1f}s → {hi:.1f}s")
+
+        with open(ws.sections_path, "w", encoding="utf-8") as f:
+            json.dump(sections, f, ensure_ascii=False, indent=2)
+        return {"success": True, "sections": sections, "path": ws.sections_path}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def load_sections(path=SECTIONS_PATH):
+    """Plages téléchargées par download_sections (None si le mode n'a pas été utilisé)."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def source_for(i, start, sections=None, video_path=VIDEO_PATH):
+    """Fichier à lire pour le segment `i` et début local dans ce fichier."""
+    if sections:
+        sec = sections[i]
+        return sec["path"], max(0.0, start - sec["offset"])
+    return video_path, start
+
 if __name__ == "__main__":
-    sys.argv[1]
-    result = download_video(sys.argv[1])
+    import argparse
+    parser = argparse.ArgumentParser(description="Téléchargement de la vidéo (complète, audio seul, ou plages)")
+    parser.add_argument("url")
+    parser.add_argument("--audio-only", action="store_true", help="Phase 1: piste audio uniquement")
+    parser.add_argument("--sections", action="store_true", help="Phase 2: plages vidéo des segments de refined.json")
+    args = parser.parse_args()
+    if args.audio_only:
+        result = download_audio(args.url)
+    elif args.sections:
+        with open(REFINED_PATH, "r", encoding="utf-8") as f:
+            result = download_sections(args.url, json.load(f))
+    else:
+        result = download_video(args.url)
     print(json.dumps(result, ensure_ascii=False))
     sys.exit(0 if result["success"] else 1)
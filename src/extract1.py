@@ -1,94 +1,80 @@
 import os
+import sys
 import json
-import subprocess
-from config import OUTPUT_DIR, VIDEO_PATH, REFINED_PATH, SRC_DIR
+from config import REFINED_PATH
+from download_video import load_sections, source_for
+from workspace import default_workspace
+from render import STYLES, render_clip, execute_jobs, save_clips_manifest
+from probe import dims as probe_dims
 
 
-def run(cmd):
-    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    if proc.returncode != 0:
-        raise RuntimeError(f"Command failed: {' '.join(cmd)}\n{proc.stderr}")
-    return proc.stdout
+def build_filter(dims, zoom_factor=1.0):
+    """Gabarit de graphe : crop centré avec zoom puis upscale (style "center" d'extract_all.py)."""
+    return STYLES["center"]["graph"](dims, zoom_factor)
 
 
-def process_clip(tmp_clip, output_clip, zoom_factor=1.0):
+def process_clip(source, output_clip, zoom_factor=1.0, start=0.0, duration=None):
     """
-    Met en forme une vidéo en 9:16 plein écran avec crop + zoom.
+    Met en forme une vidéo en 9:16 plein écran avec crop + zoom, en un seul
+    passage ffmpeg directement depuis la source.
     
     Args:
-        tmp_clip (str): chemin du clip d'entrée
+        source (str): chemin de la vidéo source
         output_clip (str): chemin du clip de sortie
         zoom_factor (float): facteur de zoom (1.0 = normal, >1 = zoom)
+        start (float): début du clip dans la source (s)
+        duration (float): durée du clip (s), None = jusqu'à la fin
     """
-    # Filtre vidéo FFmpeg : scale + crop centré avec zoom
-    vf_filter = (
-        f"scale=-2:{int(1920*zoom_factor)},"
-        f"crop=1080:1920:(in_w-1080)/2:(in_h-1920)/2"
-    )
+    if duration is None:
+        duration = 24 * 3600.0
+    render_clip(source, start, duration, build_filter(probe_dims(source), zoom_factor), output_clip)
 
-    run([
-        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
-        "-i", tmp_clip,
-        "-vf", vf_filter,
-        "-r", "30",
-        "-c:v", "libx264", "-preset", "medium", "-crf", "18",  # 👈 qualité haute
-        "-pix_fmt", "yuv420p",
-        "-c:a", "aac", "-b:a", "128k",
-        "-movflags", "+faststart",
-        output_clip
-    ])
 
-
-def extract_clips(zoom_factor=1.2):
+def extract_clips(zoom_factor=1.2, segments=None, sections=None, single_pass=False, workspace=None, manifest=True):
     """
     Extrait des clips vidéo à partir d'une liste de segments.
 
     Args:
         zoom_factor (float): facteur de zoom appliqué lors du recadrage
+        segments (list): segments raffinés déjà en mémoire (sinon lus depuis refined.json)
+        sections (list): plages téléchargées par download_sections (None = VIDEO_PATH complète)
+        single_pass (bool): rend tous les clips d'une même source en une seule invocation ffmpeg
+        workspace (Workspace): dossier de la vidéo et des clips (défaut: OUTPUT_DIR)
+        manifest (bool): écrit clips.json (False: l'appelant écrit un manifeste commun)
     """
-    clips_path = []
-    with open(REFINED_PATH, "r", encoding="utf-8") as f:
-        segments = json.load(f)
+    ws = workspace or default_workspace()
+    if segments is None:
+        with open(REFINED_PATH, "r", encoding="utf-8") as f:
+            segments = json.load(f)
 
+    jobs = []
     for i, seg in enumerate(segments):
         start = max(0.0, float(seg["start"]))
         end = max(start, float(seg["end"]))
         duration = max(0.01, end - start)
 
-        tmp_clip = os.path.join(SRC_DIR, OUTPUT_DIR, f"_tmp_clip_v1_{i}.mp4")
-        output_clip = os.path.join(SRC_DIR, OUTPUT_DIR, f"clip_v1_{i}.mp4")
-
-        # 1) Découpage rapide (stream copy)
-        run([
-            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
-            "-ss", f"{start:.3f}",
-            "-t", f"{duration:.3f}",
-            "-i", VIDEO_PATH,
-            "-c", "copy",
-            tmp_clip
-        ])
-        print(f"🎬 Clip {i}: {tmp_clip} ({seg['start']:.2f}s → {seg['end']:.2f}s, score={seg.get('score')})")
-
-        # 2) Mise en forme finale avec zoom
-        process_clip(tmp_clip, output_clip, zoom_factor=zoom_factor)
+        output_clip = ws.path(f"clip_v1_{i}.mp4")
+        source, local_start = source_for(i, start, sections, ws.video_path)
+        print(f"🎬 Clip {i}: {output_clip} ({seg['start']:.2f}s → {seg['end']:.2f}s, score={seg.get('score')})")
 
-        clips_path.append(output_clip)
+        # Mise en forme finale avec zoom, directement depuis la source
+        jobs.append({
+            "source": source, "start": local_start, "duration": duration,
+            "graph": build_filter(probe_dims(source), zoom_factor), "output": output_clip,
+        })
 
-        try:
-            os.remove(tmp_clip)
-        except Exception:
-            pass
+    results = execute_jobs(jobs, single_pass=single_pass)
 
-    # Sauvegarde des chemins de clips
-    clips_json = {"clips": clips_path}
-    clips_file = os.path.join(SRC_DIR, OUTPUT_DIR, "clips.json")
-    with open(clips_file, "w", encoding="utf-8") as f:
-        json.dump(clips_json, f, ensure_ascii=False, indent=2)
+    # Sauvegarde des chemins de clips (ordre des segments, erreurs à part)
+    clips_file = ws.clips_json if manifest else None
+    clips_json = save_clips_manifest(results, clips_file)
 
-    print(f"✅ Clips sauvegardés dans {clips_file}")
+    if clips_file:
+        print(f"✅ Clips sauvegardés dans {clips_file}")
     return clips_json
 
 
 if __name__ == "__main__":
-    result = extract_clips(zoom_factor=1.2)  # 👈 Ajuste ici (1.0 = normal, 1.5 = zoom fort)
+    sections = load_sections() if "--sections" in sys.argv else None
+    result = extract_clips(zoom_factor=1.2, sections=sections, single_pass="--single-pass" in sys.argv)  # 👈 Ajuste ici (1.0 = normal, 1.5 = zoom fort)
     print("Extraction terminée", result)
@@ -0,0 +1,237 @@
+import os
+import json
+from config import REFINED_PATH, DRAFT_SIZE
+from download_video import load_sections, source_for
+from workspace import default_workspace
+from checkpoints import Checkpoints
+from shots import load_shot_index
+from probe import dims as probe_dims
+from cache import file_fingerprint
+from render import STYLES, OUT_W, OUT_H, DRAFT_ENCODE_ARGS, ENCODE_ARGS, render_jobs
+
+
+def plan_segments(styles, zoom_factor=1.2, smart_zoom=True, segments=None, sections=None, shots=None, workspace=None):
+    """
+    Décisions de rendu de chaque segment, indépendantes de la qualité
+    d'encodage: source, plage locale, dimensions et centre de visage.
+    Un aperçu et son rendu final partagent exactement ces décisions.
+    """
+    # import tardif: cv2 n'est chargé que si on rend réellement des clips
+    from faces import face_centers_for_clips
+
+    unknown = [s for s in styles if s not in STYLES]
+    if unknown:
+        raise ValueError(f"Styles inconnus: {unknown}")
+    ws = workspace or default_workspace()
+    if segments is None:
+        with open(REFINED_PATH, "r", encoding="utf-8") as f:
+            segments = json.load(f)
+
+    dims_by_source = {}
+    clips = []
+    for i, seg in enumerate(segments):
+        start = max(0.0, float(seg["start"]))
+        end = max(start, float(seg["end"]))
+        source, local_start = source_for(i, start, sections, ws.video_path)
+        # tous les clips d'une source en partagent les dimensions: un seul ffprobe
+        if source not in dims_by_source:
+            dims_by_source[source] = probe_dims(source)
+        clips.append((source, local_start, max(0.01, end - start)))
+
+    # visages de tous les segments en un passage de décodage par source
+    centers = [None] * len(clips)
+    if smart_zoom and any(STYLES[s]["face"] for s in styles):
+        # les coupes sont en temps de VIDEO_PATH: inutilisables sur des sections
+        by_source = {ws.video_path: shots} if shots is not None and not sections else None
+        centers = face_centers_for_clips(clips, dims_by_source, shots=by_source)
+
+    entries = []
+    for i, (seg, (source, local_start, duration), center) in enumerate(zip(segments, clips, centers)):
+        start = max(0.0, float(seg["start"]))
+        entries.append({
+            "index": i,
+            "start": start,
+            "end": max(start, float(seg["end"])),
+            "score": seg.get("score"),
+            "source": source,
+            "local_start": local_start,
+            "duration": duration,
+            "dims": list(dims_by_source[source]),
+            "face_center": list(center) if center else None,
+        })
+    return entries
+
+
+def render_entries(entries, styles, zoom_factor, draft=False, workspace=None, checkpoints=None):
+    """
+    Rend les segments planifiés: un ffmpeg par segment, `split` vers chaque
+    style. `styles` est une liste commune ou un dict {index: [styles]}.
+    Remplit "variants", "ok" et "render_seconds" de chaque entrée.
+    Avec `checkpoints`, un segment dont la source, la plage, les graphes et
+    l'encodage n'ont pas changé (et dont les fichiers sont intacts) est gardé tel quel.
+    """
+    ws = workspace or default_workspace()
+    size = DRAFT_SIZE if draft else (OUT_W, OUT_H)
+    out_dir = ws.drafts_dir if draft else ws.root
+    encode_args = DRAFT_ENCODE_ARGS if draft else ENCODE_ARGS
+    os.makedirs(out_dir, exist_ok=True)
+
+    fingerprints = {}
+    jobs, pending = [], []
+    for entry in entries:
+        names = styles[entry["index"]] if isinstance(styles, dict) else styles
+        center = tuple(entry["face_center"]) if entry["face_center"] else None
+        variants, outputs = {}, []
+        for name in names:
+            style = STYLES[name]
+            path = os.path.join(out_dir, style["filename"].format(i=entry["index"]))
+            graph = style["graph"](entry["dims"], zoom_factor, center if style["face"] else None, size=size)
+            outputs.append((graph, path))
+            variants[name] = path
+        entry["variants"] = variants
+        entry.pop("error", None)
+
+        stage = f"{'draft' if draft else 'clip'}_{entry['index']}"
+        key = None
+        if checkpoints is not None:
+            source = entry["source"]
+            if source not in fingerprints:
+                fingerprints[source] = file_fingerprint(source) if os.path.exists(source) else None
+            key = checkpoints.key(stage, fingerprints[source], round(entry["local_start"], 3),
+                                  round(entry["duration"], 3), outputs, encode_args)
+            if checkpoints.fresh(stage, key):
+                print(f"♻️ Segment {entry['index']}: déjà rendu")
+                entry.update(ok=True, render_seconds=0.0, resumed=True)
+                continue
+        entry.pop("resumed", None)
+        print(f"🎬 Segment {entry['index']}: {entry['start']:.2f}s → {entry['end']:.2f}s, "
+              f"score={entry.get('score')}, styles={list(names)}{' (aperçu)' if draft else ''}")
+        pending.append((entry, stage, key))
+        jobs.append({
+            "source": entry["source"], "start": entry["local_start"], "duration": entry["duration"],
+            "outputs": outputs, "encode_args": encode_args,
+        })
+
+    results = render_jobs(jobs)
+
+    for (entry, stage, key), result in zip(pending, results):
+        entry["ok"] = result["ok"]
+        entry["render_seconds"] = result["seconds"]
+        if not result["ok"]:
+            entry["error"] = result["error"]
+        elif checkpoints is not None:
+            checkpoints.done(stage, key, list(entry["variants"].values()))
+
+    clips, errors = [], []
+    for entry in entries:
+        if entry["ok"]:
+            clips.extend(entry["variants"].values())
+        else:
+            errors.append({"index": entry["index"], "error": entry["error"]})
+    return clips, errors
+
+
+def _write_manifest(path, clips, styles, entries, errors, **extra):
+    manifest = dict({"clips": clips, "styles": list(styles), "segments": entries}, **extra)
+    if errors:
+        manifest["errors"] = errors
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def extract_clips(styles=("smart", "center", "blur"), zoom_factor=1.2, smart_zoom=True, segments=None, sections=None,
+                  shots=None, draft=False, workspace=None, checkpoints=None):
+    """
+    Rend tous les styles demandés pour chaque segment en décodant chaque
+    segment une seule fois (un ffmpeg par segment, `split` vers chaque style),
+    puis écrit un manifeste unique listant toutes les variantes.
+
+    Args:
+        styles (iterable): styles parmi render.STYLES ("smart", "center", "blur")
+        zoom_factor (float): facteur de zoom des styles recadrés
+        smart_zoom (bool): détection de visage pour les styles qui l'utilisent
+        segments (list): segments raffinés déjà en mémoire (sinon lus depuis refined.json)
+        sections (list): plages téléchargées par download_sections (None = VIDEO_PATH complète)
+        shots (ShotIndex): coupes de plan de VIDEO_PATH (une détection de visage par plan)
+        draft (bool): aperçus basse résolution `ultrafast` dans DRAFTS_DIR, décisions
+            de cadrage enregistrées dans drafts.json pour promote_drafts
+        workspace (Workspace): dossier de la vidéo, des clips et des manifestes (défaut: OUTPUT_DIR)
+        checkpoints (Checkpoints): saute les segments déjà rendus à l'identique
+    """
+    ws = workspace or default_workspace()
+    entries = plan_segments(styles, zoom_factor, smart_zoom, segments, sections, shots, workspace=ws)
+    clips, errors = render_entries(entries, styles, zoom_factor, draft=draft, workspace=ws, checkpoints=checkpoints)
+
+    if draft:
+        manifest = _write_manifest(ws.drafts_json, clips, styles, entries, errors, zoom_factor=zoom_factor)
+        print(f"✅ Aperçus: {ws.drafts_dir} (supprimer ceux à rejeter, puis --promote)")
+        return manifest
+
+    # Manifeste unique: "clips" reste compatible avec l'ancien clips.json
+    manifest = _write_manifest(ws.clips_json, clips, styles, entries, errors)
+    print(f"✅ Manifeste des clips: {ws.clips_json}")
+    return manifest
+
+
+def promote_drafts(indices=None, styles=None, workspace=None, checkpoints=None):
+    """
+    Rend en qualité finale des aperçus relus, avec les décisions enregistrées
+    dans drafts.json (aucune nouvelle détection de visage ni sonde).
+
+    Args:
+        indices (list): segments à promouvoir; None = tous les aperçus encore
+            présents dans le dossier des aperçus (les aperçus supprimés sont rejetés)
+        styles (list): styles à rendre (par défaut ceux des aperçus)
+        workspace (Workspace): dossier des aperçus et des clips (défaut: OUTPUT_DIR)
+        checkpoints (Checkpoints): saute les segments déjà promus à l'identique
+    """
+    ws = workspace or default_workspace()
+    with open(ws.drafts_json, "r", encoding="utf-8") as f:
+        drafts = json.load(f)
+    zoom_factor = drafts.get("zoom_factor", 1.2)
+
+    selected = {}
+    for entry in drafts["segments"]:
+        if not entry.get("ok"):
+            continue
+        if indices is not None:
+            if entry["index"] in indices:
+                selected[entry["index"]] = list(styles or entry["variants"])
+        else:
+            kept = [name for name, path in entry["variants"].items() if os.path.exists(path)]
+            kept = [name for name in kept if not styles or name in styles]
+            if kept:
+                selected[entry["index"]] = kept
+
+    entries = [dict(e) for e in drafts["segments"] if e["index"] in selected]
+    print(f"⬆️ Promotion de {len(entries)}/{len(drafts['segments'])} segments en qualité finale")
+    all_styles = [s for s in STYLES if any(s in names for names in selected.values())]
+    clips, errors = render_entries(entries, selected, zoom_factor, draft=False, workspace=ws, checkpoints=checkpoints)
+    manifest = _write_manifest(ws.clips_json, clips, all_styles, entries, errors)
+    print(f"✅ Manifeste des clips: {ws.clips_json}")
+    return manifest
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Rendu de tous les styles 9:16 en un seul décodage par segment")
+    parser.add_argument("--styles", nargs="+", choices=sorted(STYLES), default=None)
+    parser.add_argument("--zoom", type=float, default=1.2, help="Facteur de zoom (1.0 = normal, >1 = zoom)")
+    parser.add_argument("--no-smart", action="store_true", help="Désactive la détection de visage")
+    parser.add_argument("--sections", action="store_true", help="Lit les plages de sections.json au lieu de la vidéo complète")
+    parser.add_argument("--draft", action="store_true", help="Aperçus basse résolution rapides (relecture)")
+    parser.add_argument("--promote", nargs="*", type=int, default=None,
+                        help="Rend en qualité finale les aperçus (indices donnés, sinon ceux encore présents)")
+    parser.add_argument("--force", action="store_true", help="Rend tous les segments, même ceux déjà à jour")
+    args = parser.parse_args()
+    ws = default_workspace()
+    checkpoints = Checkpoints(ws.checkpoints_path, enabled=not args.force)
+    if args.promote is not None:
+        result = promote_drafts(indices=args.promote or None, styles=args.styles, workspace=ws, checkpoints=checkpoints)
+    else:
+        sections = load_sections() if args.sections else None
+        result = extract_clips(styles=args.styles or ["smart", "center", "blur"], zoom_factor=args.zoom,
+                               smart_zoom=not args.no_smart, sections=sections, shots=load_shot_index(),
+                               draft=args.draft, workspace=ws, checkpoints=checkpoints)
+    print("Extraction terminée", result)
@@ -0,0 +1,218 @@
+import subprocess
+from functools import lru_cache, partial
+from config import FACE_SAMPLE_FPS, FACE_SAMPLE_WIDTH, FACE_MERGE_GAP, FACE_CACHE_DIR
+from cache import DiskCache, file_fingerprint, make_key
+from probe import keyframes, keyframe_before
+
+# OpenCV est optionnel: sans lui, aucun centre n'est détecté (recadrage centré)
+try:
+    import cv2  # type: ignore
+    _HAS_CV2 = True
+except Exception:
+    cv2 = None  # type: ignore
+    _HAS_CV2 = False
+
+
+@lru_cache(maxsize=None)
+def get_face_cache():
+    """Échantillons de visages déjà calculés, par clip."""
+    return DiskCache(FACE_CACHE_DIR)
+
+
+@lru_cache(maxsize=None)
+def _cascade():
+    """Cascade Haar incluse avec OpenCV (None si indisponible)."""
+    try:
+        path = getattr(cv2.data, "haarcascades") + "haarcascade_frontalface_default.xml"
+        cascade = cv2.CascadeClassifier(path)
+        return None if cascade.empty() else cascade
+    except Exception:
+        return None
+
+
+def _even(v):
+    return max(2, int(round(v)) // 2 * 2)
+
+
+def sample_size(dims, width=FACE_SAMPLE_WIDTH):
+    """Taille (w, h) des images de détection: la source réduite, jamais agrandie."""
+    in_w, in_h = dims[0], dims[1]
+    w = _even(min(width, in_w))
+    return w, _even(in_h * w / float(in_w))
+
+
+def merge_passes(ranges, gap=FACE_MERGE_GAP, keyframe_before=None):
+    """
+    Regroupe les plages (index, start, end) proches en passages de lecture:
+    [(lo, hi, [index...])]. Décoder un trou court coûte moins qu'un second
+    ffmpeg; un trou long est sauté par la recherche -ss. Avec
+    `keyframe_before(t)`, une plage dont l'image clé précède la fin du
+    passage courant y est rattachée: un nouveau -ss redécoderait le même trou.
+    """
+    passes = []
+    for idx, start, end in sorted(ranges, key=lambda r: r[1]):
+        if passes and (start - passes[-1][1] <= gap
+                       or (keyframe_before is not None and keyframe_before(start) <= passes[-1][1])):
+            passes[-1][1] = max(passes[-1][1], end)
+            passes[-1][2].append(idx)
+        else:
+            passes.append([start, end, [idx]])
+    return [tuple(p) for p in passes]
+
+
+def iter_frames(source, lo, hi, size, fps=FACE_SAMPLE_FPS):
+    """
+    Décode [lo, hi] une seule fois, séquentiellement, en niveaux de gris
+    réduits à `size` et à `fps` images/s (pipe rawvideo → NumPy).
+    `hi` None = jusqu'à la fin de la vidéo.
+
+    Yields:
+        (t, frame): temps dans la source (s) et image uint8 (h, w)
+    """
+    import numpy as np
+    w, h = size
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-ss", f"{lo:.3f}"]
+    if hi is not None:
+        cmd += ["-t", f"{max(0.01, hi - lo):.3f}"]
+    cmd += [
+        "-i", source,
+        "-an", "-vf", f"fps={fps},scale={w}:{h},format=gray",
+        "-f", "rawvideo", "-pix_fmt", "gray", "-",
+    ]
+    frame_bytes = w * h
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        k = 0
+        while True:
+            buf = proc.stdout.read(frame_bytes)
+            if len(buf) < frame_bytes:
+                break
+            yield lo + k / fps, np.frombuffer(buf, dtype=np.uint8).reshape(h, w)
+            k += 1
+        err = proc.stderr.read().decode("utf-8", "replace")
+        if proc.wait() != 0:
+            # erreur ffmpeg: lever plutôt que mettre en cache un clip "sans visage"
+            raise RuntimeError(f"Décodage vidéo impossible: {err}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def detect_largest(frame, scale_x, scale_y, min_size=60):
+    """Plus grand visage de l'image réduite, recentré en pixels de la source (ou None)."""
+    min_side = max(20, int(min_size / scale_x))
+    faces = _cascade().detectMultiScale(frame, scaleFactor=1.1, minNeighbors=5, minSize=(min_side, min_side))
+    if len(faces) == 0:
+        return None
+    x, y, fw, fh = max(faces, key=lambda b: b[2] * b[3])
+    return (x + fw / 2.0) * scale_x, (y + fh / 2.0) * scale_y
+
+
+def median_center(samples):
+    """Médiane (x, y) des échantillons [(t, x, y)], robuste aux fausses détections."""
+    if not samples:
+        return None
+    xs = sorted(s[1] for s in samples)
+    ys = sorted(s[2] for s in samples)
+    return xs[len(xs) // 2], ys[len(ys) // 2]
+
+
+def _clip_key(fingerprint, start, duration, size, fps, plans):
+    return make_key("faces", fingerprint, round(start, 3), round(duration, 3), list(size), fps, plans)
+
+
+def _shot_frames(plans, lo, fps):
+    """Indice (depuis `lo`) de l'image la plus proche du milieu de chaque plan."""
+    return {int(round(((s + e) / 2.0 - lo) * fps)) for s, e in plans}
+
+
+def sample_faces(source, clips, dims, fps=FACE_SAMPLE_FPS, width=FACE_SAMPLE_WIDTH, shots=None):
+    """
+    Positions de visage échantillonnées pour tous les clips d'une même source,
+    en un seul passage de décodage par groupe de clips proches. Les clips déjà
+    analysés sont relus depuis le cache.
+
+    Args:
+        source (str): vidéo source
+        clips (list): [(start, duration)] en secondes dans la source
+        dims (tuple): (width, height, ...) de la source
+        shots (ShotIndex): coupes de plan de la source; si fourni, une seule
+            image analysée par plan (au milieu) au lieu de `fps` par seconde
+
+    Returns:
+        list: une liste [(t, x, y)] par clip (vide si aucun visage), même ordre
+    """
+    results = [[] for _ in clips]
+    if not _HAS_CV2 or _cascade() is None or not clips or not dims[0] or not dims[1]:
+        return results
+
+    size = sample_size(dims, width)
+    scale_x, scale_y = dims[0] / float(size[0]), dims[1] / float(size[1])
+    cache = get_face_cache()
+    fingerprint = file_fingerprint(source)
+    plans = [[list(p) for p in shots.shots_between(s, s + d)] if shots else None for s, d in clips]
+    keys = [_clip_key(fingerprint, s, d, size, fps, plans[i]) for i, (s, d) in enumerate(clips)]
+
+    todo = []
+    for i, (start, duration) in enumerate(clips):
+        cached = cache.get(keys[i])
+        if cached is not None:
+            results[i] = [tuple(s) for s in cached]
+        else:
+            todo.append((i, start, start + duration))
+
+    seek_from = None
+    if len(todo) > 1:
+        # planification des -ss: où ffmpeg reprendrait réellement le décodage
+        try:
+            keyframes(source)
+            seek_from = partial(keyframe_before, source)
+        except Exception:
+            pass
+    for lo, hi, idxs in merge_passes(todo, keyframe_before=seek_from):
+        wanted = {i: _shot_frames(plans[i], lo, fps) for i in idxs} if shots else None
+        for k, (t, frame) in enumerate(iter_frames(source, lo, hi, size, fps)):
+            if wanted is not None:
+                inside = [i for i in idxs if k in wanted[i]]
+            else:
+                inside = [i for i in idxs if clips[i][0] <= t <= clips[i][0] + clips[i][1]]
+            if not inside:
+                continue  # image hors clip (ou hors milieu de plan): décodée mais pas analysée
+            center = detect_largest(frame, scale_x, scale_y)
+            if center is not None:
+                for i in inside:
+                    results[i].append((round(t, 3), center[0], center[1]))
+        for i in idxs:
+            cache.set(keys[i], results[i])
+    return results
+
+
+def face_centers(source, clips, dims, fps=FACE_SAMPLE_FPS, width=FACE_SAMPLE_WIDTH, shots=None):
+    """Centre de visage médian (x, y) de chaque clip [(start, duration)] d'une source, ou None."""
+    try:
+        samples = sample_faces(source, clips, dims, fps, width, shots)
+    except Exception as e:
+        print(f"⚠️ Détection de visage impossible ({source}): {e}")
+        return [None] * len(clips)
+    return [median_center(s) for s in samples]
+
+
+def face_centers_for_clips(clips, dims_by_source, shots=None):
+    """
+    Centres de visage pour des clips de plusieurs sources: [(source, start, duration)]
+    → [center ou None] dans le même ordre, un passage par source.
+    `shots` ({source: ShotIndex}) active l'échantillonnage d'une image par plan.
+    """
+    by_source = {}
+    for i, (source, start, duration) in enumerate(clips):
+        by_source.setdefault(source, []).append(i)
+    centers = [None] * len(clips)
+    for source, idxs in by_source.items():
+        found = face_centers(source, [clips[i][1:] for i in idxs], dims_by_source[source],
+                             shots=(shots or {}).get(source))
+        for i, center in zip(idxs, found):
+            centers[i] = center
+    return centers
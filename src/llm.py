@@ -0,0 +1,197 @@
+import random
+import threading
+import time
+from functools import lru_cache
+from cache import DiskCache, make_key
+from metrics import record
+from config import (
+    MODEL_NAME, SCORE_MAX_RPS, SCORE_MAX_TPM,
+    LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX,
+    LLM_CACHE_ENABLED, LLM_CACHE_DIR, LLM_CACHE_MAX_BYTES, LLM_CACHE_MAX_AGE,
+)
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Seau à jetons thread-safe: `rate` jetons/s, au plus `capacity` en réserve."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(self.rate, 1.0))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1.0):
+        # une demande plus grosse que le seau ne serait jamais servie
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self.lock:
+                self._refill(time.monotonic())
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def debit(self, amount):
+        """Retire `amount` jetons sans attendre (correction a posteriori, peut passer en négatif)."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= float(amount)
+
+
+class RateLimiter:
+    """
+    Limiteur partagé entre tous les threads qui appellent le LLM:
+    budget requêtes/s + budget tokens/min, et pause globale après un 429.
+    """
+
+    def __init__(self, rps=SCORE_MAX_RPS, tpm=SCORE_MAX_TPM):
+        self.requests = TokenBucket(rps) if rps else None
+        self.tokens = TokenBucket(tpm / 60.0, capacity=tpm) if tpm else None
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def pause(self, seconds):
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def acquire(self, tokens=0):
+        while True:
+            with self.lock:
+                wait = self.blocked_until - time.monotonic()
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        if self.requests:
+            self.requests.acquire(1)
+        if self.tokens and tokens:
+            self.tokens.acquire(tokens)
+
+    def record(self, estimated, actual):
+        """Recale le budget tokens avec l'usage réel renvoyé par l'API."""
+        if self.tokens and actual is not None and actual > estimated:
+            self.tokens.debit(actual - estimated)
+
+
+def estimate_tokens(text):
+    # ~4 caractères par token, suffisant pour tenir un budget
+    return max(1, len(text) // 4)
+
+
+def _retry_after(exc):
+    """Délai demandé par le serveur (en s) si l'erreur porte un en-tête Retry-After."""
+    resp = getattr(exc, "raw_response", None) or getattr(exc, "response", None)
+    headers = getattr(resp, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _status_code(exc):
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        resp = getattr(exc, "raw_response", None) or getattr(exc, "response", None)
+        code = getattr(resp, "status_code", None)
+    return code
+
+
+@lru_cache(maxsize=None)
+def _transient_errors():
+    """Erreurs réseau passagères: builtins + httpx et SDK Mistral s'ils sont installés."""
+    types = [ConnectionError, TimeoutError]
+    try:
+        import httpx
+        types.append(httpx.TransportError)  # timeouts, connexion refusée ou coupée
+    except ImportError:
+        pass
+    for module, name in (("mistralai.exceptions", "MistralConnectionException"),
+                         ("mistralai.models", "MistralConnectionException")):
+        try:
+            types.append(getattr(__import__(module, fromlist=[name]), name))
+        except (ImportError, AttributeError):
+            pass
+    return tuple(types)
+
+
+def _is_retryable(exc):
+    """
+    Seules les erreurs passagères sont réessayées: statut HTTP de
+    RETRYABLE_STATUS ou erreur réseau connue. Tout le reste (réponse mal
+    formée, bug) remonte immédiatement sans consommer le limiteur.
+    """
+    code = _status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    return isinstance(exc, _transient_errors())
+
+
+def chat_complete(client, prompt, limiter=None, model=MODEL_NAME, max_retries=LLM_MAX_RETRIES, label="llm"):
+    """
+    Appelle `client.chat.complete` en respectant le limiteur partagé et
+    réessaie avec backoff exponentiel (ou le Retry-After du serveur).
+    Chaque appel est mesuré (latence, attente, tokens) sous `label`.
+
+    Returns:
+        str: contenu texte de la réponse
+    """
+    estimated = estimate_tokens(prompt)
+    attempt = 0
+    started = time.monotonic()
+    waited = 0.0
+    while True:
+        if limiter is not None:
+            t0 = time.monotonic()
+            limiter.acquire(estimated)
+            waited += time.monotonic() - t0
+        t0 = time.monotonic()
+        try:
+            resp = client.chat.complete(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+            )
+            usage = getattr(resp, "usage", None)
+            tokens = getattr(usage, "total_tokens", None)
+            if limiter is not None:
+                limiter.record(estimated, tokens)
+            record("llm", label=label, ok=True, latency=round(time.monotonic() - t0, 3),
+                   elapsed=round(time.monotonic() - started, 3), wait=round(waited, 3),
+                   retries=attempt, estimated_tokens=estimated, tokens=tokens)
+            return resp.choices[0].message.content.strip()
+        except Exception as e:
+            if attempt >= max_retries or not _is_retryable(e):
+                record("llm", label=label, ok=False, latency=round(time.monotonic() - t0, 3),
+                       elapsed=round(time.monotonic() - started, 3), wait=round(waited, 3),
+                       retries=attempt, estimated_tokens=estimated, tokens=None, error=str(e)[:200])
+                raise
+            delay = _retry_after(e)
+            if delay is None:
+                delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+            elif limiter is not None:
+                limiter.pause(delay)
+            attempt += 1
+            print(f"⏳ LLM indisponible ({e}), nouvel essai {attempt}/{max_retries} dans {delay:.1f}s")
+            time.sleep(delay)
+
+
+@lru_cache(maxsize=None)
+def get_llm_cache():
+    """Cache disque partagé par le scoring et le raffinage (None si désactivé)."""
+    if not LLM_CACHE_ENABLED:
+        return None
+    return DiskCache(LLM_CACHE_DIR, max_bytes=LLM_CACHE_MAX_BYTES, max_age=LLM_CACHE_MAX_AGE)
+
+
+def llm_cache_key(kind, version, payload, model=MODEL_NAME):
+    """Clé d'une réponse LLM: (modèle, type de prompt, version du prompt, contenu)."""
+    return make_key(model, kind, version, payload)
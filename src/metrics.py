@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import resource
+import threading
+from contextlib import contextmanager
+from config import REPORT_PATH, METRICS_TEXTFILE, PROFILE_STAGES, PROFILE_DIR
+
+# Événements du run en cours: étapes, appels LLM, rendus ffmpeg
+_EVENTS = []
+_LOCK = threading.Lock()
+_PROFILE = set(PROFILE_STAGES)
+_PROFILE_DIR = PROFILE_DIR
+
+
+def reset(profile=None, profile_dir=PROFILE_DIR):
+    """Vide les mesures (début d'un run), choisit les étapes à profiler et où écrire les profils."""
+    global _PROFILE, _PROFILE_DIR
+    with _LOCK:
+        _EVENTS.clear()
+    _PROFILE = set(PROFILE_STAGES if profile is None else profile)
+    _PROFILE_DIR = profile_dir
+
+
+def record(kind, **fields):
+    """Ajoute un événement {kind, ts, ...} au run en cours (thread-safe)."""
+    event = dict(fields, kind=kind, ts=round(time.time(), 3))
+    with _LOCK:
+        _EVENTS.append(event)
+    return event
+
+
+def events(kind=None):
+    with _LOCK:
+        return [e for e in _EVENTS if kind is None or e["kind"] == kind]
+
+
+def _reset_peak_rss():
+    # Linux: "5" remet à zéro VmHWM, le pic mesuré ensuite est celui de l'étape
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss():
+    """Pic de mémoire résidente du processus (octets)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@contextmanager
+def stage(name, **fields):
+    """
+    Mesure une étape: temps réel, CPU du processus (tous threads), CPU des
+    sous-processus terminés (ffmpeg...), pic de RSS. Si l'étape fait partie
+    des étapes à profiler, un cProfile est écrit dans le dossier des profils.
+    """
+    per_stage_peak = _reset_peak_rss()
+    profiler = None
+    if name in _PROFILE or "all" in _PROFILE:
+        import cProfile
+        profiler = cProfile.Profile()
+    wall, cpu, child = time.perf_counter(), time.process_time(), _children_cpu()
+    ok = False
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+        ok = True
+    finally:
+        if profiler:
+            profiler.disable()
+        event = {
+            "stage": name,
+            "ok": ok,
+            "wall_seconds": round(time.perf_counter() - wall, 4),
+            "cpu_seconds": round(time.process_time() - cpu, 4),
+            "children_cpu_seconds": round(_children_cpu() - child, 4),
+            "peak_rss_bytes": _peak_rss(),
+            "peak_rss_scope": "stage" if per_stage_peak else "process",
+        }
+        if profiler:
+            os.makedirs(_PROFILE_DIR, exist_ok=True)
+            event["profile"] = os.path.join(_PROFILE_DIR, f"{name}.prof")
+            profiler.dump_stats(event["profile"])
+        record("stage", **dict(fields, **event))
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def summary():
+    """Agrégats du run: étapes, appels LLM par type, pré-tri, raffinages par méthode, rendus ffmpeg."""
+    llm = {}
+    for e in events("llm"):
+        s = llm.setdefault(e["label"], {"calls": 0, "errors": 0, "retries": 0, "tokens": 0, "latencies": []})
+        s["calls"] += 1
+        s["errors"] += 0 if e["ok"] else 1
+        s["retries"] += e.get("retries", 0)
+        s["tokens"] += e.get("tokens") or e.get("estimated_tokens") or 0
+        s["latencies"].append(e["latency"])
+    for s in llm.values():
+        lat = s.pop("latencies")
+        s.update(latency_sum=round(sum(lat), 3), latency_p50=_percentile(lat, 0.5), latency_p95=_percentile(lat, 0.95))
+
+    refine = {}
+    for e in events("refine"):
+        refine[e["method"]] = refine.get(e["method"], 0) + 1
+
+    prefilter = {"windows": 0, "sent": 0, "saved_calls": 0, "saved_tokens": 0}
+    for e in events("prefilter"):
+        for k in prefilter:
+            prefilter[k] += e.get(k, 0)
+
+    renders = events("render")
+    encoded = sum(e["seconds"] for e in renders)
+    clip_seconds = sum(e["clip_seconds"] * e.get("outputs", 1) for e in renders)
+    return {
+        "stages": {e["stage"]: e["wall_seconds"] for e in events("stage")},
+        "llm": llm,
+        "refine": refine,
+        "prefilter": prefilter,
+        "render": {
+            "jobs": len(renders),
+            "failed": sum(1 for e in renders if not e["ok"]),
+            "encode_seconds": round(encoded, 3),
+            "clip_seconds": round(clip_seconds, 3),
+            "realtime_factor": round(clip_seconds / encoded, 3) if encoded else None,
+        },
+    }
+
+
+def write_report(path=REPORT_PATH, textfile=METRICS_TEXTFILE, **run_fields):
+    """
+    Écrit le rapport du run en JSON lines (un événement par ligne, puis une
+    ligne "summary") et, si `textfile` est défini, les métriques au format
+    texte Prometheus (collecteur textfile de node_exporter).
+    """
+    data = summary()
+    with open(path, "w", encoding="utf-8") as f:
+        for e in events():
+            f.write(json.dumps(e, ensure_ascii=False) + "\n")
+        f.write(json.dumps(dict(run_fields, kind="summary", **data), ensure_ascii=False) + "\n")
+    if textfile:
+        write_prometheus(textfile, data)
+    return data
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def write_prometheus(path, data=None):
+    data = data or summary()
+    lines = []
+
+    def metric(name, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            if value is None:
+                continue
+            tag = ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{tag}}} {value}" if tag else f"{name} {value}")
+
+    stages = events("stage")
+    metric("clipper_stage_wall_seconds", "Temps réel par étape du dernier run",
+           [({"stage": e["stage"]}, e["wall_seconds"]) for e in stages])
+    metric("clipper_stage_cpu_seconds", "CPU du processus par étape",
+           [({"stage": e["stage"]}, e["cpu_seconds"]) for e in stages])
+    metric("clipper_stage_children_cpu_seconds", "CPU des sous-processus (ffmpeg) par étape",
+           [({"stage": e["stage"]}, e["children_cpu_seconds"]) for e in stages])
+    metric("clipper_stage_peak_rss_bytes", "Pic de RSS par étape",
+           [({"stage": e["stage"]}, e["peak_rss_bytes"]) for e in stages])
+    metric("clipper_llm_calls", "Appels LLM par type", [({"label": k}, v["calls"]) for k, v in data["llm"].items()])
+    metric("clipper_llm_errors", "Appels LLM en échec", [({"label": k}, v["errors"]) for k, v in data["llm"].items()])
+    metric("clipper_llm_tokens", "Tokens consommés", [({"label": k}, v["tokens"]) for k, v in data["llm"].items()])
+    metric("clipper_llm_latency_seconds_sum", "Somme des latences LLM",
+           [({"label": k}, v["latency_sum"]) for k, v in data["llm"].items()])
+    metric("clipper_llm_latency_p95_seconds", "Latence LLM p95",
+           [({"label": k}, v["latency_p95"]) for k, v in data["llm"].items()])
+    metric("clipper_prefilter_saved_calls", "Appels LLM de scoring évités par le pré-tri local",
+           [({}, data["prefilter"]["saved_calls"])])
+    metric("clipper_refine_candidates", "Candidats raffinés par méthode (local, llm, fallback)",
+           [({"method": k}, v) for k, v in data["refine"].items()])
+    render = data["render"]
+    metric("clipper_render_encode_seconds", "Temps d'encodage ffmpeg cumulé", [({}, render["encode_seconds"])])
+    metric("clipper_render_realtime_factor", "Secondes de clip produites par seconde d'encodage",
+           [({}, render["realtime_factor"])])
+    metric("clipper_render_failed", "Rendus en échec", [({}, render["failed"])])
+
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)  # le collecteur ne doit jamais lire un fichier à moitié écrit
@@ -0,0 +1,356 @@
+import sys, json, time
+from contextlib import contextmanager
+from config import WINDOW_SIZE, STEP_SIZE, MARGIN
+from workspace import default_workspace
+
+# Variantes de rendu disponibles (équivalent des trois scripts extract*)
+VARIANTS = ("smart", "center", "blur")
+
+
+def _save(path, data, indent=2):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+
+
+def _load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@contextmanager
+def _slot(slots, kind):
+    """
+    Attend une place dans la file `kind` ("cpu" ou "io") partagée entre les
+    jobs du worker. Sans worker (`slots` None), ne limite rien.
+    """
+    sem = (slots or {}).get(kind)
+    if sem is None:
+        yield
+        return
+    from metrics import record
+    t0 = time.perf_counter()
+    with sem:
+        record("slot_wait", slot=kind, seconds=round(time.perf_counter() - t0, 4))
+        yield
+
+
+def _render(variant, segments, zoom_factor, smart_zoom, sections=None, single_pass=False, shots=None, workspace=None):
+    # imports tardifs: cv2 n'est chargé que si on rend réellement des clips
+    # manifest=False: clips.json est écrit une fois pour toutes les variantes par l'appelant
+    if variant == "smart":
+        from extract import extract_clips
+        return extract_clips(zoom_factor=zoom_factor, smart_zoom=smart_zoom, segments=segments,
+                             sections=sections, single_pass=single_pass, shots=shots, workspace=workspace,
+                             manifest=False)
+    if variant == "center":
+        from extract1 import extract_clips
+        return extract_clips(segments=segments, sections=sections, single_pass=single_pass, workspace=workspace,
+                             manifest=False)
+    if variant == "blur":
+        from extractOrigin import extract_clips
+        return extract_clips(segments=segments, sections=sections, single_pass=single_pass, workspace=workspace,
+                             manifest=False)
+    raise ValueError(f"Variante inconnue: {variant}")
+
+
+def run_pipeline(url=None, zoom_factor=1.0, smart_zoom=True, variants=("smart",), model=None, client=None,
+                 audio_first=False, single_pass=False, draft=False, profile=None, workspace=None, slots=None,
+                 limiter=None, resume=True):
+    """
+    Enchaîne toutes les étapes dans un seul processus, en passant les résultats
+    en mémoire d'une étape à l'autre. Les JSON intermédiaires sont toujours écrits
+    dans le workspace (pour le workflow n8n et le debug), avec un manifeste de
+    reprise (checkpoints.json): relancer la même vidéo ne recalcule que les
+    étapes, et les clips, dont les entrées ou les réglages ont changé.
+    Chaque étape est mesurée (temps, CPU, mémoire, appels LLM, encodages) et le
+    rapport est écrit dans le workspace, même en cas d'échec.
+
+    Args:
+        url (str): URL à télécharger (None = réutilise la vidéo déjà présente dans le workspace)
+        zoom_factor (float): facteur de zoom pour la variante "smart"
+        smart_zoom (bool): active la détection de visage pour la variante "smart"
+        variants (iterable): variantes de rendu parmi VARIANTS
+        model: modèle Whisper déjà chargé (sinon chargé une fois puis gardé en cache)
+        client: client Mistral déjà construit (partagé entre scoring et refine)
+        audio_first (bool): télécharge d'abord l'audio seul, puis uniquement les
+            plages vidéo des segments raffinés (nécessite `url`)
+        single_pass (bool): rend tous les clips d'une variante en une seule invocation ffmpeg
+            (sinon: un ffmpeg par segment qui produit toutes les variantes)
+        draft (bool): aperçus basse résolution rapides à relire, puis
+            `extract_all.py --promote` pour le rendu final des clips retenus
+        profile (iterable): étapes à profiler avec cProfile ("all" = toutes;
+            None = PROFILE_STAGES de config.py)
+        workspace (Workspace): dossier de cette vidéo (défaut: OUTPUT_DIR de config.py)
+        slots (dict): {"cpu": sémaphore, "io": sémaphore} partagés entre les jobs
+            du worker; None = aucune limite
+        limiter (RateLimiter): limiteur LLM du scoring et du raffinage (défaut: budget complet de config.py)
+        resume (bool): reprend les étapes à jour du workspace (False = tout recalculer)
+
+    Returns:
+        dict: {success, counts, clips, metrics} ou {success: False, error}
+    """
+    import metrics
+    ws = (workspace or default_workspace()).ensure()
+    metrics.reset(profile, profile_dir=ws.profile_dir)
+    result = {"success": False, "error": "interrompu"}
+    try:
+        result = _run(url, zoom_factor, smart_zoom, variants, model, client, audio_first, single_pass, draft,
+                      ws, slots, limiter, resume)
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+    finally:
+        try:
+            result["metrics"] = metrics.write_report(ws.report_path, success=result.get("success"), url=url)
+        except Exception as e:
+            print(f"⚠️ Rapport de mesures non écrit: {e}")
+    return result
+
+
+def _run(url, zoom_factor, smart_zoom, variants, model, client, audio_first, single_pass, draft, ws, slots, limiter,
+         resume):
+    from metrics import stage, record
+    from checkpoints import Checkpoints
+    from cache import file_fingerprint
+    from config import (
+        WHISPER_MODEL, TRANSCRIBE_WORKERS, MODEL_NAME, SCORE_PROMPT_VERSION, SCORE_BATCH_SIZE,
+        SCORE_BATCH_MAX_TOKENS, REFINE_PROMPT_VERSION, MERGE_THRESHOLD, SILENCE_MIN_GAP, SILENCE_SNAP_TOL,
+        SHOT_SNAP_TOL, SECTION_MARGIN, SECTION_FORCE_KEYFRAMES, REFINE_LOCAL, REFINE_MIN_CONFIDENCE, REFINE_GAP_FULL,
+        REFINE_DISTANCE_WEIGHT, PREFILTER_ENABLED, PREFILTER_KEEP, PREFILTER_CUTOFF, PREFILTER_MIN_WORDS,
+        PREFILTER_WEIGHTS, SCORE_MODE, SCORE_CHUNK_SIZE, SCORE_HIER_LEVELS, SCORE_HIER_MAX_WINDOWS,
+        TRANSCRIBE_WORD_TIMESTAMPS, TRANSCRIBE_FP16,
+    )
+
+    if audio_first and not url:
+        return {"success": False, "error": "Le mode audio d'abord nécessite une URL"}
+    if limiter is None:
+        # un seul budget requêtes/s + tokens/min pour le scoring et le raffinage
+        from llm import RateLimiter
+        limiter = RateLimiter()
+    # reprise: chaque étape dont les entrées (empreintes amont + réglages) n'ont pas changé est relue
+    ckpt = Checkpoints(ws.checkpoints_path, enabled=resume)
+    resumed = []
+
+    def up_to_date(name, key):
+        if ckpt.fresh(name, key):
+            print(f"♻️ Étape {name} à jour, reprise depuis le workspace")
+            record("resume", stage=name)
+            resumed.append(name)
+            return True
+        return False
+
+    mode = "audio" if audio_first else "video"
+    media_path = ws.audio_path if audio_first else ws.video_path
+    if url:
+        key = ckpt.key("download", url, mode)
+        if not up_to_date("download", key):
+            from download_video import download_audio, download_video
+            print("⬇️ Téléchargement...")
+            with _slot(slots, "io"), stage("download", mode=mode):
+                dl = download_audio(url, workspace=ws) if audio_first else download_video(url, workspace=ws)
+            if not dl["success"]:
+                return dl
+            ckpt.done("download", key, [media_path])
+
+    key = ckpt.key("transcribe", file_fingerprint(media_path), WHISPER_MODEL, TRANSCRIBE_WORKERS,
+                   TRANSCRIBE_WORD_TIMESTAMPS, TRANSCRIBE_FP16)
+    if up_to_date("transcribe", key):
+        transcript = _load(ws.transcript_path)
+    else:
+        from audio_cache import decode_audio
+        print("🔊 Décodage audio (une seule fois)...")
+        with _slot(slots, "cpu"), stage("decode_audio"):
+            decode_audio(media_path)
+
+        from transcribe import transcribe_video
+        print("🎙️ Transcription...")
+        with _slot(slots, "cpu"), stage("transcribe"):
+            transcript = transcribe_video(media_path, model=model)
+            _save(ws.transcript_path, transcript)
+        ckpt.done("transcribe", key, [ws.transcript_path])
+    segments = transcript["segments"]
+    if not segments:
+        return {"success": False, "error": "Aucun segment transcrit"}
+
+    key = ckpt.key("windows", ckpt.output_key("transcribe"), WINDOW_SIZE, STEP_SIZE)
+    if up_to_date("windows", key):
+        windows = _load(ws.blocks_path)
+    else:
+        from sliding_window import build_windows
+        print("🔍 Création des fenêtres glissantes...")
+        with stage("windows"):
+            windows = build_windows(segments, WINDOW_SIZE, STEP_SIZE)
+            _save(ws.blocks_path, windows)
+        ckpt.done("windows", key, [ws.blocks_path])
+    if not windows:
+        return {"success": False, "error": "Aucune fenêtre construite"}
+
+    def get_client():
+        nonlocal client
+        if client is None:
+            from scoring import build_mistral_client
+            client = build_mistral_client()
+        return client
+
+    prefilter = {"on": PREFILTER_ENABLED, "keep": PREFILTER_KEEP, "cutoff": PREFILTER_CUTOFF,
+                 "min_words": PREFILTER_MIN_WORDS, "weights": PREFILTER_WEIGHTS}
+    key = ckpt.key("scored", ckpt.output_key("windows"), ckpt.output_key("transcribe"), MODEL_NAME,
+                   SCORE_PROMPT_VERSION, SCORE_BATCH_SIZE, SCORE_BATCH_MAX_TOKENS, prefilter, SCORE_MODE,
+                   SCORE_CHUNK_SIZE if SCORE_MODE == "chunks" else None,
+                   [SCORE_HIER_LEVELS, SCORE_HIER_MAX_WINDOWS] if SCORE_MODE == "hierarchical" else None)
+    # mode "chunks": la courbe des morceaux notés sert ensuite à la fusion des candidats
+    curve = None
+    if up_to_date("scored", key):
+        scored = _load(ws.scored_path)
+        if SCORE_MODE == "chunks":
+            curve = _load(ws.chunks_path)
+    else:
+        from scoring import score_windows, score_by_chunks, score_hierarchical
+        print("🧠 Évaluation des segments...")
+        with _slot(slots, "io"), stage("score", windows=len(windows), mode=SCORE_MODE):
+            outputs = [ws.scored_path]
+            if SCORE_MODE == "chunks":
+                scored, curve = score_by_chunks(get_client(), windows, segments, limiter=limiter)
+                _save(ws.chunks_path, curve)
+                outputs.append(ws.chunks_path)
+            elif SCORE_MODE == "hierarchical":
+                scored = score_hierarchical(get_client(), windows, segments, limiter=limiter)
+            else:
+                scored = score_windows(get_client(), windows, segments, limiter=limiter)
+            _save(ws.scored_path, scored)
+        # en mode chunks, les fenêtres à -1 viennent des morceaux en échec
+        failed = sum(1 for w in (curve if SCORE_MODE == "chunks" else scored) if w.get("score") == -1)
+        if failed:
+            print(f"⚠️ {failed} notes en échec: l'étape scored sera relancée à la prochaine reprise")
+            ckpt.partial("scored", outputs, failed=failed)
+        else:
+            ckpt.done("scored", key, outputs)
+
+    from transcript_index import TranscriptIndex
+    index = TranscriptIndex(segments)
+
+    shots = None
+    if not audio_first:
+        # coupes de plan: une passe basse résolution, facultative (shots.json se réutilise seul)
+        from shots import build_shot_index
+        try:
+            with _slot(slots, "cpu"), stage("shots"):
+                shots = build_shot_index(ws.video_path, ws.shots_path)
+        except Exception as e:
+            print(f"⚠️ Coupes de plan indisponibles: {e}")
+
+    snap_params = {"merge": MERGE_THRESHOLD, "gap": SILENCE_MIN_GAP, "tol": SILENCE_SNAP_TOL, "shot_tol": SHOT_SNAP_TOL}
+    key = ckpt.key("snapped", ckpt.output_key("scored"), ckpt.output_key("transcribe"), snap_params,
+                   shots.cuts if shots else None)
+    if up_to_date("snapped", key):
+        snapped = _load(ws.snapped_path)
+    else:
+        from snappe_segments import snap_candidates
+        with stage("snap"):
+            snapped = snap_candidates(scored, index=index, shots=shots, curve=curve)
+            _save(ws.snapped_path, snapped, indent=4)
+        ckpt.done("snapped", key, [ws.snapped_path])
+
+    refine_params = {"local": REFINE_LOCAL, "min_conf": REFINE_MIN_CONFIDENCE, "gap": REFINE_GAP_FULL,
+                     "distance": REFINE_DISTANCE_WEIGHT}
+    key = ckpt.key("refined", ckpt.output_key("snapped"), ckpt.output_key("transcribe"), MARGIN, MODEL_NAME,
+                   REFINE_PROMPT_VERSION, refine_params)
+    if up_to_date("refined", key):
+        refined = _load(ws.refined_path)
+    else:
+        from refine import refine_candidates
+        with _slot(slots, "io"), stage("refine", candidates=len(snapped)):
+            refined = refine_candidates(get_client(), snapped, segments, margin=MARGIN, index=index, limiter=limiter)
+            _save(ws.refined_path, refined, indent=4)
+        failed = sum(1 for r in refined if r.get("refine") == "fallback")
+        if failed:
+            print(f"⚠️ {failed} raffinages LLM en échec: l'étape refined sera relancée à la prochaine reprise")
+            ckpt.partial("refined", [ws.refined_path], failed=failed)
+        else:
+            ckpt.done("refined", key, [ws.refined_path])
+
+    from llm import get_llm_cache
+    cache = get_llm_cache()
+
+    sections = None
+    if audio_first and refined:
+        key = ckpt.key("sections", url, ckpt.output_key("refined"), SECTION_MARGIN, SECTION_FORCE_KEYFRAMES)
+        if up_to_date("sections", key):
+            from download_video import load_sections
+            sections = load_sections(ws.sections_path)
+        else:
+            from download_video import download_sections
+            print("⬇️ Téléchargement des plages vidéo utiles...")
+            with _slot(slots, "io"), stage("download_sections", sections=len(refined)):
+                dl = download_sections(url, refined, workspace=ws)
+            if not dl["success"]:
+                return dl
+            sections = dl["sections"]
+            ckpt.done("sections", key, [ws.sections_path] + [sec["path"] for sec in sections])
+
+    clips = {}
+    with _slot(slots, "cpu"), stage("render", clips=len(refined), draft=draft):
+        if single_pass and not draft:
+            # un ffmpeg par variante pour tous les clips (reprise par variante entière)
+            source_key = ckpt.output_key("sections") if sections else file_fingerprint(ws.video_path)
+            results = []
+            for variant in variants:
+                name = f"render_{variant}"
+                key = ckpt.key(name, ckpt.output_key("refined"), source_key, zoom_factor, smart_zoom,
+                               shots.cuts if shots else None)
+                if up_to_date(name, key):
+                    clips[variant] = ckpt.get(name)["clips"]
+                    results += [{"output": path, "ok": True} for path in clips[variant]]
+                    continue
+                rendered = _render(variant, refined, zoom_factor, smart_zoom, sections, single_pass, shots,
+                                   workspace=ws)
+                clips[variant] = rendered["clips"]
+                results += [{"output": path, "ok": True} for path in clips[variant]]
+                results += [dict(err, ok=False) for err in rendered.get("errors", [])]
+                if not rendered.get("errors"):
+                    ckpt.done(name, key, clips[variant], clips=clips[variant])
+            # un seul clips.json pour toutes les variantes, comme extract_all
+            from render import save_clips_manifest
+            save_clips_manifest(results, ws.clips_json)
+        elif variants:
+            # un décodage par segment, réparti vers toutes les variantes; reprise clip par clip
+            from extract_all import extract_clips
+            manifest = extract_clips(styles=tuple(variants), zoom_factor=zoom_factor, smart_zoom=smart_zoom,
+                                     segments=refined, sections=sections, shots=shots, draft=draft, workspace=ws,
+                                     checkpoints=ckpt)
+            for variant in variants:
+                clips[variant] = [e["variants"][variant] for e in manifest["segments"] if e["ok"]]
+
+    return {
+        "success": True,
+        "counts": {
+            "segments": len(segments),
+            "windows": len(windows),
+            "snapped": len(snapped),
+            "refined": len(refined),
+            "cuts": len(shots.cuts) if shots else None,
+        },
+        "clips": clips,
+        "resumed": resumed,
+        "workspace": ws.root,
+        "llm_cache": cache.stats() if cache else None,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Pipeline complet vidéo → clips dans un seul processus")
+    parser.add_argument("url", nargs="?", default=None, help="URL de la vidéo (absent = réutilise la vidéo déjà téléchargée)")
+    parser.add_argument("--zoom", type=float, default=1.0, help="Facteur de zoom (1.0 = normal, >1 = zoom)")
+    parser.add_argument("--no-smart", action="store_true", help="Désactive le zoom intelligent (détection visage)")
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=["smart"], help="Variantes de rendu à produire")
+    parser.add_argument("--audio-first", action="store_true", help="Audio seul d'abord, puis uniquement les plages vidéo des clips")
+    parser.add_argument("--single-pass", action="store_true", help="Un seul ffmpeg par variante pour tous les clips")
+    parser.add_argument("--draft", action="store_true", help="Aperçus basse résolution (promotion: extract_all.py --promote)")
+    parser.add_argument("--profile", nargs="+", default=None, help="Étapes à profiler (cProfile), ex: score render, ou all")
+    parser.add_argument("--force", action="store_true", help="Recalcule toutes les étapes (ignore checkpoints.json)")
+    args = parser.parse_args()
+    result = run_pipeline(args.url, zoom_factor=args.zoom, smart_zoom=not args.no_smart, variants=args.variants,
+                          audio_first=args.audio_first, single_pass=args.single_pass, draft=args.draft,
+                          profile=args.profile, resume=not args.force)
+    print(json.dumps(result, ensure_ascii=False))
+    sys.exit(0 if result["success"] else 1)
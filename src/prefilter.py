@@ -0,0 +1,127 @@
+import re
+import math
+import numpy as np
+from config import PREFILTER_KEEP, PREFILTER_CUTOFF, PREFILTER_MIN_WORDS, PREFILTER_WEIGHTS
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _segment_arrays(segments):
+    """Colonnes des segments (triés par début) et sommes cumulées pour les requêtes par fenêtre."""
+    order = sorted(range(len(segments)), key=lambda i: segments[i]["start"])
+    segs = [segments[i] for i in order]
+    starts = np.array([s["start"] for s in segs], dtype=np.float64)
+    ends = np.array([s["end"] for s in segs], dtype=np.float64)
+    dur = np.maximum(ends - starts, 0.0)
+    texts = [s.get("text", "") for s in segs]
+    words = np.array([len(TOKEN.findall(t)) for t in texts], dtype=np.float64)
+    marks = np.array([t.count("?") + t.count("!") for t in texts], dtype=np.float64)
+    # segments sans ces champs (transcription externe): valeurs neutres
+    logprob = np.array([s.get("avg_logprob", 0.0) for s in segs], dtype=np.float64)
+    no_speech = np.array([s.get("no_speech_prob", 0.0) for s in segs], dtype=np.float64)
+
+    def cum(values):
+        return np.concatenate(([0.0], np.cumsum(values)))
+
+    return {
+        "starts": starts,
+        "max_end": np.maximum.accumulate(ends) if len(ends) else ends,
+        "dur": cum(dur),
+        "words": cum(words),
+        "marks": cum(marks),
+        "logprob": cum(logprob * dur),
+        "no_speech": cum(no_speech * dur),
+    }
+
+
+def _novelty(windows):
+    """
+    Nouveauté lexicale de chaque fenêtre: 1 - cosinus entre son vecteur
+    TF-IDF et celui de toute la vidéo (une fenêtre qui répète le vocabulaire
+    général de la vidéo est peu nouvelle).
+    """
+    vocab, rows, cols = {}, [], []
+    for i, w in enumerate(windows):
+        for tok in TOKEN.findall(w["text"].lower()):
+            rows.append(i)
+            cols.append(vocab.setdefault(tok, len(vocab)))
+    if not vocab:
+        return np.zeros(len(windows))
+    tf = np.zeros((len(windows), len(vocab)), dtype=np.float32)
+    np.add.at(tf, (np.array(rows), np.array(cols)), 1.0)
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log((1.0 + len(windows)) / (1.0 + df)) + 1.0
+    tfidf = tf * idf.astype(np.float32)
+    video = tfidf.sum(axis=0)
+    norms = np.linalg.norm(tfidf, axis=1) * (np.linalg.norm(video) or 1.0)
+    cos = np.divide(tfidf @ video, norms, out=np.zeros(len(windows), dtype=np.float32), where=norms > 0)
+    return 1.0 - cos
+
+
+def window_features(windows, segments):
+    """
+    Caractéristiques locales de chaque fenêtre, calculées en bloc (NumPy):
+    mots, débit de parole (mots/s), densité de ?/! (par mot), avg_logprob et
+    no_speech_prob moyens (pondérés par la durée des segments), nouveauté TF-IDF.
+    """
+    n = len(windows)
+    if not n:
+        return {}
+    arr = _segment_arrays(segments)
+    t0 = np.array([w["start"] for w in windows], dtype=np.float64)
+    t1 = np.array([w["end"] for w in windows], dtype=np.float64)
+    # mêmes segments que iter_windows: fin >= début de fenêtre et début <= fin de fenêtre
+    lo = np.searchsorted(arr["max_end"], t0, side="left")
+    hi = np.maximum(np.searchsorted(arr["starts"], t1, side="right"), lo)
+
+    def span(name):
+        return arr[name][hi] - arr[name][lo]
+
+    dur = span("dur")
+    words = span("words")
+    safe_dur = np.where(dur > 0, dur, 1.0)
+    return {
+        "words": words,
+        "speech_rate": words / np.maximum(t1 - t0, 1e-6),
+        "marks": span("marks") / np.maximum(words, 1.0),
+        "avg_logprob": np.where(dur > 0, span("logprob") / safe_dur, 0.0),
+        "no_speech_prob": np.where(dur > 0, span("no_speech") / safe_dur, 0.0),
+        "novelty": _novelty(windows),
+    }
+
+
+def _zscore(values):
+    std = values.std()
+    return (values - values.mean()) / std if std > 0 else np.zeros_like(values)
+
+
+def prefilter_scores(features, weights=PREFILTER_WEIGHTS):
+    """Score local (somme pondérée des caractéristiques centrées-réduites sur la vidéo)."""
+    total = np.zeros(len(features["words"]))
+    for name, weight in weights.items():
+        total += weight * _zscore(np.asarray(features[name], dtype=np.float64))
+    return total
+
+
+def select_windows(windows, segments, keep=PREFILTER_KEEP, cutoff=PREFILTER_CUTOFF, min_words=PREFILTER_MIN_WORDS):
+    """
+    Fenêtres à envoyer au LLM: celles qui ont au moins `min_words` mots et
+    dont le score local est dans la meilleure fraction `keep`, ou au-dessus
+    de `cutoff` s'il est défini.
+
+    Returns:
+        (list, ndarray): indices retenus (ordre d'origine), scores locaux
+    """
+    if not windows:
+        return [], np.zeros(0)
+    features = window_features(windows, segments)
+    scores = prefilter_scores(features)
+    eligible = features["words"] >= min_words
+    if cutoff is not None:
+        chosen = eligible & (scores >= cutoff)
+    else:
+        budget = int(math.ceil(keep * len(windows)))
+        ranked = [i for i in np.argsort(-scores, kind="stable") if eligible[i]]
+        chosen = np.zeros(len(windows), dtype=bool)
+        chosen[ranked[:budget]] = True
+    return [int(i) for i in np.flatnonzero(chosen)], scores
@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import subprocess
+import threading
+from bisect import bisect_right
+from functools import lru_cache
+from config import VIDEO_PATH, PROBE_CACHE_DIR, PROBE_CACHE_MAX_BYTES
+from cache import DiskCache, make_key
+
+# Métadonnées déjà lues dans ce processus: {(kind, path, size, mtime): info}
+_MEMO = {}
+_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_probe_cache():
+    """Métadonnées des médias déjà sondés, sur disque."""
+    return DiskCache(PROBE_CACHE_DIR, max_bytes=PROBE_CACHE_MAX_BYTES)
+
+
+def _run(cmd):
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Command failed: {' '.join(cmd)}\n{proc.stderr}")
+    return proc.stdout
+
+
+def _rate(value):
+    value = str(value or "0/1")
+    if "/" in value:
+        num, den = value.split("/", 1)
+        return float(num) / float(den) if float(den) != 0 else 0.0
+    return float(value or 0.0)
+
+
+def _memoized(kind, path, compute):
+    """
+    Résultat de `compute(path)` mis en cache en mémoire puis sur disque,
+    sous la clé chemin + taille + date de modification: un fichier réécrit
+    (nouveau téléchargement) est automatiquement ressondé.
+    """
+    st = os.stat(path)
+    ident = (kind, os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _LOCK:
+        if ident in _MEMO:
+            return _MEMO[ident]
+    cache = get_probe_cache()
+    key = make_key("probe", *ident)
+    info = cache.get(key)
+    if info is None:
+        info = compute(path)
+        cache.set(key, info)
+    with _LOCK:
+        _MEMO[ident] = info
+    return info
+
+
+def _probe_streams(path):
+    out = _run([
+        "ffprobe", "-v", "error",
+        "-show_entries",
+        "format=duration:stream=codec_type,codec_name,width,height,avg_frame_rate,channels,channel_layout,sample_rate",
+        "-of", "json",
+        path,
+    ])
+    data = json.loads(out)
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    return {
+        "width": int(video.get("width", 0)),
+        "height": int(video.get("height", 0)),
+        "fps": _rate(video.get("avg_frame_rate")),
+        "video_codec": video.get("codec_name"),
+        "duration": float(data.get("format", {}).get("duration") or 0.0),
+        "audio": {
+            "codec": audio.get("codec_name"),
+            "channels": int(audio.get("channels", 0)),
+            "channel_layout": audio.get("channel_layout"),
+            "sample_rate": int(audio.get("sample_rate", 0)),
+        } if audio else None,
+    }
+
+
+def _probe_keyframes(path):
+    # lecture des paquets seulement (drapeau K), aucun décodage
+    out = _run([
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0",
+        path,
+    ])
+    times = []
+    for line in out.splitlines():
+        parts = line.strip().split(",")
+        if len(parts) >= 2 and "K" in parts[1] and parts[0] not in ("", "N/A"):
+            times.append(round(float(parts[0]), 3))
+    return sorted(times)
+
+
+def probe(path=VIDEO_PATH):
+    """
+    Métadonnées du média: {width, height, fps, video_codec, duration, audio}
+    (`audio` = {codec, channels, channel_layout, sample_rate} ou None).
+    Un seul ffprobe par fichier, mémorisé en mémoire et sur disque.
+    """
+    return _memoized("streams", path, _probe_streams)
+
+
+def dims(path=VIDEO_PATH):
+    """(width, height, fps) du flux vidéo, (0, 0, 0.0) si illisible."""
+    try:
+        info = probe(path)
+        return info["width"], info["height"], info["fps"]
+    except Exception:
+        return 0, 0, 0.0
+
+
+def has_audio(path=VIDEO_PATH):
+    """True si le média a une piste audio (True par défaut si illisible: le mapping reste optionnel)."""
+    try:
+        return probe(path)["audio"] is not None
+    except Exception:
+        return True
+
+
+def keyframes(path=VIDEO_PATH):
+    """Instants (s) des images clés du flux vidéo, triés. Sondé une fois par fichier."""
+    return _memoized("keyframes", path, _probe_keyframes)
+
+
+def keyframe_before(path, t):
+    """Dernière image clé à ou avant `t`: point réel d'où ffmpeg décode après un -ss."""
+    kf = keyframes(path)
+    i = bisect_right(kf, t)
+    return kf[i - 1] if i > 0 else 0.0
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else VIDEO_PATH
+    try:
+        info = dict(probe(path), keyframes=len(keyframes(path)))
+        result = {"success": True, "path": path, "info": info}
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+    print(json.dumps(result, ensure_ascii=False))
+    sys.exit(0 if result["success"] else 1)
@@ -1,7 +1,47 @@
 import json
 import time
-from config import MODEL_NAME, MARGIN, MISTRAL_KEY, OUTPUT_DIR, TRANSCRIPT_PATH, MARGIN,REFINED_PATH
-from mistralai import Mistral
+from config import (
+    MODEL_NAME, MARGIN, MISTRAL_KEY, OUTPUT_DIR, TRANSCRIPT_PATH, MARGIN,REFINED_PATH, REFINE_PROMPT_VERSION,
+    REFINE_DELAY, REFINE_LOCAL, REFINE_MIN_CONFIDENCE,
+)
+from llm import chat_complete, get_llm_cache, llm_cache_key
+from transcript_index import TranscriptIndex
+from boundaries import local_boundaries
+from metrics import record
+
+def refine_candidates(client, snapped, segments, margin=MARGIN, index=None, local=REFINE_LOCAL,
+                      min_confidence=REFINE_MIN_CONFIDENCE, limiter=None):
+    """
+    Raffine en mémoire une liste de candidats (sans sauvegarde).
+    Avec `local`, les bornes sont d'abord cherchées dans la transcription
+    (ponctuation, silences, horodatage des mots); le LLM n'est appelé que
+    si la confiance est sous `min_confidence`. Les appels LLM passent par
+    `limiter` (RateLimiter partagé avec le scoring) s'il est fourni, sinon
+    par une pause fixe REFINE_DELAY.
+    """
+    if index is None:
+        index = TranscriptIndex(segments)
+    refined = []
+    for seg in snapped:
+        guess = local_boundaries(seg, index, margin) if local else None
+        if guess and guess["confidence"] >= min_confidence:
+            record("refine", method="local", confidence=guess["confidence"])
+            refined.append(_refined(seg, guess["start"], guess["end"], "local", guess["confidence"]))
+        else:
+            refined.append(refine_timecodes_llm(client, seg, segments, margin=margin, index=index, fallback=guess,
+                                                limiter=limiter))
+    return refined
+
+
+def _refined(candidate, start, end, method, confidence=None):
+    return {
+        "start": start,
+        "end": end,
+        "text": candidate.get("text", ""),
+        "score": candidate.get("score", 0),
+        "refine": method,
+        "confidence": confidence,
+    }
 
 def refine_all_segments(client):
     """
@@ -9,7 +49,6 @@ def refine_all_segments(client):
     détecter le véritable début et la véritable fin de chaque propos.
     """
     try:
-        refined = []
         with open(OUTPUT_DIR + "/snapped.json", "r", encoding="utf-8") as f:
             snapped = json.load(f)
 
@@ -17,20 +56,19 @@ def refine_all_segments(client):
             segments = json.load(f)
             segments = segments["segments"]
 
-        for seg in snapped:
-            refined_seg = refine_timecodes_llm(client, seg, segments, margin=MARGIN)
-            refined.append(refined_seg)
+        refined = refine_candidates(client, snapped, segments)
 
         #enregistrement des segments raffinés
         with open(REFINED_PATH, "w", encoding="utf-8") as f:
             json.dump(refined, f, ensure_ascii=False, indent=4)
-        return {"success": True, "count": len(refined)}
+        cache = get_llm_cache()
+        return {"success": True, "count": len(refined), "cache": cache.stats() if cache else None}
 
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
-def refine_timecodes_llm(client, candidate, full_segments, margin=MARGIN):
+def refine_timecodes_llm(client, candidate, full_segments, margin=MARGIN, index=None, fallback=None, limiter=None):
     """
     Raffine les timecodes d'un segment en appelant un LLM pour
     détecter le véritable début et la véritable fin d'un propos.
@@ -40,9 +78,13 @@ def refine_timecodes_llm(client, candidate, full_segments, margin=MARGIN):
         candidate (dict): segment candidat {start, end, text, score}
         full_segments (list): transcription complète [{start, end, text}]
         margin (float): marge de temps ajoutée autour du candidat
+        index (TranscriptIndex): index de la transcription (construit si absent)
+        fallback (dict): bornes locales {start, end, confidence} gardées si la
+            réponse du LLM est inexploitable (sinon: la fenêtre entière)
+        limiter (RateLimiter): limiteur requêtes/s + tokens/min partagé
 
     Returns:
-        dict: segment raffiné {start, end, text, score}
+        dict: segment raffiné {start, end, text, score, refine, confidence}
     """
     print("🔧 Raffinage LLM")
 
@@ -56,11 +98,42 @@ def refine_timecodes_llm(client, candidate, full_segments, margin=MARGIN):
         print(e)
 
     # isole les segments autour du candidat
-    window_segments = [
-        s for s in full_segments if s["end"] >= w_start and s["start"] <= w_end
-    ]
+    if index is None:
+        index = TranscriptIndex(full_segments)
+    window_segments = index.segments_between(w_start, w_end)
     window_payload = json.dumps(window_segments, ensure_ascii=False)
     
+    cache = get_llm_cache()
+    key = llm_cache_key("refine", REFINE_PROMPT_VERSION, window_payload)
+    data = cache.get(key) if cache else None
+    if data is None:
+        try:
+            data = ask_boundaries_llm(client, window_payload, limiter=limiter)
+        except Exception as e:
+            # réponse non JSON ou appel en échec: on garde les bornes locales plutôt que d'arrêter l'étape
+            print(f"⚠️ Raffinage LLM inexploitable ({e}), bornes locales conservées")
+            record("refine", method="fallback", error=str(e))
+            if fallback:
+                return _refined(candidate, fallback["start"], fallback["end"], "fallback", fallback["confidence"])
+            return _refined(candidate, w_start, w_end, "fallback")
+        if cache:
+            cache.set(key, data)
+        if limiter is None:
+            # anti-rate limit (sans limiteur partagé)
+            time.sleep(REFINE_DELAY)
+    record("refine", method="llm", confidence=fallback["confidence"] if fallback else None)
+
+    rs, re = float(data["start"]), float(data["end"])
+
+    # clamp & fallback
+    rs, re = clamp(rs, 0.0, video_end), clamp(re, 0.0, video_end)
+    if re <= rs:
+        rs, re = w_start, w_end
+
+    return _refined(candidate, rs, re, "llm")
+
+def ask_boundaries_llm(client, window_payload, limiter=None):
+    """Demande au LLM le début et la fin du propos; retourne {"start", "end"}."""
     # prompt LLM
     prompt = f"""Tu es un assistant spécialisé dans la détection de débuts et fins de propos dans une transcription de vidéo.
 
@@ -82,38 +155,19 @@ Réponds UNIQUEMENT au format JSON strict :
 "end": <float>
 }}"""
 
-    # appel au modèle
-    resp = client.chat.complete(
-        model=MODEL_NAME,
-        messages=[{"role": "user", "content": prompt}],
-    )
+    # appel au modèle (un seul essai, comme avant; mesuré sous "refine")
+    raw = chat_complete(client, prompt, limiter=limiter, model=MODEL_NAME, max_retries=0, label="refine")
 
     # parsing du JSON
-    raw = resp.choices[0].message.content.strip()
     data = json.loads(raw)
-
-    rs, re = float(data["start"]), float(data["end"])
-
-    # clamp & fallback
-    rs, re = clamp(rs, 0.0, video_end), clamp(re, 0.0, video_end)
-    if re <= rs:
-        rs, re = w_start, w_end
-
-    # anti-rate limit
-    time.sleep(2)
-
-    return {
-        "start": rs,
-        "end": re,
-        "text": candidate.get("text", ""),
-        "score": candidate.get("score", 0),
-    }
+    return {"start": float(data["start"]), "end": float(data["end"])}
 
 def clamp(x, a, b):
     return max(a, min(b, x))
 
 
 if __name__ == "__main__":
+    from mistralai import Mistral
     client = Mistral(api_key=MISTRAL_KEY)
     result = refine_all_segments(client)
     print(result)
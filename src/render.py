@@ -0,0 +1,303 @@
+import os
+import json
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import RENDER_WORKERS, RENDER_THREADS_PER_JOB, DRAFT_SIZE, DRAFT_FPS, DRAFT_CRF
+from probe import has_audio as probe_has_audio
+from metrics import record
+
+# Encodage final commun à toutes les variantes (1080x1920, 30 fps, qualité haute)
+ENCODE_ARGS = [
+    "-r", "30",
+    "-c:v", "libx264", "-preset", "medium", "-crf", "18",
+    "-pix_fmt", "yuv420p",
+    "-c:a", "aac", "-b:a", "128k",
+    "-movflags", "+faststart",
+]
+
+# Aperçus de relecture: encodage le plus rapide possible, qualité suffisante pour trier
+DRAFT_ENCODE_ARGS = [
+    "-r", str(DRAFT_FPS),
+    "-c:v", "libx264", "-preset", "ultrafast", "-crf", str(DRAFT_CRF),
+    "-pix_fmt", "yuv420p",
+    "-c:a", "aac", "-b:a", "64k",
+    "-movflags", "+faststart",
+]
+
+
+def run(cmd):
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Command failed: {' '.join(cmd)}\n{proc.stderr}")
+    return proc.stdout
+
+
+OUT_W, OUT_H = 1080, 1920
+
+
+def chain(vf):
+    """Transforme une chaîne de filtres simple ("scale=...,crop=...") en gabarit de graphe."""
+    return "[{inp}]" + vf + "[{out}]"
+
+
+def _even(v):
+    return max(2, int(v) // 2 * 2)
+
+
+def crop_box(in_w, in_h, zoom_factor=1.0, center=None):
+    """
+    Zone source (w, h, x, y) qui, agrandie en 1080x1920, donne le même cadrage
+    qu'un scale à max(1920, 1920*zoom) de haut suivi d'un crop 1080x1920.
+    `center` (pixels source) positionne la zone, sinon elle est centrée.
+    """
+    ratio = max(OUT_H, int(OUT_H * float(zoom_factor))) / float(in_h)
+    w = _even(min(in_w, OUT_W / ratio))
+    h = _even(min(in_h, OUT_H / ratio))
+    cx, cy = center if center is not None else (in_w / 2.0, in_h / 2.0)
+    x = int(max(0, min(in_w - w, cx - w / 2.0)))
+    y = int(max(0, min(in_h - h, cy - h / 2.0)))
+    return w, h, x, y
+
+
+def crop_graph(dims, zoom_factor=1.0, center=None, size=(OUT_W, OUT_H)):
+    """
+    Recadrage 9:16 (centré ou sur `center`): crop dans la source PUIS upscale,
+    jamais l'inverse. La zone recadrée ne dépend pas de `size` (taille de
+    sortie): un aperçu et le rendu final montrent exactement le même cadre.
+    """
+    out_w, out_h = size
+    in_w, in_h = dims[0], dims[1]
+    if not in_w or not in_h:
+        # dimensions inconnues: scale puis crop centré, calculé par ffmpeg
+        vf = f"scale=-2:{max(OUT_H, int(OUT_H * float(zoom_factor)))},crop={OUT_W}:{OUT_H}"
+        return chain(vf if size == (OUT_W, OUT_H) else vf + f",scale={out_w}:{out_h}")
+    w, h, x, y = crop_box(in_w, in_h, zoom_factor, center)
+    return chain(f"crop={w}:{h}:{x}:{y},scale={out_w}:{out_h},setsar=1")
+
+
+def blur_graph(dims, zoom_factor=1.0, center=None, size=(OUT_W, OUT_H)):
+    """
+    Avant-plan net qui tient dans la sortie (1080x1920) sur un arrière-plan
+    flou qui la remplit. L'arrière-plan est recadré en 9:16 dans la source
+    avant l'upscale. Les étiquettes internes sont préfixées par {out}.
+    """
+    out_w, out_h = size
+    radius = max(2, round(20 * out_w / OUT_W))  # même flou relatif quelle que soit la taille
+    return (
+        "[{inp}]split[{out}_fg][{out}_bg];"
+        f"[{{out}}_fg]scale={out_w}:{out_h}:force_original_aspect_ratio=decrease[{{out}}_v0];"
+        f"[{{out}}_bg]crop='min(iw,ih*{OUT_W}/{OUT_H})':'min(ih,iw*{OUT_H}/{OUT_W})',"
+        f"scale={out_w}:{out_h},setsar=1,boxblur={radius}:1[{{out}}_v1];"
+        "[{out}_v1][{out}_v0]overlay=(W-w)/2:(H-h)/2[{out}]"
+    )
+
+
+# Styles de rendu: graphe + besoin d'une détection de visage + nom de fichier.
+# Ajouter un style = ajouter une entrée ici.
+STYLES = {
+    "smart": {"graph": crop_graph, "face": True, "filename": "clip_{i}.mp4"},
+    "center": {"graph": crop_graph, "face": False, "filename": "clip_v1_{i}.mp4"},
+    "blur": {"graph": blur_graph, "face": False, "filename": "clip_origine_{i}.mp4"},
+}
+
+
+def render_clip(source, start, duration, graph, output, has_audio=True, threads=None, encode_args=ENCODE_ARGS):
+    """
+    Rend un clip final en un seul passage: recherche précise (-ss avant -i,
+    avec décodage) directement dans la source, filtre, encodage. Aucun
+    fichier temporaire.
+
+    Args:
+        source (str): vidéo source
+        start (float): début en secondes dans la source
+        duration (float): durée en secondes
+        graph (str): gabarit de filtre vidéo avec les étiquettes {inp} et {out}
+        output (str): chemin du clip de sortie
+        threads (int): threads ffmpeg alloués à ce clip (None = ffmpeg décide)
+        encode_args (list): ENCODE_ARGS (final) ou DRAFT_ENCODE_ARGS (aperçu)
+    """
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-ss", f"{start:.3f}",
+        "-t", f"{duration:.3f}",
+        "-i", source,
+        "-filter_complex", graph.format(inp="0:v", out="v"),
+        "-map", "[v]",
+    ]
+    if has_audio:
+        cmd += ["-map", "0:a:0?"]
+    if threads:
+        cmd += ["-threads", str(threads)]
+    run(cmd + encode_args + [output])
+
+
+def render_variants(source, start, duration, outputs, has_audio=True, threads=None, encode_args=ENCODE_ARGS):
+    """
+    Rend plusieurs styles d'un même segment en une invocation ffmpeg: le
+    segment est décodé une fois puis dupliqué par `split` vers chaque style.
+
+    Args:
+        outputs (list): [(graph, path)] un gabarit de graphe par fichier de sortie
+    """
+    n = len(outputs)
+    if n == 1:
+        parts = ["[0:v]null[s0]"]
+    else:
+        parts = ["[0:v]split=" + str(n) + "".join(f"[s{i}]" for i in range(n))]
+    for i, (graph, _) in enumerate(outputs):
+        parts.append(graph.format(inp=f"s{i}", out=f"v{i}"))
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-ss", f"{start:.3f}",
+        "-t", f"{duration:.3f}",
+        "-i", source,
+        "-filter_complex", ";".join(parts),
+    ]
+    for i, (_, path) in enumerate(outputs):
+        cmd += ["-map", f"[v{i}]"]
+        if has_audio:
+            cmd += ["-map", "0:a:0?"]
+        if threads:
+            cmd += ["-threads", str(threads)]
+        cmd += encode_args + [path]
+    run(cmd)
+
+
+def render_single_pass(source, jobs, has_audio=True):
+    """
+    Rend tous les clips d'une même source en une seule invocation ffmpeg:
+    la source est ouverte et démuxée une fois, le flux décodé est dupliqué
+    par `split`/`asplit` puis découpé par `trim`/`atrim` pour chaque sortie.
+
+    Args:
+        source (str): vidéo source
+        jobs (list): [{start, duration, graph, output}]
+    """
+    if not jobs:
+        return
+    lo = min(j["start"] for j in jobs)
+    hi = max(j["start"] + j["duration"] for j in jobs)
+    n = len(jobs)
+
+    parts = ["[0:v]split=" + str(n) + "".join(f"[s{i}]" for i in range(n))]
+    if has_audio:
+        parts.append("[0:a]asplit=" + str(n) + "".join(f"[as{i}]" for i in range(n)))
+    for i, job in enumerate(jobs):
+        # temps relatifs au point d'entrée -ss
+        a = job["start"] - lo
+        b = a + job["duration"]
+        parts.append(f"[s{i}]trim=start={a:.3f}:end={b:.3f},setpts=PTS-STARTPTS[t{i}]")
+        parts.append(job["graph"].format(inp=f"t{i}", out=f"v{i}"))
+        if has_audio:
+            parts.append(f"[as{i}]atrim=start={a:.3f}:end={b:.3f},asetpts=PTS-STARTPTS[a{i}]")
+
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-ss", f"{lo:.3f}",
+        "-t", f"{hi - lo:.3f}",
+        "-i", source,
+        "-filter_complex", ";".join(parts),
+    ]
+    for i, job in enumerate(jobs):
+        cmd += ["-map", f"[v{i}]"]
+        if has_audio:
+            cmd += ["-map", f"[a{i}]"]
+        cmd += ENCODE_ARGS + [job["output"]]
+    run(cmd)
+
+
+def _record_render(output, ok, seconds, clip_seconds, outputs=1, **fields):
+    """Mesure d'un ffmpeg: temps d'encodage et facteur temps réel (s de clip produites / s)."""
+    produced = clip_seconds * outputs
+    record("render", output=output, ok=ok, seconds=seconds, clip_seconds=round(clip_seconds, 3), outputs=outputs,
+           realtime_factor=round(produced / seconds, 3) if ok and seconds else None, **fields)
+
+
+def render_jobs(jobs, workers=RENDER_WORKERS):
+    """
+    Rend des clips en parallèle. Les cœurs sont partagés entre les processus
+    ffmpeg via -threads, les clips les plus longs partent en premier, et une
+    erreur sur un clip n'interrompt pas les autres.
+
+    Args:
+        jobs (list): [{source, start, duration, graph, output}] ou, pour
+            plusieurs styles d'un même segment, [{source, start, duration, outputs}];
+            "encode_args" optionnel (DRAFT_ENCODE_ARGS pour un aperçu)
+        workers (int): processus ffmpeg simultanés (0 = auto)
+
+    Returns:
+        list: [{output, ok, seconds, error?}] dans l'ordre de `jobs`
+    """
+    if not jobs:
+        return []
+    cores = os.cpu_count() or 1
+    workers = workers or max(1, cores // RENDER_THREADS_PER_JOB)
+    workers = max(1, min(workers, len(jobs)))
+    threads = max(1, cores // workers)
+    results = [None] * len(jobs)
+
+    def work(i):
+        job = jobs[i]
+        name = job.get("output") or ", ".join(p for _, p in job["outputs"])
+        t0 = time.time()
+        try:
+            audio = probe_has_audio(job["source"])
+            encode_args = job.get("encode_args", ENCODE_ARGS)
+            if "outputs" in job:
+                render_variants(job["source"], job["start"], job["duration"], job["outputs"],
+                                has_audio=audio, threads=threads, encode_args=encode_args)
+            else:
+                render_clip(job["source"], job["start"], job["duration"], job["graph"], job["output"],
+                            has_audio=audio, threads=threads, encode_args=encode_args)
+            results[i] = {"output": name, "ok": True, "seconds": round(time.time() - t0, 2)}
+        except Exception as e:
+            print(f"⚠️ Rendu échoué: {name}: {e}")
+            results[i] = {"output": name, "ok": False, "seconds": round(time.time() - t0, 2), "error": str(e)}
+        _record_render(name, results[i]["ok"], round(time.time() - t0, 3), job["duration"],
+                       outputs=len(job.get("outputs") or [None]), threads=threads)
+
+    # le plus long d'abord: évite qu'un gros clip démarre seul en fin de lot
+    order = sorted(range(len(jobs)), key=lambda i: jobs[i]["duration"], reverse=True)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(work, order))
+    return results
+
+
+def execute_jobs(jobs, single_pass=False, workers=RENDER_WORKERS):
+    """
+    Rend une liste de clips, soit en parallèle (render_jobs), soit un ffmpeg
+    unique par source (render_single_pass). Résultats dans l'ordre de `jobs`.
+    """
+    if not single_pass:
+        return render_jobs(jobs, workers=workers)
+    by_source = {}
+    for i, job in enumerate(jobs):
+        by_source.setdefault(job["source"], []).append(i)
+    results = [None] * len(jobs)
+    for source, idxs in by_source.items():
+        t0 = time.time()
+        try:
+            # asplit échoue sans piste audio: on le sait grâce au probe mémorisé
+            render_single_pass(source, [jobs[i] for i in idxs], has_audio=probe_has_audio(source))
+            status = {"ok": True}
+        except Exception as e:
+            print(f"⚠️ Rendu groupé échoué ({source}): {e}")
+            status = {"ok": False, "error": str(e)}
+        for i in idxs:
+            results[i] = dict(status, output=jobs[i]["output"], seconds=round(time.time() - t0, 2))
+        _record_render(source, status["ok"], round(time.time() - t0, 3), sum(jobs[i]["duration"] for i in idxs),
+                       mode="single_pass", clips=len(idxs))
+    return results
+
+
+def save_clips_manifest(results, path):
+    """Écrit clips.json: clips réussis dans l'ordre des segments, erreurs à part (`path` None: sans écrire)."""
+    clips_json = {"clips": [r["output"] for r in results if r["ok"]]}
+    errors = [{"output": r["output"], "error": r["error"]} for r in results if not r["ok"]]
+    if errors:
+        clips_json["errors"] = errors
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(clips_json, f, ensure_ascii=False, indent=2)
+    return clips_json
@@ -1,33 +1,289 @@
-import sys, json, os
-from config import BLOCKS_PATH, SCORED_PATH, MISTRAL_KEY, MODEL_NAME, N_TOP_SEGMENTS 
-from mistralai import Mistral
-import time
+import sys, json, os, re
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    BLOCKS_PATH, SCORED_PATH, TRANSCRIPT_PATH, MISTRAL_KEY, MISTRAL_SERVER_URL, MODEL_NAME, N_TOP_SEGMENTS,
+    SCORE_PARALLEL_WORKERS, SCORE_BATCH_SIZE, SCORE_BATCH_MAX_TOKENS, SCORE_PROMPT_VERSION, PREFILTER_ENABLED,
+    SCORE_MODE, SCORE_CHUNK_SIZE, CHUNKS_PATH, SCORE_HIER_LEVELS, SCORE_HIER_MAX_WINDOWS,
+)
+from llm import RateLimiter, chat_complete, estimate_tokens, get_llm_cache, llm_cache_key
+from metrics import record
+
+BATCH_PROMPT = """Tu es un expert en montage de vidéos courtes (TikTok/Shorts) et tu gères un compte sur le cinema.
+Voici plusieurs passages numérotés d'une vidéo YouTube.
+Évalue CHAQUE passage séparément pour son potentiel :
+- Idée originale/surprenante
+- Explication claire et digeste
+- Émotion (inspiration)
+- Pertinence grand public
+- Potentiel de rétention
+- moment “wow”
+
+Donne à chaque passage une note globale entière de 1 à 10, sachant que un 8 signifie qui vas etre publie sur TikTok.
+Réponds UNIQUEMENT par un tableau JSON strict, un objet par passage, rien d'autre :
+[{{"index": 0, "score": 8}}, {{"index": 1, "score": 5}}]
+
+Passages :
+{passages}"""
 
 def build_mistral_client():
     if not MISTRAL_KEY:
         raise RuntimeError("Définis MISTRAL_API_KEY dans l’environnement.")
+    from mistralai import Mistral
+    if MISTRAL_SERVER_URL:
+        return Mistral(api_key=MISTRAL_KEY, server_url=MISTRAL_SERVER_URL)
     return Mistral(api_key=MISTRAL_KEY)
 
-def score_segments():
+def score_blocks(client, blocks, workers=SCORE_PARALLEL_WORKERS, limiter=None,
+                 batch_size=SCORE_BATCH_SIZE, max_tokens=SCORE_BATCH_MAX_TOKENS):
+    """
+    Note chaque fenêtre en mémoire et retourne la liste notée (sans sauvegarde).
+    Jusqu'à `workers` requêtes sont en vol en même temps, toutes passant par le
+    même limiteur (requêtes/s + tokens/min). L'ordre des fenêtres est conservé.
+    Si `batch_size` > 1, plusieurs fenêtres partagent une même requête.
+    """
+    if limiter is None:
+        limiter = RateLimiter()
+    if batch_size > 1:
+        jobs = make_batches(blocks, batch_size, max_tokens)
+        task = lambda batch: score_batch(client, batch, limiter)
+    else:
+        jobs = blocks
+        task = lambda s: score_one_segment(client, s, limiter)
+    if workers <= 1:
+        results = [task(j) for j in jobs]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(task, jobs))
+    if batch_size > 1:
+        return [seg for batch in results for seg in batch]
+    return results
+
+def score_windows(client, windows, segments=None, limiter=None, prefilter=PREFILTER_ENABLED,
+                  batch_size=SCORE_BATCH_SIZE, **kwargs):
+    """
+    Comme score_blocks, mais seules les fenêtres retenues par le pré-tri local
+    (prefilter.py: débit de parole, nouveauté TF-IDF, ?/!, confiance Whisper)
+    partent au LLM. Les autres reçoivent la note 0 et "prefiltered": True;
+    toutes gardent leur score local "prefilter". L'ordre et le nombre de
+    fenêtres de scored.json sont inchangés.
+    """
+    if not prefilter or not segments or not windows:
+        return score_blocks(client, windows, limiter=limiter, batch_size=batch_size, **kwargs)
+    from prefilter import select_windows
+    kept, local = select_windows(windows, segments)
+    for w, value in zip(windows, local):
+        w["prefilter"] = round(float(value), 3)
+    chosen = set(kept)
+    for i, w in enumerate(windows):
+        if i not in chosen:
+            w["score"] = 0
+            w["prefiltered"] = True
+
+    sent = [windows[i] for i in kept]
+    def requests(blocks):
+        return len(make_batches(blocks, batch_size)) if batch_size > 1 else len(blocks)
+    saved = requests(windows) - requests(sent)
+    skipped = [w for i, w in enumerate(windows) if i not in chosen]
+    record("prefilter", windows=len(windows), sent=len(sent), saved_calls=saved,
+           saved_tokens=sum(estimate_tokens(w["text"]) for w in skipped))
+    print(f"✂️ Pré-tri local: {len(sent)}/{len(windows)} fenêtres envoyées au LLM ({saved} appels évités)")
+
+    score_blocks(client, sent, limiter=limiter, batch_size=batch_size, **kwargs)
+    return windows
+
+def score_by_chunks(client, windows, segments, limiter=None, chunk_size=SCORE_CHUNK_SIZE, **kwargs):
+    """
+    Mode "chunks": note une seule fois des morceaux contigus sans chevauchement,
+    puis dérive la note de chaque fenêtre par sommes cumulées (chunks.py).
+    Chaque passage n'est envoyé qu'une fois au lieu de ~WINDOW_SIZE/STEP_SIZE.
+
+    Returns:
+        (list, list): fenêtres notées (format scored.json), morceaux notés
+    """
+    from chunks import build_chunks, score_from_chunks
+    chunks = build_chunks(segments, chunk_size)
+    print(f"🧩 {len(chunks)} morceaux de {chunk_size:g}s à noter (au lieu de {len(windows)} fenêtres)")
+    score_windows(client, chunks, segments, limiter=limiter, **kwargs)
+    return score_from_chunks(windows, chunks), chunks
+
+def _overlap(w, regions):
+    """Part de la fenêtre `w` couverte par les zones [(a, b)] disjointes."""
+    length = max(w["end"] - w["start"], 1e-9)
+    covered = sum(max(0.0, min(w["end"], b) - max(w["start"], a)) for a, b in regions)
+    return covered / length
+
+def _regions(windows):
+    """Union triée des plages [start, end] des fenêtres."""
+    regions = []
+    for w in sorted(windows, key=lambda w: w["start"]):
+        if regions and w["start"] <= regions[-1][1]:
+            regions[-1][1] = max(regions[-1][1], w["end"])
+        else:
+            regions.append([w["start"], w["end"]])
+    return [tuple(r) for r in regions]
+
+def score_hierarchical(client, windows, segments, limiter=None, levels=SCORE_HIER_LEVELS,
+                       max_windows=SCORE_HIER_MAX_WINDOWS, **kwargs):
+    """
+    Mode "hierarchical": note d'abord de grandes fenêtres, ne garde que les
+    `keep` meilleures zones de chaque niveau, puis ne note aux fenêtres fines
+    (`windows`, WINDOW_SIZE/STEP_SIZE) que celles qui tombent dans ces zones.
+    Les fenêtres fines hors zones reçoivent la note 0 et "pruned": True:
+    scored.json garde toutes les fenêtres, dans l'ordre.
+    Le pré-tri local n'est appliqué à aucun niveau: les zones remplacent
+    PREFILTER_KEEP et `max_windows` est le nombre exact de fenêtres fines
+    envoyées au LLM.
+    """
+    from sliding_window import build_windows
+    if not windows:
+        return windows
+    regions = [(0.0, max(w["end"] for w in windows))]
+    for depth, level in enumerate(levels):
+        coarse = [w for w in build_windows(segments, level["window"], level["step"]) if _overlap(w, regions) > 0]
+        # peu de grandes fenêtres, toutes utiles pour classer les zones: pas de pré-tri
+        score_windows(client, coarse, segments, limiter=limiter, prefilter=False, **kwargs)
+        best = sorted(coarse, key=lambda w: w.get("score", -1), reverse=True)[:level["keep"]]
+        regions = _regions(best)
+        record("hierarchy", level=depth, window=level["window"], scored=len(coarse), kept=len(best))
+        print(f"🔭 Niveau {depth} ({level['window']:g}s): {len(coarse)} fenêtres notées, "
+              f"{len(best)} gardées ({len(regions)} zones)")
+
+    # fenêtres fines majoritairement dans une zone gardée, les plus couvertes d'abord si budget
+    fine = [(i, _overlap(w, regions)) for i, w in enumerate(windows)]
+    fine = [(i, cover) for i, cover in fine if cover >= 0.5]
+    if max_windows is not None:
+        fine = sorted(fine, key=lambda x: -x[1])[:max_windows]
+    chosen = sorted(i for i, _ in fine)
+    selected = set(chosen)
+    for i, w in enumerate(windows):
+        if i not in selected:
+            w["score"] = 0
+            w["pruned"] = True
+    record("hierarchy", level=len(levels), final=True, scored=len(chosen), skipped=len(windows) - len(chosen))
+    print(f"🔬 Niveau final: {len(chosen)}/{len(windows)} fenêtres fines à noter")
+    # déjà élaguées par les zones: un pré-tri de plus retirerait encore une fraction du budget
+    score_windows(client, [windows[i] for i in chosen], segments, limiter=limiter, prefilter=False, **kwargs)
+    return windows
+
+def make_batches(blocks, batch_size, max_tokens=SCORE_BATCH_MAX_TOKENS):
+    """Groupe les fenêtres consécutives par paquets de `batch_size` sans dépasser `max_tokens`."""
+    base = estimate_tokens(BATCH_PROMPT)
+    batches, current, used = [], [], base
+    for seg in blocks:
+        cost = estimate_tokens(seg["text"]) + 8
+        if current and (len(current) >= batch_size or used + cost > max_tokens):
+            batches.append(current)
+            current, used = [], base
+        current.append(seg)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def parse_batch_scores(raw, n):
+    """Extrait {index: score} d'une réponse JSON; ignore les entrées invalides."""
+    start, end = raw.find("["), raw.rfind("]")
+    if start < 0 or end <= start:
+        return {}
+    try:
+        items = json.loads(raw[start:end + 1])
+    except ValueError:
+        return {}
+    scores = {}
+    for item in items if isinstance(items, list) else []:
+        try:
+            idx, score = int(item["index"]), int(item["score"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 0 <= idx < n and 1 <= score <= 10:
+            scores[idx] = score
+    return scores
+
+def score_batch(client, batch, limiter=None):
+    """
+    Note un paquet de fenêtres en une seule requête. Les fenêtres déjà en
+    cache ne sont pas renvoyées; celles absentes ou invalides dans la réponse
+    sont renotées une par une.
+    """
+    cache = get_llm_cache()
+    pending = []
+    for seg in batch:
+        cached = cache.get(llm_cache_key("score_batch", SCORE_PROMPT_VERSION, seg["text"])) if cache else None
+        if cached is None:
+            pending.append(seg)
+        else:
+            seg["score"] = cached
+    if not pending:
+        return batch
+
+    passages = "\n".join(
+        json.dumps({"index": i, "text": seg["text"]}, ensure_ascii=False) for i, seg in enumerate(pending)
+    )
+    prompt = BATCH_PROMPT.format(passages=passages)
+    try:
+        raw = chat_complete(client, prompt, limiter=limiter, model=MODEL_NAME, label="score_batch")
+        scores = parse_batch_scores(raw, len(pending))
+    except Exception as e:
+        print("⚠️ Scoring batch err:", e)
+        scores = {}
+    if len(scores) < len(pending):
+        print(f"ℹ️ Réponse groupée incomplète ({len(scores)}/{len(pending)}): repli fenêtre par fenêtre")
+    for i, seg in enumerate(pending):
+        if i in scores:
+            seg["score"] = scores[i]
+            if cache:
+                cache.set(llm_cache_key("score_batch", SCORE_PROMPT_VERSION, seg["text"]), scores[i])
+        else:
+            score_one_segment(client, seg, limiter)
+    return batch
+
+def score_segments(client=None):
     try:
         print("🧠 Évaluation des segments...")
         with open(BLOCKS_PATH, "r", encoding="utf-8") as f:
             data = json.load(f)
         segments = data
-        client = build_mistral_client()
-        out = []
-        for s in segments:
-            seg = score_one_segment(client, s)
-            out.append(seg)
+        # segments Whisper pour le pré-tri local (absent: toutes les fenêtres partent au LLM)
+        transcript = None
+        if os.path.exists(TRANSCRIPT_PATH):
+            with open(TRANSCRIPT_PATH, "r", encoding="utf-8") as f:
+                transcript = json.load(f).get("segments")
+        if client is None:
+            client = build_mistral_client()
+        if SCORE_MODE == "chunks" and transcript:
+            out, chunks = score_by_chunks(client, segments, transcript)
+            with open(CHUNKS_PATH, "w", encoding="utf-8") as f:
+                json.dump(chunks, f, ensure_ascii=False, indent=2)
+        elif SCORE_MODE == "hierarchical" and transcript:
+            out = score_hierarchical(client, segments, transcript)
+        else:
+            out = score_windows(client, segments, transcript)
         #enrigster dans un fichier
         with open(SCORED_PATH, "w", encoding="utf-8") as f:
             json.dump(out, f, ensure_ascii=False, indent=2)
-        return {"success": True, "count": len(out)}
+        cache = get_llm_cache()
+        sent = sum(1 for s in out if not s.get("prefiltered"))
+        return {"success": True, "count": len(out), "sent": sent, "cache": cache.stats() if cache else None}
 
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def score_one_segment(client, seg):
+def parse_score(raw):
+    """Note 1-10 d'une réponse libre ("8", "8/10", "Note : 8"); None si absente ou hors bornes."""
+    match = re.search(r"\d+", raw or "")
+    if not match:
+        return None
+    score = int(match.group())
+    return score if 1 <= score <= 10 else None
+
+def score_one_segment(client, seg, limiter=None):
+    cache = get_llm_cache()
+    key = llm_cache_key("score", SCORE_PROMPT_VERSION, seg["text"])
+    cached = cache.get(key) if cache else None
+    # une note hors bornes déjà en cache (ancien parseur) est ignorée et redemandée
+    if cached is not None and 1 <= cached <= 10:
+        seg["score"] = cached
+        return seg
     try:
         prompt = f"""Tu es un expert en montage de vidéos courtes (TikTok/Shorts) et tu gères un compte sur le cinema.
         voici un passage d'une vidéo YouTube :
@@ -46,17 +302,17 @@ def score_one_segment(client, seg):
                         8
                         Réponds uniquement avec le nombre absolument rien d'autre pas texte.
         """
-        resp = client.chat.complete(
-            model=MODEL_NAME,
-            messages=[{"role": "user", "content": prompt}],
-        )
-        raw = resp.choices[0].message.content.strip()
-        score = int("".join(filter(str.isdigit, raw))) if raw else 5
-        time.sleep(0.2)  # pour éviter les rate limits
+        raw = chat_complete(client, prompt, limiter=limiter, model=MODEL_NAME, label="score")
+        score = parse_score(raw)
+        if score is None:
+            # réponse inexploitable: pas de note, et surtout rien en cache pour les prochains runs
+            print(f"⚠️ Note illisible: {raw!r}")
+            score = -1
+        elif cache:
+            cache.set(key, score)
     except Exception as e:
         print("⚠️ Scoring err:", e)
         score = -1
-        time.sleep(5)  # pour éviter les rate limits
     seg["score"] = score
     return seg
 
@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+from bisect import bisect_left, bisect_right
+from config import (
+    VIDEO_PATH, SHOTS_PATH, SHOT_SAMPLE_FPS, SHOT_SAMPLE_SIZE, SHOT_THRESHOLD, SHOT_MIN_LEN,
+)
+
+
+def _histograms(frames, bins=16):
+    """Histogrammes normalisés (n, bins) d'un bloc d'images uint8 (n, h, w), sans boucle Python."""
+    import numpy as np
+    n = len(frames)
+    q = (frames.reshape(n, -1).astype(np.int64) * bins) >> 8
+    q += (np.arange(n, dtype=np.int64) * bins)[:, None]
+    counts = np.bincount(q.ravel(), minlength=n * bins).reshape(n, bins)
+    return counts / float(frames[0].size)
+
+
+def frame_scores(video_path=VIDEO_PATH, fps=SHOT_SAMPLE_FPS, size=SHOT_SAMPLE_SIZE, batch=512):
+    """
+    Score de changement de plan de chaque image échantillonnée, en un seul
+    passage basse résolution: distance d'histogramme (0-1) avec l'image précédente.
+
+    Returns:
+        (times, scores): listes de même longueur
+    """
+    import numpy as np
+    from faces import iter_frames
+
+    times, scores = [], []
+    prev_hist = None
+    block, block_t = [], []
+
+    def flush():
+        nonlocal prev_hist
+        hists = _histograms(np.stack(block))
+        if prev_hist is not None:
+            hists_prev = np.vstack([prev_hist[None, :], hists[:-1]])
+        else:
+            hists_prev = np.vstack([hists[:1], hists[:-1]])
+        scores.extend((0.5 * np.abs(hists - hists_prev).sum(axis=1)).tolist())
+        times.extend(block_t)
+        prev_hist = hists[-1]
+        block.clear()
+        block_t.clear()
+
+    for t, frame in iter_frames(video_path, 0.0, None, size, fps):
+        block.append(frame)
+        block_t.append(round(t, 3))
+        if len(block) >= batch:
+            flush()
+    if block:
+        flush()
+    return times, scores
+
+
+def pick_cuts(times, scores, threshold=SHOT_THRESHOLD, min_len=SHOT_MIN_LEN):
+    """Coupes = pics de score au-dessus du seuil, espacées d'au moins `min_len` secondes."""
+    cuts = []
+    for i, (t, s) in enumerate(zip(times, scores)):
+        if s < threshold:
+            continue
+        # garder seulement le maximum local (une coupe = une seule image)
+        if i + 1 < len(scores) and scores[i + 1] > s:
+            continue
+        if cuts and t - cuts[-1] < min_len:
+            continue
+        cuts.append(t)
+    return cuts
+
+
+class ShotIndex:
+    """
+    Coupes de plan d'une vidéo, interrogeables par bisection: plans qui
+    chevauchent une plage, coupe la plus proche d'un instant.
+    """
+
+    def __init__(self, cuts, duration):
+        self.cuts = sorted(cuts)
+        self.duration = duration
+
+    def shots_between(self, a, b):
+        """Plans (start, end) qui chevauchent [a, b], bornés à [a, b]."""
+        lo = bisect_right(self.cuts, a)
+        hi = bisect_left(self.cuts, b)
+        bounds = [a] + self.cuts[lo:hi] + [b]
+        return [(s, e) for s, e in zip(bounds, bounds[1:]) if e > s]
+
+    def nearest_cut(self, t, tol):
+        """Coupe la plus proche de `t` à moins de `tol` secondes, ou None."""
+        i = bisect_left(self.cuts, t)
+        near = [c for c in self.cuts[max(0, i - 1):i + 1] if abs(c - t) <= tol]
+        return min(near, key=lambda c: abs(c - t)) if near else None
+
+    def to_dict(self, **params):
+        return {"cuts": self.cuts, "duration": self.duration, "params": params}
+
+
+def _params(fps, size, threshold, min_len):
+    return {"fps": fps, "size": list(size), "threshold": threshold, "min_len": min_len}
+
+
+def build_shot_index(video_path=VIDEO_PATH, path=SHOTS_PATH, fps=SHOT_SAMPLE_FPS, size=SHOT_SAMPLE_SIZE,
+                     threshold=SHOT_THRESHOLD, min_len=SHOT_MIN_LEN, force=False):
+    """
+    Index des coupes de plan, calculé une fois par vidéo et enregistré dans
+    `path` (à côté de la transcription). Relu tel quel s'il est plus récent
+    que la vidéo et calculé avec les mêmes réglages.
+    """
+    params = _params(fps, size, threshold, min_len)
+    if not force:
+        index = load_shot_index(path, video_path, params)
+        if index is not None:
+            return index
+
+    print("🎞️ Détection des coupes de plan...")
+    times, scores = frame_scores(video_path, fps, size)
+    index = ShotIndex(pick_cuts(times, scores, threshold, min_len), times[-1] + 1.0 / fps if times else 0.0)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(index.to_dict(**params), f, ensure_ascii=False, indent=2)
+    print(f"   {len(index.cuts)} coupes détectées")
+    return index
+
+
+def load_shot_index(path=SHOTS_PATH, video_path=VIDEO_PATH, params=None):
+    """Relit l'index des coupes (None s'il manque, est périmé ou a d'autres réglages)."""
+    try:
+        if os.stat(path).st_mtime < os.stat(video_path).st_mtime:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if params is not None and data.get("params") != params:
+        return None
+    return ShotIndex(data["cuts"], data["duration"])
+
+
+if __name__ == "__main__":
+    try:
+        index = build_shot_index(force="--force" in sys.argv)
+        result = {"success": True, "path": SHOTS_PATH, "cuts": len(index.cuts)}
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+    print(json.dumps(result, ensure_ascii=False))
+    sys.exit(0 if result["success"] else 1)
@@ -2,6 +2,76 @@ import json
 import os
 from config import OUTPUT_DIR, WINDOW_SIZE, STEP_SIZE, TRANSCRIPT_PATH,BLOCKS_PATH
 
+def iter_windows(segments, window_size=WINDOW_SIZE, step_size=STEP_SIZE):
+    """
+    Génère les fenêtres glissantes une par une, en un seul passage sur les segments.
+
+    Les segments Whisper sont triés par début: `hi` avance tant que start <= t2
+    et `lo` saute les segments dont la fin (max cumulé) est < t. Chaque fenêtre
+    ne parcourt donc que ses propres segments au lieu de toute la transcription.
+
+    Args:
+        segments (list): liste de dicts {start, end, text}
+        window_size (float): taille de la fenêtre en secondes
+        step_size (float): pas du déplacement en secondes
+
+    Yields:
+        dict: fenêtre {start, end, text}
+    """
+    if not segments:
+        return
+    video_end = segments[-1]["end"]
+    starts = [s["start"] for s in segments]
+    if any(a > b for a, b in zip(starts, starts[1:])):
+        # ordre inattendu: on garde le balayage complet pour un résultat identique
+        t = 0.0
+        while t < video_end:
+            t2 = min(t + window_size, video_end)
+            text = " ".join(
+                s["text"] for s in segments if s["end"] >= t and s["start"] <= t2
+            ).strip()
+            if text:
+                yield {"start": t, "end": t2, "text": text}
+            t += step_size
+        return
+
+    # max cumulé des fins: croissant même si deux segments se chevauchent
+    max_end = []
+    running = float("-inf")
+    for s in segments:
+        running = max(running, s["end"])
+        max_end.append(running)
+
+    n = len(segments)
+    lo = hi = 0
+    t = 0.0
+    while t < video_end:
+        t2 = min(t + window_size, video_end)
+        while lo < n and max_end[lo] < t:
+            lo += 1
+        while hi < n and starts[hi] <= t2:
+            hi += 1
+        text = " ".join(
+            segments[i]["text"] for i in range(lo, hi) if segments[i]["end"] >= t
+        ).strip()
+        if text:
+            yield {"start": t, "end": t2, "text": text}
+        t += step_size
+
+def build_windows(segments, window_size=WINDOW_SIZE, step_size=STEP_SIZE):
+    """
+    Construit les fenêtres glissantes en mémoire (sans sauvegarde).
+
+    Args:
+        segments (list): liste de dicts {start, end, text}
+        window_size (float): taille de la fenêtre en secondes
+        step_size (float): pas du déplacement en secondes
+
+    Returns:
+        list: fenêtres glissantes [{start, end, text}]
+    """
+    return list(iter_windows(segments, window_size, step_size))
+
 def sliding_window_segments(segments, window_size=WINDOW_SIZE, step_size=STEP_SIZE):
     """
     Crée des fenêtres glissantes à partir de segments de transcription.
@@ -16,20 +86,10 @@ def sliding_window_segments(segments, window_size=WINDOW_SIZE, step_size=STEP_SI
     """
     try:
         print("🔍 Création des fenêtres glissantes...")
-        grouped = []
         if not segments:
             return {"success": False, "error": "Aucun segment fourni"}
 
-        video_end = segments[-1]["end"]
-        t = 0.0
-        while t < video_end:
-            t2 = min(t + window_size, video_end)
-            text = " ".join(
-                s["text"] for s in segments if s["end"] >= t and s["start"] <= t2
-            ).strip()
-            if text:
-                grouped.append({"start": t, "end": t2, "text": text})
-            t += step_size
+        grouped = build_windows(segments, window_size, step_size)
 
         # Sauvegarde dans un fichier JSON
         out_path = os.path.join(BLOCKS_PATH)
@@ -49,4 +109,3 @@ if __name__ == "__main__":
     segments = data["segments"]
     result = sliding_window_segments(segments)
     print(json.dumps(result, ensure_ascii=False))
-
@@ -1,6 +1,8 @@
 import os
 import json
-from config import OUTPUT_DIR, SILENCE_SNAP_TOL,MERGE_THRESHOLD,SILENCE_MIN_GAP, TRANSCRIPT_PATH,SCORED_PATH, SNAPPED_PATH
+from config import OUTPUT_DIR, SILENCE_SNAP_TOL,MERGE_THRESHOLD,SILENCE_MIN_GAP, TRANSCRIPT_PATH,SCORED_PATH, SNAPPED_PATH, SHOT_SNAP_TOL, SHOTS_PATH, VIDEO_PATH, CHUNKS_PATH, SCORE_MODE
+from transcript_index import TranscriptIndex, load_transcript_index
+from shots import load_shot_index
 
 def snap_segments(segments):
     """
@@ -16,42 +18,13 @@ def snap_segments(segments):
         list: segments ajustés [{start, end, text, score}]
     """
     try :
-        print("🔇 Ajustement aux silences...")
-        merged = merge_overlapping_segments(segments)
-        snapped = []
-        video_end = segments[-1]["end"]
-        silences = detect_silences()
-
-        for seg in merged:
-            # garder seulement les segments pertinents
-            if seg.get("score", 0) < 8:
-                continue
-
-            # ajoute 20 secondes à la fin
-            seg["end"] += 20
-
-            # ajuste sur silence
-            newStart, newEnd = snap_to_silence(seg, silences, tol=SILENCE_SNAP_TOL)
-
-            rs = clamp(newStart, 0.0, video_end)
-            re = clamp(newEnd, 0.0, video_end)
-            if re <= rs:
-                continue
-
-            # reconstitue le texte
-            texts = [
-                s["text"].strip()
-                for s in segments
-                if s.get("text") and s["end"] > rs and s["start"] < re
-            ]
-            combined_text = " ".join(texts).strip()
-
-            snapped.append({
-                "start": rs,
-                "end": re,
-                "text": combined_text,
-                "score": seg.get("score", 0),
-            })
+        # mode "chunks": la courbe dense des morceaux notés remplace les fenêtres pour la fusion
+        curve = None
+        if SCORE_MODE == "chunks" and os.path.exists(CHUNKS_PATH):
+            with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+                curve = json.load(f)
+        # coupes de plan déjà calculées (shots.py) si disponibles
+        snapped = snap_candidates(segments, shots=load_shot_index(SHOTS_PATH, VIDEO_PATH), curve=curve)
 
         # sauvegarde
         with open(SNAPPED_PATH, "w", encoding="utf-8") as f:
@@ -61,7 +34,68 @@ def snap_segments(segments):
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def snap_candidates(segments, transcript_segments=None, index=None, shots=None, curve=None):
+    """
+    Fusionne et ajuste les segments notés en mémoire (sans sauvegarde).
+
+    Args:
+        segments (list): segments notés [{start, end, text, score}]
+        transcript_segments (list): transcription déjà chargée (sinon relue sur disque)
+        index (TranscriptIndex): index déjà construit sur la transcription
+        shots (ShotIndex): coupes de plan; une coupe proche d'une borne est préférée
+        curve (list): morceaux notés contigus (mode "chunks"), fusionnés à la place des fenêtres
+
+    Returns:
+        list: segments ajustés [{start, end, text, score}]
+    """
+    print("🔇 Ajustement aux silences...")
+    merged = merge_overlapping_segments(curve if curve else segments)
+    snapped = []
+    video_end = segments[-1]["end"]
+    if index is None:
+        if transcript_segments is None:
+            index = load_transcript_index(TRANSCRIPT_PATH, min_gap=SILENCE_MIN_GAP)
+        else:
+            index = TranscriptIndex(transcript_segments, min_gap=SILENCE_MIN_GAP)
+
+    for seg in merged:
+        # garder seulement les segments pertinents
+        if seg.get("score", 0) < 8:
+            continue
+
+        # ajoute 20 secondes à la fin
+        seg["end"] += 20
+
+        # ajuste sur silence
+        newStart, newEnd = snap_to_silence(seg, index, tol=SILENCE_SNAP_TOL)
+
+        # préfère une coupe de plan proche: le clip commence/finit sur un changement d'image
+        if shots is not None:
+            newStart, newEnd = snap_to_cut(newStart, shots), snap_to_cut(newEnd, shots)
+
+        rs = clamp(newStart, 0.0, video_end)
+        re = clamp(newEnd, 0.0, video_end)
+        if re <= rs:
+            continue
+
+        # reconstitue le texte depuis la transcription
+        combined_text = index.text_between(rs, re, strict=True)
+
+        snapped.append({
+            "start": rs,
+            "end": re,
+            "text": combined_text,
+            "score": seg.get("score", 0),
+        })
+    return snapped
+
 def merge_overlapping_segments(segments, threshold=MERGE_THRESHOLD):
+    """
+    Fusionne les segments notés au-dessus de `threshold` qui se chevauchent
+    ou se touchent. Accepte des fenêtres glissantes comme la courbe dense des
+    morceaux (chunks.py): des morceaux contigus au-dessus du seuil forment un
+    seul candidat, borné au morceau près.
+    """
     print("🔗 Fusion des segments pertinents...")
     
     kept = [s for s in segments if s.get("score", 0) >= threshold]
@@ -79,29 +113,28 @@ def merge_overlapping_segments(segments, threshold=MERGE_THRESHOLD):
             merged.append(seg.copy())
     return merged
 
-def detect_silences(min_gap=SILENCE_MIN_GAP):
+def detect_silences(min_gap=SILENCE_MIN_GAP, transcript_segments=None):
     #recup les segments
-    with open(TRANSCRIPT_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    silences = []
-    for i in range(1, len(data["segments"])):
-        gap = data["segments"][i]["start"] - data["segments"][i-1]["end"]
-        if gap >= min_gap:
-            silences.append({"start": data["segments"][i-1]["end"], "end": data["segments"][i]["start"]})
-    return silences
-
-def snap_to_silence(segment, silences, tol=SILENCE_SNAP_TOL):
+    if transcript_segments is None:
+        return load_transcript_index(TRANSCRIPT_PATH, min_gap=min_gap).silences
+    return TranscriptIndex(transcript_segments, min_gap=min_gap).silences
+
+def snap_to_silence(segment, index, tol=SILENCE_SNAP_TOL):
     #search for the first silence before start
-    first = max((s for s in silences if s["end"] <= segment["start"] - tol), key=lambda s: s["end"], default=None)
+    first = index.silence_before(segment["start"] - tol)
 
     #search for the last silence before end
-    last = min((s for s in silences if s["start"] >= segment["end"] + tol), key=lambda s: s["start"], default=None)
+    last = index.silence_after(segment["end"] + tol)
     if last and first:
         return first["start"],last["end"]
     #add a parts to the segment
     
     return segment["start"], segment["end"]
 
+def snap_to_cut(t, shots, tol=SHOT_SNAP_TOL):
+    cut = shots.nearest_cut(t, tol)
+    return t if cut is None else cut
+
 def clamp(x, a, b):
     return max(a, min(b, x))
 
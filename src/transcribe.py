@@ -1,14 +1,183 @@
-import sys, json, whisper, torch
-from config import VIDEO_PATH, TRANSCRIPT_PATH
+import sys, json, os
+from functools import lru_cache
+from config import (
+    VIDEO_PATH, TRANSCRIPT_PATH, WHISPER_MODEL, AUDIO_SAMPLE_RATE,
+    TRANSCRIBE_WORKERS, TRANSCRIBE_CHUNK_SEC, TRANSCRIBE_SPLIT_SEARCH, TRANSCRIBE_WORD_TIMESTAMPS, TRANSCRIBE_FP16,
+    TRANSCRIPT_CACHE_ENABLED, TRANSCRIPT_CACHE_DIR, TRANSCRIPT_CACHE_MAX_BYTES,
+)
+from audio_cache import load_pcm, rms_energy
+from cache import DiskCache, file_fingerprint, make_key
 
-def transcribe():
+
+@lru_cache(maxsize=None)
+def load_model(name=WHISPER_MODEL):
+    """Charge (une seule fois par processus) un modèle Whisper."""
+    import whisper
+    return whisper.load_model(name)
+
+
+@lru_cache(maxsize=None)
+def get_transcript_cache():
+    """Magasin persistant des transcriptions (None si désactivé)."""
+    if not TRANSCRIPT_CACHE_ENABLED:
+        return None
+    return DiskCache(TRANSCRIPT_CACHE_DIR, max_bytes=TRANSCRIPT_CACHE_MAX_BYTES, evict_every=1, verify=True)
+
+
+def transcript_cache_key(video_path, workers, model_name=WHISPER_MODEL, word_timestamps=TRANSCRIBE_WORD_TIMESTAMPS):
+    """
+    Identité de la transcription: contenu de la vidéo + modèle + réglages.
+    fp16 entre dans la clé tel que demandé (TRANSCRIBE_FP16, "auto" par
+    défaut): une relecture du cache n'importe jamais torch pour sonder CUDA.
+    """
+    fp16 = "auto" if TRANSCRIBE_FP16 is None else bool(TRANSCRIBE_FP16)
+    settings = {"fp16": fp16, "parallel": workers > 1, "word_timestamps": bool(word_timestamps)}
+    if workers > 1:
+        settings["chunk_sec"] = TRANSCRIBE_CHUNK_SEC
+        settings["split_search"] = TRANSCRIBE_SPLIT_SEARCH
+    return make_key("transcript", file_fingerprint(video_path), model_name, settings)
+
+
+def _use_fp16(requested=TRANSCRIBE_FP16):
+    """fp16 effectif: le réglage s'il est forcé, sinon CUDA disponible (import de torch)."""
+    if requested is not None:
+        return bool(requested)
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except Exception:
+        return False
+
+
+def find_split_points(audio, target=TRANSCRIBE_CHUNK_SEC, search=TRANSCRIBE_SPLIT_SEARCH, sr=AUDIO_SAMPLE_RATE):
+    """
+    Choisit des points de coupe (en échantillons) tous les ~`target` secondes,
+    chacun placé sur la trame de 100 ms la plus silencieuse à ±`search` s.
+    """
+    import numpy as np
+    frame = sr // 10
+    energy = rms_energy(audio, frame)
+    n_frames = len(energy)
+    if n_frames == 0:
+        return []
+
+    points = []
+    per_chunk = int(target * 10)
+    radius = int(search * 10)
+    prev = 0
+    center = per_chunk
+    while center < n_frames - radius:
+        lo, hi = max(center - radius, prev + 1), min(center + radius, n_frames - 1)
+        if hi <= lo:
+            break
+        prev = lo + int(np.argmin(energy[lo:hi]))
+        points.append(prev * frame + frame // 2)
+        center = prev + per_chunk
+    return points
+
+
+_WORKER_MODEL = None
+
+
+def _init_worker(model_name, threads):
+    global _WORKER_MODEL
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except Exception:
+        pass
+    _WORKER_MODEL = load_model(model_name)
+
+
+def _transcribe_chunk(job):
+    """Transcrit un morceau dans un worker et recale ses timecodes sur la vidéo entière."""
+    idx, video_path, lo, hi, word_timestamps = job
+    # chaque worker relit sa tranche du cache PCM (memmap), rien n'est copié entre processus
+    audio = load_pcm(video_path)[lo:hi]
+    offset = lo / AUDIO_SAMPLE_RATE
+    result = _WORKER_MODEL.transcribe(audio, verbose=None, fp16=False, word_timestamps=word_timestamps)
+    for seg in result["segments"]:
+        seg["start"] += offset
+        seg["end"] += offset
+        for word in seg.get("words") or []:
+            word["start"] += offset
+            word["end"] += offset
+    return idx, result
+
+
+def transcribe_parallel(video_path=VIDEO_PATH, workers=TRANSCRIBE_WORKERS, model_name=WHISPER_MODEL,
+                        chunk_sec=TRANSCRIBE_CHUNK_SEC, word_timestamps=TRANSCRIBE_WORD_TIMESTAMPS):
+    """
+    Découpe l'audio aux silences, transcrit les morceaux dans un pool de
+    processus (un modèle par worker) puis recolle les segments dans l'ordre.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    audio = load_pcm(video_path)
+    bounds = [0] + find_split_points(audio, target=chunk_sec) + [len(audio)]
+    jobs = [(i, video_path, bounds[i], bounds[i + 1], word_timestamps) for i in range(len(bounds) - 1)]
+    workers = max(1, min(workers, len(jobs)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"🎙️ Transcription parallèle: {len(jobs)} morceaux, {workers} workers")
+
+    results = [None] * len(jobs)
+    # spawn: torch ne supporte pas bien le fork d'un processus déjà initialisé
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_worker, initargs=(model_name, threads)) as pool:
+        futures = [pool.submit(_transcribe_chunk, job) for job in jobs]
+        for done, fut in enumerate(as_completed(futures), 1):
+            idx, result = fut.result()
+            results[idx] = result
+            print(f"   ✅ Morceau {done}/{len(jobs)} transcrit")
+
+    segments = []
+    for result in results:
+        for seg in result["segments"]:
+            seg["id"] = len(segments)
+            segments.append(seg)
+    return {
+        "text": "".join(r["text"] for r in results),
+        "segments": segments,
+        "language": results[0].get("language") if results else None,
+    }
+
+
+def transcribe_video(video_path=VIDEO_PATH, model=None, verbose=True, workers=TRANSCRIBE_WORKERS,
+                     word_timestamps=TRANSCRIBE_WORD_TIMESTAMPS):
+    """
+    Transcrit une vidéo et retourne le résultat Whisper brut (sans l'enregistrer).
+    Avec `word_timestamps`, chaque segment porte ses mots horodatés ("words"),
+    utilisés par le raffinage local des bornes (boundaries.py).
+    Si la même vidéo a déjà été transcrite avec les mêmes réglages, le résultat
+    est relu depuis le magasin de transcriptions.
+    """
+    if model is not None:
+        workers = 1
+    cache = get_transcript_cache()
+    key = transcript_cache_key(video_path, workers, word_timestamps=word_timestamps) if cache else None
+    result = cache.get(key) if cache else None
+    if result is not None:
+        print("♻️ Transcription déjà en cache")
+        return result
+
+    if workers > 1:
+        result = transcribe_parallel(video_path, workers=workers, word_timestamps=word_timestamps)
+    else:
+        if model is None:
+            model = load_model()
+        # Whisper accepte directement le tableau PCM: pas de second décodage ffmpeg
+        result = model.transcribe(load_pcm(video_path), verbose=verbose, fp16=_use_fp16(),
+                                  word_timestamps=word_timestamps)
+    if cache:
+        cache.set(key, result)
+    return result
+
+
+def transcribe(model=None, workers=TRANSCRIBE_WORKERS):
     try:
-        model = whisper.load_model("tiny")
-        try:
-            fp16 = torch.cuda.is_available()
-        except Exception:
-            fp16 = False
-        result = model.transcribe(VIDEO_PATH, verbose=True, fp16=fp16)
+        result = transcribe_video(model=model, workers=workers)
 
         with open(TRANSCRIPT_PATH, "w", encoding="utf-8") as f:
             json.dump(result, f, ensure_ascii=False, indent=2)
@@ -17,6 +186,10 @@ def transcribe():
         return {"success": False, "error": str(e)}
 
 if __name__ == "__main__":
-    result = transcribe()
+    import argparse
+    parser = argparse.ArgumentParser(description="Transcription Whisper de la vidéo")
+    parser.add_argument("--workers", type=int, default=TRANSCRIBE_WORKERS, help="Nombre de processus (>1 = découpe aux silences)")
+    args = parser.parse_args()
+    result = transcribe(workers=args.workers)
     print(json.dumps(result, ensure_ascii=False))
     sys.exit(0 if result["success"] else 1)
@@ -0,0 +1,105 @@
+import json
+from bisect import bisect_left, bisect_right
+from config import TRANSCRIPT_PATH, SILENCE_MIN_GAP
+
+
+def _is_sorted(values):
+    return all(a <= b for a, b in zip(values, values[1:]))
+
+
+class TranscriptIndex:
+    """
+    Index des segments de transcription pour les requêtes par plage de temps.
+
+    Construit une fois par vidéo: débuts triés, max cumulé des fins, offsets
+    du texte concaténé et liste des silences entre segments. Les requêtes
+    "segments/texte qui chevauchent [a, b]" et "silence le plus proche
+    avant/après t" se font par bisection au lieu d'un parcours complet.
+    """
+
+    def __init__(self, segments, min_gap=SILENCE_MIN_GAP):
+        self.segments = segments
+        self.starts = [s["start"] for s in segments]
+        self.ends = [s["end"] for s in segments]
+        self.sorted = _is_sorted(self.starts)
+        self.monotonic = self.sorted and _is_sorted(self.ends)
+
+        # max cumulé des fins: permet de bisecter même si des segments se chevauchent
+        self.max_end = []
+        running = float("-inf")
+        for e in self.ends:
+            running = max(running, e)
+            self.max_end.append(running)
+
+        # texte concaténé ("t0 t1 t2 ") et offset de début de chaque segment
+        pieces, self.text_offsets, pos = [], [], 0
+        for s in segments:
+            self.text_offsets.append(pos)
+            if s.get("text"):
+                piece = s["text"].strip() + " "
+                pieces.append(piece)
+                pos += len(piece)
+        self.text_offsets.append(pos)
+        self.joined = "".join(pieces)
+
+        self.silences = []
+        for i in range(1, len(segments)):
+            if segments[i]["start"] - segments[i - 1]["end"] >= min_gap:
+                self.silences.append({"start": segments[i - 1]["end"], "end": segments[i]["start"]})
+        self.silence_starts = [s["start"] for s in self.silences]
+        self.silence_ends = [s["end"] for s in self.silences]
+        self.silences_sorted = _is_sorted(self.silence_starts) and _is_sorted(self.silence_ends)
+
+    @property
+    def duration(self):
+        return self.ends[-1] if self.ends else 0.0
+
+    def _range(self, a, b, strict):
+        """Indices [lo, hi) candidats pour un chevauchement avec [a, b]."""
+        if strict:
+            # end > a et start < b
+            return bisect_right(self.max_end, a), bisect_left(self.starts, b)
+        # end >= a et start <= b
+        return bisect_left(self.max_end, a), bisect_right(self.starts, b)
+
+    def _overlaps(self, s, a, b, strict):
+        if strict:
+            return s["end"] > a and s["start"] < b
+        return s["end"] >= a and s["start"] <= b
+
+    def segments_between(self, a, b, strict=False):
+        """Segments qui chevauchent [a, b] (bornes incluses sauf si `strict`), dans l'ordre."""
+        if not self.sorted:
+            return [s for s in self.segments if self._overlaps(s, a, b, strict)]
+        lo, hi = self._range(a, b, strict)
+        return [s for s in self.segments[lo:hi] if self._overlaps(s, a, b, strict)]
+
+    def text_between(self, a, b, strict=True):
+        """Texte des segments qui chevauchent [a, b], équivalent à " ".join(s["text"].strip() ...)."""
+        if not self.monotonic:
+            segs = self.segments_between(a, b, strict)
+            return " ".join(s["text"].strip() for s in segs if s.get("text")).strip()
+        lo, hi = self._range(a, b, strict)
+        if hi <= lo:
+            return ""
+        return self.joined[self.text_offsets[lo]:self.text_offsets[hi]].strip()
+
+    def silence_before(self, t):
+        """Silence qui se termine le plus tard possible avant `t` (end <= t), ou None."""
+        if not self.silences_sorted:
+            return max((s for s in self.silences if s["end"] <= t), key=lambda s: s["end"], default=None)
+        i = bisect_right(self.silence_ends, t)
+        return self.silences[i - 1] if i > 0 else None
+
+    def silence_after(self, t):
+        """Silence qui commence le plus tôt possible après `t` (start >= t), ou None."""
+        if not self.silences_sorted:
+            return min((s for s in self.silences if s["start"] >= t), key=lambda s: s["start"], default=None)
+        i = bisect_left(self.silence_starts, t)
+        return self.silences[i] if i < len(self.silences) else None
+
+
+def load_transcript_index(path=TRANSCRIPT_PATH, min_gap=SILENCE_MIN_GAP):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return TranscriptIndex(data["segments"], min_gap=min_gap)
@@ -0,0 +1,131 @@
+"""
+Worker local: traite une file de vidéos en parallèle, chacune dans son
+propre workspace (JOBS_DIR/<job_id>) et son propre processus.
+
+Les étapes CPU (décodage audio, transcription, coupes de plan, rendu) et
+les étapes réseau/LLM (téléchargements, scoring, raffinage) ont chacune
+leur plafond, partagé entre tous les jobs: pendant qu'une vidéo est
+transcrite, les autres téléchargent ou attendent le LLM.
+
+    python src/worker.py jobs.jsonl --jobs 3 --cpu 1 --io 3
+    python src/worker.py https://youtu.be/a https://youtu.be/b --variants smart blur
+
+Un fichier de jobs contient une URL par ligne, ou une ligne JSON par vidéo
+({"url": ..., "zoom_factor": ..., "variants": [...], ...}, voir JobConfig).
+"""
+import os
+import sys
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import JOBS_DIR, WORKER_JOBS, WORKER_CPU_SLOTS, WORKER_IO_SLOTS, SCORE_MAX_RPS, SCORE_MAX_TPM
+from workspace import JobConfig
+
+# Sémaphores partagés, installés dans chaque processus du pool
+_SLOTS = None
+_IO_SLOTS = 1
+
+
+def _init_worker(cpu, io, io_slots):
+    global _SLOTS, _IO_SLOTS
+    _SLOTS = {"cpu": cpu, "io": io}
+    _IO_SLOTS = io_slots
+
+
+def run_job(job, root=JOBS_DIR, slots=None, io_slots=1):
+    """
+    Traite une vidéo dans son workspace. Le budget LLM de config.py est
+    partagé entre les `io_slots` jobs qui peuvent scorer en même temps.
+    """
+    from llm import RateLimiter
+    from pipeline import run_pipeline
+
+    ws = job.workspace(root).ensure()
+    job.save(ws)
+    limiter = RateLimiter(SCORE_MAX_RPS / io_slots, SCORE_MAX_TPM / io_slots)
+    result = run_pipeline(job.url, workspace=ws, slots=slots, limiter=limiter, **job.options)
+    with open(ws.path("result.json"), "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return result
+
+
+def _run_in_pool(job_dict, root):
+    # point d'entrée des processus du pool: les jobs voyagent en dict (picklable)
+    return run_job(JobConfig.from_dict(job_dict), root, slots=_SLOTS, io_slots=_IO_SLOTS)
+
+
+def run_jobs(jobs, root=JOBS_DIR, max_jobs=WORKER_JOBS, cpu_slots=WORKER_CPU_SLOTS, io_slots=WORKER_IO_SLOTS):
+    """
+    Traite plusieurs vidéos en parallèle (un processus par job en cours:
+    le modèle Whisper et les mesures du run sont propres à chaque processus).
+
+    Args:
+        jobs (list): JobConfig à traiter
+        root (str): dossier contenant un workspace par job
+        max_jobs (int): vidéos en cours en même temps
+        cpu_slots (int): étapes CPU simultanées, tous jobs confondus
+        io_slots (int): étapes réseau/LLM simultanées, tous jobs confondus
+
+    Yields:
+        dict: {job_id, url, workspace, success, ...} dans l'ordre de fin des jobs
+    """
+    os.makedirs(root, exist_ok=True)
+    ctx = multiprocessing.get_context("spawn")
+    cpu, io = ctx.BoundedSemaphore(cpu_slots), ctx.BoundedSemaphore(io_slots)
+    with ProcessPoolExecutor(max_workers=max_jobs, mp_context=ctx,
+                             initializer=_init_worker, initargs=(cpu, io, io_slots)) as pool:
+        futures = {pool.submit(_run_in_pool, job.to_dict(), root): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            yield dict(result, job_id=job.job_id, url=job.url, workspace=job.workspace(root).root)
+
+
+def load_jobs(lines, **defaults):
+    """JobConfig depuis des lignes "URL" ou JSON; les options de `defaults` complètent chaque ligne."""
+    jobs = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        data = json.loads(line) if line.startswith("{") else {"url": line}
+        jobs.append(JobConfig.from_dict(dict(defaults, **data)))
+    return jobs
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Traitement parallèle de plusieurs vidéos, un workspace par vidéo")
+    parser.add_argument("inputs", nargs="+", help="Fichiers de jobs (URL ou JSON par ligne) et/ou URLs")
+    parser.add_argument("--root", default=JOBS_DIR, help="Dossier des workspaces")
+    parser.add_argument("--jobs", type=int, default=WORKER_JOBS, help="Vidéos traitées en même temps")
+    parser.add_argument("--cpu", type=int, default=WORKER_CPU_SLOTS, help="Étapes CPU simultanées (transcription, rendu)")
+    parser.add_argument("--io", type=int, default=WORKER_IO_SLOTS, help="Étapes réseau/LLM simultanées (téléchargement, scoring)")
+    parser.add_argument("--variants", nargs="+", default=None, help="Variantes par défaut des jobs")
+    parser.add_argument("--audio-first", action="store_true", help="Mode audio d'abord par défaut")
+    args = parser.parse_args()
+
+    defaults = {}
+    if args.variants:
+        defaults["variants"] = args.variants
+    if args.audio_first:
+        defaults["audio_first"] = True
+    lines = []
+    for item in args.inputs:
+        if os.path.exists(item):
+            with open(item, "r", encoding="utf-8") as f:
+                lines.extend(f)
+        else:
+            lines.append(item)
+    jobs = load_jobs(lines, **defaults)
+
+    print(f"🗂️ {len(jobs)} vidéos, {args.jobs} en parallèle (CPU: {args.cpu}, réseau/LLM: {args.io})")
+    failed = 0
+    for summary in run_jobs(jobs, args.root, args.jobs, args.cpu, args.io):
+        failed += 0 if summary.get("success") else 1
+        print(json.dumps({k: summary.get(k) for k in ("job_id", "url", "success", "error", "workspace", "clips")},
+                         ensure_ascii=False))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,88 @@
+import os
+import json
+import hashlib
+from config import SRC_DIR, OUTPUT_DIR
+
+
+class Workspace:
+    """
+    Dossier de travail d'une vidéo et chemins de tous ses fichiers, avec les
+    mêmes noms que dans OUTPUT_DIR. Deux vidéos traitées dans deux workspaces
+    ne partagent aucun fichier, ce qui permet de les traiter en parallèle.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.video_path = os.path.join(root, "video.mkv")
+        self.audio_path = os.path.join(root, "audio.m4a")
+        self.transcript_path = os.path.join(root, "video.json")
+        self.blocks_path = os.path.join(root, "blocks.json")
+        self.scored_path = os.path.join(root, "scored.json")
+        self.chunks_path = os.path.join(root, "chunks.json")
+        self.snapped_path = os.path.join(root, "snapped.json")
+        self.refined_path = os.path.join(root, "refined.json")
+        self.clips_json = os.path.join(root, "clips.json")
+        self.sections_path = os.path.join(root, "sections.json")
+        self.shots_path = os.path.join(root, "shots.json")
+        self.drafts_dir = os.path.join(root, "drafts")
+        self.drafts_json = os.path.join(root, "drafts.json")
+        self.report_path = os.path.join(root, "run_report.jsonl")
+        self.profile_dir = os.path.join(root, "profiles")
+        self.checkpoints_path = os.path.join(root, "checkpoints.json")
+
+    def path(self, name):
+        """Chemin d'un fichier du workspace (clips, plages...)."""
+        return os.path.join(self.root, name)
+
+    def ensure(self):
+        os.makedirs(self.root, exist_ok=True)
+        return self
+
+    def __repr__(self):
+        return f"Workspace({self.root!r})"
+
+
+def default_workspace():
+    """Workspace historique: OUTPUT_DIR de config.py (un seul run à la fois)."""
+    return Workspace(os.path.join(SRC_DIR, OUTPUT_DIR))
+
+
+class JobConfig:
+    """
+    Réglages d'une vidéo à traiter: URL + options de run_pipeline.
+    Sérialisable en JSON (une ligne par vidéo dans un fichier de jobs).
+    """
+
+    DEFAULTS = {
+        "zoom_factor": 1.0,
+        "smart_zoom": True,
+        "variants": ["smart"],
+        "audio_first": False,
+        "single_pass": False,
+        "draft": False,
+        "resume": True,
+    }
+
+    def __init__(self, url, job_id=None, **options):
+        unknown = set(options) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError(f"Options inconnues: {sorted(unknown)}")
+        self.url = url
+        # identifiant stable: relancer la même URL retrouve le même workspace
+        self.job_id = job_id or hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+        self.options = dict(self.DEFAULTS, **options)
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        return cls(data.pop("url"), job_id=data.pop("job_id", None), **data)
+
+    def to_dict(self):
+        return dict({"url": self.url, "job_id": self.job_id}, **self.options)
+
+    def workspace(self, root):
+        return Workspace(os.path.join(root, self.job_id))
+
+    def save(self, workspace):
+        with open(workspace.path("job.json"), "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
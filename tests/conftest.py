@@ -0,0 +1,5 @@
+import os
+import sys
+
+# les modules du pipeline sont à plat dans src/ et s'importent entre eux sans paquet
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
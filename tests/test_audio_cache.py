@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+from audio_cache import rms_energy
+
+
+@pytest.mark.parametrize("length, frame, block", [(16000 * 3 + 123, 1600, 4), (1600 * 10, 1600, 3), (100, 1600, 4)])
+def test_blockwise_rms_matches_full_computation(tmp_path, length, frame, block):
+    rng = np.random.default_rng(0)
+    path = tmp_path / "audio.f32"
+    rng.standard_normal(length).astype(np.float32).tofile(path)
+    audio = np.memmap(path, dtype=np.float32, mode="c")
+    n = length // frame
+    expected = np.sqrt(np.mean(np.square(np.asarray(audio[: n * frame]).reshape(n, frame)), axis=1))
+    energy = rms_energy(audio, frame, block=block)
+    assert energy.dtype == np.float32 and energy.shape == (n,)
+    np.testing.assert_allclose(energy, expected, rtol=1e-5)
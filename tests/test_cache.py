@@ -0,0 +1,70 @@
+import json
+import os
+import time
+
+from cache import DiskCache, file_fingerprint, make_key
+
+
+def test_make_key_is_stable_and_order_sensitive():
+    assert make_key("score", {"b": 1, "a": 2}) == make_key("score", {"a": 2, "b": 1})
+    assert make_key("a", "b") != make_key("b", "a")
+
+
+def test_file_fingerprint_follows_content(tmp_path):
+    path = tmp_path / "video.mkv"
+    path.write_bytes(b"a" * 5000)
+    before = file_fingerprint(str(path), block=1024)
+    path.write_bytes(b"a" * 2500 + b"b" + b"a" * 2499)  # milieu modifié, même taille
+    assert file_fingerprint(str(path), block=1024) != before
+
+
+def test_roundtrip_and_stats(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    assert cache.get("k" * 64) is None
+    cache.set("k" * 64, {"score": 8, "texte": "é"})
+    assert cache.get("k" * 64) == {"score": 8, "texte": "é"}
+    assert cache.stats() == {"hits": 1, "misses": 1, "sets": 1, "hit_rate": 0.5}
+
+
+def test_truncated_or_corrupted_entries_are_dropped(tmp_path):
+    cache = DiskCache(str(tmp_path), verify=True)
+    cache.set("a" * 64, [1, 2, 3])
+    cache.set("b" * 64, [4, 5, 6])
+    with open(cache._path("a" * 64), "w", encoding="utf-8") as f:
+        f.write('{"created": 1, "val')
+    with open(cache._path("b" * 64), "r", encoding="utf-8") as f:
+        entry = json.load(f)
+    entry["value"] = [4, 5, 7]
+    with open(cache._path("b" * 64), "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    assert cache.get("a" * 64) is None and not os.path.exists(cache._path("a" * 64))
+    assert cache.get("b" * 64) is None and not os.path.exists(cache._path("b" * 64))
+
+
+def test_size_eviction_drops_least_recently_read(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10 ** 9, evict_every=0)
+    keys = [c * 64 for c in "abc"]
+    for age, key in zip((30, 20, 10), keys):
+        cache.set(key, "x" * 100)
+        old = time.time() - age
+        os.utime(cache._path(key), (old, old))
+    cache.get(keys[0])  # "a" relue: devient la plus récente
+    cache.max_bytes = os.path.getsize(cache._path(keys[0])) + os.path.getsize(cache._path(keys[2]))
+    cache.evict()
+    assert [cache.get(k) is not None for k in keys] == [True, False, True]
+
+
+def test_age_eviction_uses_creation_time_even_for_hot_entries(tmp_path):
+    cache = DiskCache(str(tmp_path), max_age=60, evict_every=0)
+    cache.set("h" * 64, 1)
+    cache.set("f" * 64, 2)
+    path = cache._path("h" * 64)
+    with open(path, "r", encoding="utf-8") as f:
+        entry = json.load(f)
+    entry["created"] -= 3600  # écrite il y a une heure...
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.utime(path)  # ...mais relue à l'instant
+    cache.evict()
+    assert not os.path.exists(path)
+    assert cache.get("f" * 64) == 2
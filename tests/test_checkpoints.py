@@ -0,0 +1,66 @@
+import os
+
+from checkpoints import Checkpoints
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_partial_stage_is_never_fresh_but_exposes_its_outputs(tmp_path):
+    out = write(tmp_path / "scored.json", "[-1, 7]")
+    ckpt = Checkpoints(str(tmp_path / "checkpoints.json"))
+    key = ckpt.key("scored", "entrées")
+    ckpt.partial("scored", [out], failed=1)
+
+    resumed = Checkpoints(str(tmp_path / "checkpoints.json"))
+    assert not resumed.fresh("scored", key)
+    assert resumed.get("scored")["failed"] == 1
+    # l'aval est recalculé si la relance produit d'autres notes
+    before = resumed.output_key("scored")
+    write(tmp_path / "scored.json", "[8, 7]")
+    resumed.done("scored", key, [out])
+    assert resumed.fresh("scored", key)
+    assert resumed.output_key("scored") != before
+
+
+def test_resume_skips_stage_until_inputs_or_outputs_change(tmp_path):
+    manifest = str(tmp_path / "checkpoints.json")
+    out = write(tmp_path / "windows.json", "[1, 2]")
+    ckpt = Checkpoints(manifest)
+    key = ckpt.key("windows", "transcription", 50, 5)
+    assert not ckpt.fresh("windows", key)
+    ckpt.done("windows", key, [out], count=2)
+
+    resumed = Checkpoints(manifest)
+    assert resumed.fresh("windows", key)
+    assert resumed.get("windows")["count"] == 2
+    # autres réglages: l'étape est recalculée
+    assert not resumed.fresh("windows", resumed.key("windows", "transcription", 60, 5))
+    # reprise désactivée (--force): tout est recalculé
+    assert not Checkpoints(manifest, enabled=False).fresh("windows", key)
+    # sortie modifiée ou supprimée à la main: recalculée aussi
+    write(tmp_path / "windows.json", "[1, 2, 3]")
+    assert not resumed.fresh("windows", key)
+    os.remove(out)
+    assert not resumed.fresh("windows", key)
+
+
+def test_downstream_key_follows_upstream_outputs(tmp_path):
+    ckpt = Checkpoints(str(tmp_path / "checkpoints.json"))
+    out = write(tmp_path / "scored.json", "[8]")
+    assert ckpt.output_key("scored") is None
+    ckpt.done("scored", ckpt.key("scored", 1), [out])
+    first = ckpt.output_key("scored")
+    ckpt.done("scored", ckpt.key("scored", 2), [out])
+    assert ckpt.output_key("scored") == first  # même résultat: l'aval n'est pas relancé
+    write(tmp_path / "scored.json", "[9, 1]")
+    ckpt.done("scored", ckpt.key("scored", 3), [out])
+    assert ckpt.output_key("scored") != first
+
+
+def test_corrupted_manifest_starts_fresh(tmp_path):
+    manifest = tmp_path / "checkpoints.json"
+    manifest.write_text("{tronqué", encoding="utf-8")
+    assert Checkpoints(str(manifest)).entries == {}
@@ -0,0 +1,38 @@
+import math
+
+from chunks import ChunkCurve, score_from_chunks
+
+
+def _chunks(*scores, size=10.0):
+    return [{"start": i * size, "end": (i + 1) * size, "text": f"morceau {i}", "score": s}
+            for i, s in enumerate(scores)]
+
+
+def test_mean_is_time_weighted():
+    curve = ChunkCurve(_chunks(2, 8, 6))
+    assert curve.mean(0.0, 20.0) == 5.0
+    assert curve.mean(5.0, 15.0) == 5.0
+    assert curve.mean(10.0, 20.0) == 8.0
+
+
+def test_failed_and_prefiltered_chunks_are_ignored():
+    chunks = _chunks(8, 0, -1, 6)
+    chunks[1]["prefiltered"] = True
+    curve = ChunkCurve(chunks)
+    # le 0 de remplissage du pré-tri ne tire pas la moyenne vers le bas
+    assert curve.mean(0.0, 20.0) == 8.0
+    assert curve.mean(0.0, 40.0) == 7.0
+
+
+def test_window_over_prefiltered_chunks_only_is_unscored():
+    chunks = _chunks(9, 0, 0, 9)
+    chunks[1]["prefiltered"] = chunks[2]["prefiltered"] = True
+    assert math.isnan(ChunkCurve(chunks).mean(10.0, 30.0))
+    windows = score_from_chunks([{"start": 10.0, "end": 30.0, "text": ""},
+                                 {"start": 0.0, "end": 20.0, "text": ""}], chunks)
+    assert [w["score"] for w in windows] == [-1, 9.0]
+
+
+def test_scored_zero_still_counts():
+    # un 0 réellement renvoyé par le LLM reste une note
+    assert ChunkCurve(_chunks(0, 8)).mean(0.0, 20.0) == 4.0
@@ -0,0 +1,73 @@
+import functools
+import http.server
+import os
+import re
+import shutil
+import subprocess
+import threading
+
+import pytest
+
+import download_video
+from workspace import Workspace
+
+pytest.importorskip("yt_dlp")
+pytestmark = pytest.mark.skipif(not shutil.which("ffmpeg"), reason="ffmpeg requis")
+
+FIXTURE_SECONDS = 30
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def _duration(path):
+    """Durée d'un média lue dans la sortie de `ffmpeg -i` (pas besoin de ffprobe)."""
+    proc = subprocess.run(["ffmpeg", "-hide_banner", "-i", path], stderr=subprocess.PIPE, text=True)
+    h, m, s = re.search(r"Duration: (\d+):(\d+):([\d.]+)", proc.stderr).groups()
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+
+@pytest.fixture(scope="module")
+def served_video(tmp_path_factory):
+    """Vidéo lavfi (mire + bip, une image clé par seconde) servie par http.server en local."""
+    root = tmp_path_factory.mktemp("www")
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc=size=320x240:rate=25:duration={FIXTURE_SECONDS}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={FIXTURE_SECONDS}",
+        "-c:v", "libx264", "-g", "25", "-c:a", "aac", "-movflags", "+faststart",
+        str(root / "fixture.mp4"),
+    ], check=True)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/fixture.mp4"
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_audio_from_direct_url(served_video, tmp_path):
+    ws = Workspace(str(tmp_path)).ensure()
+    dl = download_video.download_audio(served_video, workspace=ws)
+    assert dl["success"], dl.get("error")
+    assert os.path.getsize(ws.audio_path) > 0
+
+
+def test_sections_offsets_map_segments_into_section_files(served_video, tmp_path):
+    ws = Workspace(str(tmp_path)).ensure()
+    segments = [{"start": 5.0, "end": 8.0}, {"start": 1.0, "end": 3.0}, {"start": 20.0, "end": 24.0}]
+    dl = download_video.download_sections(served_video, segments, margin=2.0, workspace=ws)
+    assert dl["success"], dl.get("error")
+
+    sections = download_video.load_sections(ws.sections_path)
+    assert sections == dl["sections"]
+    # marge de chaque côté, bornée à 0 au début de la vidéo
+    assert [(s["start"], s["end"]) for s in sections] == [(3.0, 10.0), (0.0, 5.0), (18.0, 26.0)]
+    for i, (seg, sec) in enumerate(zip(segments, sections)):
+        path, local_start = download_video.source_for(i, seg["start"], sections, ws.video_path)
+        assert path == sec["path"] == ws.path(f"section_{i}.mp4")
+        assert local_start == pytest.approx(seg["start"] - sec["offset"])
+        # le fichier de la plage contient bien tout le segment en temps local
+        assert _duration(path) >= local_start + (seg["end"] - seg["start"]) - 0.1
+        assert _duration(path) == pytest.approx(sec["end"] - sec["start"], abs=1.0)
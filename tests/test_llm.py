@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import pytest
+
+import llm
+
+
+class FakeClient:
+    """Client `client.chat.complete` qui lève les erreurs données, puis répond `content`."""
+
+    def __init__(self, errors=(), content="8"):
+        self.errors = list(errors)
+        self.content = content
+        self.calls = 0
+        self.chat = self
+
+    def complete(self, model=None, messages=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))])
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(llm.time, "sleep", lambda seconds: None)
+
+
+@pytest.mark.parametrize("exc", [HTTPError(429), HTTPError(503), ConnectionError("reset"), TimeoutError("slow")])
+def test_transient_errors_are_retryable(exc):
+    assert llm._is_retryable(exc)
+
+
+@pytest.mark.parametrize("exc", [HTTPError(400), HTTPError(401), AttributeError("a"), TypeError("b"), ValueError("c")])
+def test_other_errors_are_not_retryable(exc):
+    assert not llm._is_retryable(exc)
+
+
+def test_bug_in_response_handling_is_raised_without_retry():
+    client = FakeClient(content=None)  # content None: .strip() lève AttributeError
+    with pytest.raises(AttributeError):
+        llm.chat_complete(client, "prompt", max_retries=5)
+    assert client.calls == 1
+
+
+def test_network_and_server_errors_are_retried():
+    client = FakeClient([ConnectionError("reset"), HTTPError(503)])
+    assert llm.chat_complete(client, "prompt", max_retries=5) == "8"
+    assert client.calls == 3
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from prefilter import select_windows, window_features
+
+# segments séparés par des blancs: chaque fenêtre ne recouvre que le sien
+SEGMENTS = [
+    {"start": 0.0, "end": 9.0, "text": "bonjour bonjour bonjour"},
+    {"start": 10.0, "end": 19.0, "text": "le cinéma muet invente le montage alterné et le gros plan !"},
+    {"start": 20.0, "end": 29.0, "text": ""},
+    {"start": 30.0, "end": 39.0, "text": "pourquoi Hitchcock cache-t-il une bombe sous la table ? suspense pur"},
+]
+WINDOWS = [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in SEGMENTS]
+
+
+def test_features_use_only_segments_inside_each_window():
+    features = window_features(WINDOWS, SEGMENTS)
+    assert features["words"].tolist() == [3, 11, 0, 12]
+    assert features["speech_rate"][1] == pytest.approx(11 / 9)
+    assert features["marks"][2] == 0
+
+
+def test_keep_fraction_and_min_words():
+    kept, scores = select_windows(WINDOWS, SEGMENTS, keep=0.5, cutoff=None, min_words=4)
+    assert len(scores) == len(WINDOWS)
+    assert kept == [1, 3]  # ordre d'origine, fenêtres presque vides exclues
+    kept, _ = select_windows(WINDOWS, SEGMENTS, keep=1.0, cutoff=None, min_words=4)
+    assert kept == [1, 3]
+
+
+def test_cutoff_replaces_keep():
+    _, scores = select_windows(WINDOWS, SEGMENTS, keep=0.5, cutoff=None, min_words=0)
+    best = int(np.argmax(scores))
+    kept, _ = select_windows(WINDOWS, SEGMENTS, keep=0.0, cutoff=float(scores[best]), min_words=0)
+    assert kept == [best]
+
+
+def test_empty_input():
+    kept, scores = select_windows([], SEGMENTS)
+    assert kept == [] and len(scores) == 0
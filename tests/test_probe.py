@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import probe
+from cache import DiskCache
+
+
+@pytest.fixture
+def ffprobe(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_streams(path):
+        calls.append(path)
+        return {"width": 1920, "height": 1080, "fps": 25.0, "video_codec": "h264", "duration": 30.0, "audio": None}
+
+    monkeypatch.setattr(probe, "_MEMO", {})
+    monkeypatch.setattr(probe, "_probe_streams", fake_streams)
+    monkeypatch.setattr(probe, "get_probe_cache", lambda: DiskCache(str(tmp_path / "probe")))
+    return calls
+
+
+def test_probe_runs_once_per_file_version(tmp_path, ffprobe):
+    video = tmp_path / "video.mkv"
+    video.write_bytes(b"v1")
+    assert probe.dims(str(video)) == (1920, 1080, 25.0)
+    assert not probe.has_audio(str(video))
+    assert len(ffprobe) == 1
+    # nouveau processus: relu depuis le disque, pas de nouveau ffprobe
+    probe._MEMO.clear()
+    probe.probe(str(video))
+    assert len(ffprobe) == 1
+    # fichier réécrit: ressondé
+    video.write_bytes(b"v2 plus long")
+    probe.probe(str(video))
+    assert len(ffprobe) == 2
+
+
+def test_unreadable_media_falls_back(tmp_path, ffprobe):
+    missing = str(tmp_path / "absent.mkv")
+    assert probe.dims(missing) == (0, 0, 0.0)
+    assert probe.has_audio(missing) is True
+    assert ffprobe == []
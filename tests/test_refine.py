@@ -0,0 +1,42 @@
+import pytest
+
+import refine
+from test_llm import FakeClient
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self, tokens):
+        self.acquired += 1
+
+    def record(self, estimated, tokens):
+        pass
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    calls = []
+    monkeypatch.setattr(refine.time, "sleep", calls.append)
+    monkeypatch.setattr(refine, "get_llm_cache", lambda: None)
+    return calls
+
+
+SEGMENTS = [{"start": 0.0, "end": 4.0, "text": "Premier propos."}, {"start": 4.0, "end": 9.0, "text": "Suite."}]
+CANDIDATE = {"start": 1.0, "end": 8.0, "text": "Premier propos. Suite.", "score": 8}
+
+
+def test_refine_goes_through_shared_limiter(sleeps):
+    limiter = CountingLimiter()
+    client = FakeClient(content='{"start": 0.0, "end": 9.0}')
+    out = refine.refine_candidates(client, [CANDIDATE], SEGMENTS, local=False, limiter=limiter)
+    assert out[0]["refine"] == "llm"
+    assert limiter.acquired == 1
+    assert sleeps == []
+
+
+def test_refine_without_limiter_keeps_fixed_delay(sleeps):
+    client = FakeClient(content='{"start": 0.0, "end": 9.0}')
+    refine.refine_candidates(client, [CANDIDATE], SEGMENTS, local=False)
+    assert sleeps == [refine.REFINE_DELAY]
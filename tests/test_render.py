@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+import extract
+import extract1
+import extractOrigin
+import render
+from workspace import Workspace
+
+DIMS = (1920, 1080, 30.0)
+SEGMENTS = [{"start": 1.0, "end": 6.0, "score": 8}, {"start": 10.0, "end": 14.0, "score": 7}]
+
+
+def test_legacy_graphs_match_extract_all_styles():
+    center = (1200.0, 500.0)
+    assert extract.build_filter(1920, 1080, 1.2, center) == render.crop_graph(DIMS, 1.2, center)
+    assert extract1.build_filter(DIMS, 1.2) == render.crop_graph(DIMS, 1.2)
+    assert extractOrigin.build_graph(DIMS) == render.blur_graph(DIMS)
+    # crop dans la source puis upscale, jamais l'inverse
+    assert render.crop_graph(DIMS, 1.2, center).startswith("[{inp}]crop=")
+
+
+@pytest.fixture
+def fake_render(monkeypatch):
+    jobs = []
+
+    def execute(batch, single_pass=False):
+        jobs.extend(batch)
+        return [{"output": j["output"], "ok": True, "seconds": 0.0} for j in batch]
+
+    for module in (extract, extract1, extractOrigin):
+        monkeypatch.setattr(module, "execute_jobs", execute)
+        monkeypatch.setattr(module, "probe_dims", lambda path: DIMS)
+    return jobs
+
+
+@pytest.mark.parametrize("extract_clips", [
+    lambda **kw: extract.extract_clips(smart_zoom=False, **kw),
+    extract1.extract_clips,
+    extractOrigin.extract_clips,
+])
+def test_manifest_false_leaves_clips_json_to_the_caller(tmp_path, fake_render, extract_clips):
+    ws = Workspace(str(tmp_path)).ensure()
+    out = extract_clips(segments=SEGMENTS, single_pass=True, workspace=ws, manifest=False)
+    assert len(out["clips"]) == 2
+    assert not os.path.exists(ws.clips_json)
+    extract_clips(segments=SEGMENTS, single_pass=True, workspace=ws)
+    assert os.path.exists(ws.clips_json)
+
+
+def test_save_clips_manifest_keeps_every_variant(tmp_path):
+    path = str(tmp_path / "clips.json")
+    results = [{"output": "clip_0.mp4", "ok": True}, {"output": "clip_v1_0.mp4", "ok": True},
+               {"output": "clip_origine_0.mp4", "ok": False, "error": "ffmpeg"}]
+    manifest = render.save_clips_manifest(results, path)
+    assert manifest["clips"] == ["clip_0.mp4", "clip_v1_0.mp4"]
+    assert manifest["errors"] == [{"output": "clip_origine_0.mp4", "error": "ffmpeg"}]
+    assert os.path.exists(path)
+
+
+@pytest.fixture
+def commands(monkeypatch):
+    cmds = []
+    monkeypatch.setattr(render, "run", cmds.append)
+    return cmds
+
+
+def _arg(cmd, flag):
+    return cmd[cmd.index(flag) + 1]
+
+
+def test_single_pass_graph_trims_each_clip_from_one_input(commands):
+    jobs = [
+        {"start": 12.0, "duration": 5.0, "graph": render.chain("null"), "output": "a.mp4"},
+        {"start": 10.0, "duration": 4.0, "graph": render.blur_graph(DIMS), "output": "b.mp4"},
+    ]
+    render.render_single_pass("video.mkv", jobs)
+    (cmd,) = commands
+    assert cmd.count("-i") == 1
+    # une seule lecture de 10 s à 17 s, puis trim relatif au point d'entrée
+    assert _arg(cmd, "-ss") == "10.000" and _arg(cmd, "-t") == "7.000"
+    graph = _arg(cmd, "-filter_complex").split(";")
+    assert graph[:2] == ["[0:v]split=2[s0][s1]", "[0:a]asplit=2[as0][as1]"]
+    assert "[s0]trim=start=2.000:end=7.000,setpts=PTS-STARTPTS[t0]" in graph
+    assert "[s1]trim=start=0.000:end=4.000,setpts=PTS-STARTPTS[t1]" in graph
+    assert "[as1]atrim=start=0.000:end=4.000,asetpts=PTS-STARTPTS[a1]" in graph
+    assert "[t0]null[v0]" in graph
+    # étiquettes internes du flou préfixées par la sortie: pas de collision entre clips
+    assert any(part.startswith("[t1]split[v1_fg][v1_bg]") for part in graph)
+    end = cmd.index("a.mp4") - len(render.ENCODE_ARGS)
+    assert cmd[end - 4:end] == ["-map", "[v0]", "-map", "[a0]"]
+    assert cmd[-1] == "b.mp4"
+
+
+def test_single_pass_without_audio_has_no_asplit(commands):
+    render.render_single_pass("video.mkv", [{"start": 0.0, "duration": 2.0, "graph": render.chain("null"),
+                                             "output": "a.mp4"}], has_audio=False)
+    (cmd,) = commands
+    assert "asplit" not in _arg(cmd, "-filter_complex")
+    assert "[a0]" not in cmd
+
+
+def test_execute_jobs_runs_one_ffmpeg_per_source(commands, monkeypatch):
+    monkeypatch.setattr(render, "probe_has_audio", lambda source: True)
+    jobs = [{"source": src, "start": float(i), "duration": 1.0, "graph": render.chain("null"), "output": f"{i}.mp4"}
+            for i, src in enumerate(["a.mkv", "b.mkv", "a.mkv"])]
+    results = render.execute_jobs(jobs, single_pass=True)
+    assert [_arg(cmd, "-i") for cmd in commands] == ["a.mkv", "b.mkv"]
+    assert [r["output"] for r in results] == ["0.mp4", "1.mp4", "2.mp4"]
+    assert all(r["ok"] for r in results)
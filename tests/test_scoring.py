@@ -0,0 +1,106 @@
+import pytest
+
+import scoring
+
+
+class FakeCache(dict):
+    """Cache LLM en mémoire (toujours vrai, comme le vrai cache même vide)."""
+
+    def __bool__(self):
+        return True
+
+    def set(self, key, value):
+        self[key] = value
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = FakeCache()
+    monkeypatch.setattr(scoring, "get_llm_cache", lambda: cache)
+    return cache
+
+
+def answer(monkeypatch, raw):
+    monkeypatch.setattr(scoring, "chat_complete", lambda *args, **kwargs: raw)
+
+
+@pytest.mark.parametrize("raw, expected", [("7", 7), ("8/10", 8), ("Note : 10", 10), (" 3\n", 3)])
+def test_valid_reply_is_scored_and_cached(monkeypatch, cache, raw, expected):
+    answer(monkeypatch, raw)
+    seg = scoring.score_one_segment(None, {"text": "passage"})
+    assert seg["score"] == expected
+    assert list(cache.values()) == [expected]
+
+
+@pytest.mark.parametrize("raw", ["810", "0", "11", "", "aucune idée", None])
+def test_invalid_reply_is_not_cached(monkeypatch, cache, raw):
+    answer(monkeypatch, raw)
+    seg = scoring.score_one_segment(None, {"text": "passage"})
+    assert seg["score"] == -1
+    assert len(cache) == 0
+
+
+def test_out_of_range_cached_score_is_asked_again(monkeypatch, cache):
+    key = scoring.llm_cache_key("score", scoring.SCORE_PROMPT_VERSION, "passage")
+    cache[key] = 810  # laissé par l'ancien parseur
+    answer(monkeypatch, "6")
+    assert scoring.score_one_segment(None, {"text": "passage"})["score"] == 6
+    assert cache[key] == 6
+
+
+def test_hierarchical_final_level_scores_exactly_the_budget(monkeypatch):
+    from sliding_window import build_windows
+    segments = [{"start": t, "end": t + 5.0, "text": f"phrase numéro {t} avec assez de mots pour le pré-tri"}
+                for t in range(0, 1200, 5)]
+    windows = build_windows(segments, 30, 10)
+    sent = []
+
+    def fake_blocks(client, blocks, limiter=None, **kwargs):
+        sent.append(len(blocks))
+        for w in blocks:
+            w["score"] = 9 if 300 <= w["start"] < 500 else 2
+        return blocks
+
+    monkeypatch.setattr(scoring, "score_blocks", fake_blocks)
+    levels = [{"window": 120.0, "step": 60.0, "keep": 3}]
+    scoring.score_hierarchical(None, windows, segments, limiter=object(), levels=levels, max_windows=12)
+    assert sent[-1] == 12
+    scored = [w for w in windows if not w.get("pruned")]
+    assert len(scored) == 12
+    assert not any(w.get("prefiltered") for w in windows)
+
+
+def test_make_batches_respects_size_and_token_budget():
+    blocks = [{"text": "mot " * n} for n in (10, 10, 10, 400, 10)]
+    assert [len(b) for b in scoring.make_batches(blocks, 2, max_tokens=10 ** 6)] == [2, 2, 1]
+    base = scoring.estimate_tokens(scoring.BATCH_PROMPT)
+    budget = base + 3 * (scoring.estimate_tokens("mot " * 10) + 8)
+    assert [len(b) for b in scoring.make_batches(blocks, 10, max_tokens=budget)] == [3, 1, 1]
+
+
+def test_parse_batch_scores_keeps_valid_entries_only():
+    raw = 'Voici : [{"index": 0, "score": 8}, {"index": 1, "score": 11}, {"index": 5, "score": 7}, ' \
+          '{"index": 2, "score": "6"}, {"score": 3}]'
+    assert scoring.parse_batch_scores(raw, 3) == {0: 8, 2: 6}
+    assert scoring.parse_batch_scores("pas de JSON", 3) == {}
+
+
+def test_batch_falls_back_to_single_requests_for_missing_scores(monkeypatch, cache):
+    prompts, texts = [], []
+
+    def fake_chat(client, prompt, **kwargs):
+        prompts.append(kwargs["label"])
+        texts.append(prompt)
+        return '[{"index": 0, "score": 9}]' if kwargs["label"] == "score_batch" else "4"
+
+    monkeypatch.setattr(scoring, "chat_complete", fake_chat)
+    batch = [{"text": "premier"}, {"text": "second"}]
+    scoring.score_batch(None, batch)
+    assert [w["score"] for w in batch] == [9, 4]
+    assert prompts == ["score_batch", "score"]
+    # relancé: la note groupée vient du cache, seul "second" (noté seul) est redemandé
+    prompts.clear()
+    texts.clear()
+    scoring.score_batch(None, [{"text": "premier"}, {"text": "second"}])
+    assert prompts == ["score_batch"]
+    assert "second" in texts[0] and "premier" not in texts[0]
@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+
+import shots
+from shots import ShotIndex, _histograms, pick_cuts
+
+
+def test_histograms_match_numpy_per_frame():
+    rng = np.random.default_rng(1)
+    frames = rng.integers(0, 256, size=(5, 12, 16), dtype=np.uint8)
+    expected = np.stack([np.histogram(f, bins=16, range=(0, 256))[0] / f.size for f in frames])
+    np.testing.assert_allclose(_histograms(frames), expected)
+
+
+def test_pick_cuts_keeps_local_peaks_spaced_by_min_len():
+    times = [0.0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5]
+    scores = [0.0, 0.6, 0.9, 0.1, 0.7, 0.0, 0.0, 0.8]
+    assert pick_cuts(times, scores, threshold=0.5, min_len=1.5) == [1.0, 3.5]
+
+
+def test_shot_index_queries():
+    index = ShotIndex([30.0, 10.0, 20.0], 40.0)
+    assert index.shots_between(5.0, 25.0) == [(5.0, 10.0), (10.0, 20.0), (20.0, 25.0)]
+    assert index.shots_between(12.0, 18.0) == [(12.0, 18.0)]
+    assert index.nearest_cut(19.2, tol=1.0) == 20.0
+    assert index.nearest_cut(15.0, tol=1.0) is None
+
+
+def test_shot_index_is_reused_only_if_fresh_and_same_settings(tmp_path, monkeypatch):
+    video, path = str(tmp_path / "video.mkv"), str(tmp_path / "shots.json")
+    open(video, "wb").close()
+    calls = []
+
+    def fake_scores(video_path, fps, size):
+        calls.append(fps)
+        return [0.0, 1.0, 2.0, 3.0], [0.0, 0.9, 0.0, 0.0]
+
+    monkeypatch.setattr(shots, "frame_scores", fake_scores)
+    first = shots.build_shot_index(video, path, fps=1, size=(64, 36), threshold=0.5, min_len=1.0)
+    assert first.cuts == [1.0] and first.duration == 4.0
+    assert shots.build_shot_index(video, path, fps=1, size=(64, 36), threshold=0.5, min_len=1.0).cuts == [1.0]
+    assert len(calls) == 1
+    shots.build_shot_index(video, path, fps=2, size=(64, 36), threshold=0.5, min_len=1.0)
+    assert len(calls) == 2
+    # vidéo retéléchargée après l'index: recalculé
+    later = os.stat(path).st_mtime + 10
+    os.utime(video, (later, later))
+    shots.build_shot_index(video, path, fps=2, size=(64, 36), threshold=0.5, min_len=1.0)
+    assert len(calls) == 3
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from sliding_window import build_windows, iter_windows
+
+
+def reference_windows(segments, window_size, step_size):
+    """Balayage complet d'origine (O(fenêtres × segments)), référence d'équivalence."""
+    grouped = []
+    video_end = segments[-1]["end"]
+    t = 0.0
+    while t < video_end:
+        t2 = min(t + window_size, video_end)
+        text = " ".join(
+            s["text"] for s in segments if s["end"] >= t and s["start"] <= t2
+        ).strip()
+        if text:
+            grouped.append({"start": t, "end": t2, "text": text})
+        t += step_size
+    return grouped
+
+
+def random_transcript(rng, overlapping=False, shuffled=False, empty_text=False):
+    segments, t = [], rng.uniform(0.0, 3.0)
+    for i in range(rng.randint(1, 60)):
+        duration = rng.uniform(0.1, 8.0)
+        text = "" if empty_text and rng.random() < 0.3 else f" mot{i}"
+        segments.append({"start": round(t, 3), "end": round(t + duration, 3), "text": text})
+        # chevauchement: le segment suivant peut commencer avant la fin de celui-ci
+        t += rng.uniform(-duration, 0.0) if overlapping and rng.random() < 0.4 else duration + rng.uniform(0.0, 2.0)
+        t = max(t, 0.0)
+    if shuffled:
+        rng.shuffle(segments)
+    return segments
+
+
+CASES = [
+    {},
+    {"overlapping": True},
+    {"shuffled": True},
+    {"empty_text": True},
+    {"overlapping": True, "shuffled": True, "empty_text": True},
+]
+
+
+@pytest.mark.parametrize("kind", CASES, ids=lambda k: "+".join(k) or "sorted")
+def test_matches_reference_on_random_transcripts(kind):
+    rng = random.Random(repr(sorted(kind)))
+    for _ in range(150):
+        segments = random_transcript(rng, **kind)
+        window_size = rng.choice([5.0, 20.0, 50.0, rng.uniform(0.5, 60.0)])
+        step_size = rng.choice([1.0, 10.0, 2.5, rng.uniform(0.3, 15.0)])
+        expected = reference_windows(segments, window_size, step_size)
+        assert build_windows(segments, window_size, step_size) == expected
+        assert list(iter_windows(segments, window_size, step_size)) == expected
+
+
+def test_non_integer_step_accumulates_like_reference():
+    segments = [{"start": i * 0.7, "end": i * 0.7 + 0.9, "text": f"s{i}"} for i in range(200)]
+    assert build_windows(segments, 3.3, 0.1) == reference_windows(segments, 3.3, 0.1)
+
+
+def test_empty_transcript_yields_nothing():
+    assert build_windows([], 50.0, 10.0) == []
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+import boundaries
+import transcribe
+
+
+class FakeWhisper:
+    def __init__(self):
+        self.kwargs = None
+
+    def transcribe(self, audio, **kwargs):
+        self.kwargs = kwargs
+        words = [{"word": " Bonjour.", "start": 0.0, "end": 0.6}] if kwargs.get("word_timestamps") else None
+        seg = {"start": 0.0, "end": 0.6, "text": " Bonjour."}
+        if words:
+            seg["words"] = words
+        return {"text": " Bonjour.", "segments": [seg], "language": "fr"}
+
+
+@pytest.fixture
+def video(tmp_path, monkeypatch):
+    path = tmp_path / "video.mkv"
+    path.write_bytes(b"video")
+    monkeypatch.setattr(transcribe, "load_pcm", lambda p: np.zeros(16000, dtype=np.float32))
+    monkeypatch.setattr(transcribe, "get_transcript_cache", lambda: None)
+    return str(path)
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_word_timestamps_flag_reaches_whisper(video, enabled):
+    model = FakeWhisper()
+    result = transcribe.transcribe_video(video, model=model, verbose=None, word_timestamps=enabled)
+    assert model.kwargs["word_timestamps"] is enabled
+    assert ("words" in result["segments"][0]) is enabled
+
+
+def test_word_timestamps_flag_is_part_of_cache_key(video):
+    with_words = transcribe.transcript_cache_key(video, 1, word_timestamps=True)
+    without = transcribe.transcript_cache_key(video, 1, word_timestamps=False)
+    assert with_words != without
+
+
+def test_units_use_words_even_with_silent_segments():
+    segments = [
+        {"start": 0.0, "end": 1.0, "text": "Bonjour à tous.",
+         "words": [{"word": " Bonjour", "start": 0.0, "end": 0.4}, {"word": " à tous.", "start": 0.5, "end": 1.0}]},
+        {"start": 1.0, "end": 2.0, "text": "", "words": []},
+    ]
+    assert [u[2] for u in boundaries._units(segments)] == ["Bonjour", "à tous."]
+    del segments[0]["words"]
+    assert [u[2] for u in boundaries._units(segments)] == ["Bonjour à tous.", ""]
+
+
+
+class HitCache:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self, key):
+        return self.value
+
+
+def test_cache_hit_never_probes_cuda(video, monkeypatch):
+    def probe(*args):
+        raise AssertionError("torch importé pour une relecture du cache")
+
+    cached = {"text": "", "segments": [], "language": "fr"}
+    monkeypatch.setattr(transcribe, "_use_fp16", probe)
+    monkeypatch.setattr(transcribe, "get_transcript_cache", lambda: HitCache(cached))
+    assert transcribe.transcribe_video(video, workers=1) is cached